@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session
+from typing import List, Literal, Optional
+from datetime import date, timedelta
+from uuid import UUID
+
+from app.db.session import get_session
+from app.schemas.analytics import StopLoadRead, UtilizationRead
+from app.services.analytics import ANALYTICS_CACHE_DAYS, ANALYTICS_DEFAULT_DAYS, peak_stop_report, utilization_report
+from app.core.responses import json_response
+from app.core.security import require_role
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=InstrumentedRoute)
+
+
+def _report_window(date_from, date_to):
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=ANALYTICS_DEFAULT_DAYS)
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_to is before date_from")
+    if (date_to - date_from).days >= 2 * ANALYTICS_CACHE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Reports cover at most {2 * ANALYTICS_CACHE_DAYS} days"
+        )
+    return date_from, date_to
+
+
+@router.get("/utilization", response_model=List[UtilizationRead])
+def get_utilization(
+    date_from: Optional[date] = Query(None, description="First day (default: ANALYTICS_DEFAULT_DAYS before date_to)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: today)"),
+    group_by: Literal["route", "departure", "vehicle"] = Query("route"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view analytics")),
+):
+    """Seats offered and booked per route, departure or vehicle, busiest first."""
+    date_from, date_to = _report_window(date_from, date_to)
+    return json_response(utilization_report(session, date_from, date_to, group_by))
+
+
+@router.get("/stop-load", response_model=List[StopLoadRead])
+def get_stop_load(
+    date_from: Optional[date] = Query(None, description="First day (default: ANALYTICS_DEFAULT_DAYS before date_to)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: today)"),
+    route_id: Optional[UUID] = Query(None),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view analytics")),
+):
+    """Boardings and on-board load after each stop of each route, in stop order."""
+    date_from, date_to = _report_window(date_from, date_to)
+    return json_response(peak_stop_report(session, date_from, date_to, route_id))
@@ -6,9 +6,10 @@ from app.models.user import User
 from app.schemas.auth import SignupRequest, LoginRequest
 from app.utils.hashing import hash_password, verify_password
 from app.core.security import create_access_token, get_current_user
+from app.core.routing import InstrumentedRoute
 from datetime import datetime
 
-router = APIRouter(prefix="/auth")
+router = APIRouter(prefix="/auth", route_class=InstrumentedRoute)
 
 @router.post("/signup")
 def signup(data: SignupRequest, session: Session = Depends(get_session)):
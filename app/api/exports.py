@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import Literal
+
+from app.services.exports import EXPORT_TABLES, MEDIA_TYPES, export_filename, export_rows
+from app.core.security import require_role
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/exports", tags=["exports"], route_class=InstrumentedRoute)
+
+
+@router.get("/{table}")
+def export_table(
+    table: str,
+    format: Literal["csv", "jsonl"] = Query("csv"),
+    gzip: bool = Query(False, description="Send a .gz file"),
+    _=Depends(require_role("TO", "Only Transport Officer can export data")),
+):
+    """
+    Stream a whole table (subscriptions, seat-allocations or payments)
+    as a CSV or JSON-lines download, in primary-key order.
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export; choose one of {', '.join(EXPORT_TABLES)}"
+        )
+    filename = export_filename(table, format, gzip)
+    return StreamingResponse(
+        export_rows(table, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+
+from app.core.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,198 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select, or_, and_
+from typing import List, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from app.db.session import engine, get_session
+from app.models.notification import Notification, NotificationCounter
+from app.models.user import User
+from app.schemas.notification import MarkedRead, NotificationRead, UnreadCount
+from app.services.notifications import NOTIFY_POLL_GRACE_SECONDS, mark_read
+from app.services.push import SSE_HEADERS, event_stream, hub, user_channel
+from app.core.security import get_current_user, push_user_id
+from app.core.responses import json_response, rows_response
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/notifications", tags=["notifications"], route_class=InstrumentedRoute)
+
+# Field order of list rows (see NotificationRead)
+NOTIFICATION_COLUMNS = ("id", "user_id", "message", "is_read", "created_at")
+
+PUSH_POLL_TIMEOUT_MAX = 60
+POLL_LIMIT = 100
+POLL_GRACE = timedelta(seconds=NOTIFY_POLL_GRACE_SECONDS)
+
+
+def _parse_cursor(cursor: str):
+    try:
+        created_at, _, notification_id = cursor.partition(",")
+        return datetime.fromisoformat(created_at), UUID(notification_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/", response_model=List[NotificationRead])
+def get_notifications(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    unread_only: bool = Query(False),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Newest first. Pages are keyset-based on (created_at, id), so every
+    page is one range scan of ix_notification_user_created; pass the
+    X-Next-Cursor header back as `cursor` for the next page.
+    """
+    statement = (
+        select(
+            Notification.id,
+            Notification.user_id,
+            Notification.message,
+            Notification.is_read,
+            Notification.created_at,
+        )
+        .where(Notification.user_id == current_user.id)
+        .order_by(Notification.created_at.desc(), Notification.id.desc())
+        .limit(limit + 1)
+    )
+    if unread_only:
+        statement = statement.where(Notification.is_read.is_(False))
+    if cursor:
+        created_at, notification_id = _parse_cursor(cursor)
+        statement = statement.where(or_(
+            Notification.created_at < created_at,
+            and_(Notification.created_at == created_at, Notification.id < notification_id),
+        ))
+    rows = session.exec(statement).all()
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = f"{last[4].isoformat()},{last[0]}"
+    return rows_response(rows, NOTIFICATION_COLUMNS, headers=headers)
+
+
+def _parse_poll_cursor(cursor: str):
+    # "<watermark>,<id>,<id>...": the ids already delivered from the grace window
+    try:
+        watermark, *seen = cursor.split(",")
+        return datetime.fromisoformat(watermark), {UUID(notification_id) for notification_id in seen}
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _notifications_since(user_id, since, limit):
+    statement = (
+        select(Notification)
+        .where(Notification.user_id == user_id)
+        .where(Notification.created_at > since)
+        .order_by(Notification.created_at, Notification.id)
+        .limit(limit)
+    )
+    with Session(engine) as session:
+        return [
+            {
+                "id": n.id,
+                "user_id": n.user_id,
+                "message": n.message,
+                "is_read": n.is_read,
+                "created_at": n.created_at,
+            }
+            for n in session.exec(statement).all()
+        ]
+
+
+# The push endpoints are async and open no database session of their own:
+# an idle connection holds neither a worker thread nor a pooled connection.
+
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Server-sent events: one `notification` event per new notification.
+    A `resync` event means some were dropped; refetch the list.
+    """
+    user_id = push_user_id(token, authorization)
+    return StreamingResponse(
+        event_stream(request, user_channel(user_id), "notification"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/poll", response_model=List[NotificationRead])
+async def poll_notifications(
+    after: Optional[str] = Query(None, description="X-Cursor of the previous poll"),
+    timeout: float = Query(25, ge=0, le=PUSH_POLL_TIMEOUT_MAX),
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Long-poll: notifications newer than `after`, oldest first. Waits up to
+    `timeout` seconds when there are none yet. Send the X-Cursor response
+    header back as `after`.
+
+    Writers on other workers can commit a row stamped a moment before one
+    already delivered, so every poll rereads NOTIFY_POLL_GRACE_SECONDS behind the
+    cursor's watermark and skips the ids the cursor says were delivered.
+    """
+    user_id = push_user_id(token, authorization)
+    watermark, seen = _parse_poll_cursor(after) if after else (datetime.utcnow(), set())
+    since = watermark - POLL_GRACE
+
+    # Subscribe before looking, so nothing committed in between is missed
+    mailbox = hub.subscribe(user_channel(user_id))
+    try:
+        window = await run_in_threadpool(_notifications_since, user_id, since, len(seen) + POLL_LIMIT)
+        rows = [row for row in window if row["id"] not in seen][:POLL_LIMIT]
+        if not rows:
+            await mailbox.wait(timeout)
+            window = await run_in_threadpool(_notifications_since, user_id, since, len(seen) + POLL_LIMIT)
+            rows = [row for row in window if row["id"] not in seen][:POLL_LIMIT]
+    finally:
+        hub.unsubscribe(mailbox)
+
+    if rows:
+        watermark = max(watermark, rows[-1]["created_at"])
+    delivered = seen | {row["id"] for row in rows}
+    keep = [row["id"] for row in window if row["id"] in delivered and row["created_at"] > watermark - POLL_GRACE]
+    headers = {"X-Cursor": ",".join([watermark.isoformat(), *map(str, keep)])}
+    return json_response(rows, headers=headers)
+
+
+@router.get("/unread-count", response_model=UnreadCount)
+def get_unread_count(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    counter = session.get(NotificationCounter, current_user.id)
+    return UnreadCount(unread=counter.unread if counter else 0)
+
+
+@router.put("/read-all", response_model=MarkedRead)
+def mark_all_read(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    updated = mark_read(session, current_user.id)
+    session.commit()
+    return MarkedRead(updated=updated)
+
+
+@router.put("/{notification_id}/read", response_model=MarkedRead)
+def mark_one_read(
+    notification_id: UUID,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    updated = mark_read(session, current_user.id, [notification_id])
+    session.commit()
+    return MarkedRead(updated=updated)
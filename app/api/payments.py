@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session, select
+from typing import List, Literal, Optional
+from datetime import date
+
+from app.db.session import get_session
+from app.models.payment import Payment
+from app.models.subscription import Subscription
+from app.models.token import Token
+from app.models.user import User
+from app.schemas.payment import PaymentCreate, PaymentRead, RevenueRead
+from app.services.payments import record_payment, revenue_report, revenue_rollup
+from app.core.security import get_current_user, require_role
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/payments", tags=["payments"], route_class=InstrumentedRoute)
+
+
+@router.post("/", response_model=PaymentRead, status_code=status.HTTP_201_CREATED)
+def create_payment(
+    data: PaymentCreate,
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can record payments")),
+):
+    """
+    Record a payment collected outside the app. Payments without a
+    token_id or subscription_id are linked later by reconciliation.
+    """
+    if not session.get(User, data.user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    if data.token_id is not None:
+        token = session.get(Token, data.token_id)
+        if not token or token.user_id != data.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token does not belong to this user"
+            )
+    if data.subscription_id is not None:
+        subscription = session.get(Subscription, data.subscription_id)
+        if not subscription or subscription.user_id != data.user_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Subscription does not belong to this user"
+            )
+
+    payment = record_payment(session, Payment.model_validate(data))
+    session.commit()
+    session.refresh(payment)
+    revenue_rollup.add(payment)
+    return payment
+
+
+@router.get("/", response_model=List[PaymentRead])
+def get_my_payments(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    return session.exec(
+        select(Payment)
+        .where(Payment.user_id == current_user.id)
+        .order_by(Payment.transaction_time.desc())
+    ).all()
+
+
+@router.get("/revenue", response_model=List[RevenueRead])
+def get_revenue(
+    date_from: Optional[date] = Query(None, description="First day (default: 1 January this year)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: today)"),
+    group_by: Literal["month", "day"] = Query("month"),
+    payment_type: Optional[str] = Query(None),
+    payment_status: Optional[str] = Query(None, alias="status"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view revenue")),
+):
+    """Revenue totals per period, payment type and status, read from the daily rollup."""
+    date_to = date_to or date.today()
+    date_from = date_from or date(date_to.year, 1, 1)
+    return revenue_report(session, date_from, date_to, group_by, payment_type, payment_status)
@@ -0,0 +1,91 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlmodel import Session
+from typing import List, Optional
+from uuid import UUID
+
+from app.db.session import get_session
+from app.models.route import RouteStop
+from app.models.user import User
+from app.schemas.route import DirectoryRead, NearestStop, RouteStopRead, StopLocationUpdate, StopSearchResult
+from app.services.directory import get_directory
+from app.services.stop_locator import MAX_NEAREST, get_stop_locator
+from app.services.stop_search import MAX_RESULTS, get_stop_index
+from app.services.versioning import DIRECTORY_KEY, bump_versions, etag_matches
+from app.core.security import require_role
+from app.core.responses import json_response
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/routes", tags=["routes"], route_class=InstrumentedRoute)
+
+# A versioned URL never changes content; the plain URL must be revalidated
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "public, no-cache"
+
+
+@router.get("", response_model=DirectoryRead)
+def get_routes(
+    session: Session = Depends(get_session),
+    v: Optional[str] = Query(None, description="Directory version, for a cache-forever URL"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    All routes with their stops in sequence order. Send the ETag back as
+    If-None-Match for a 304, or request /routes?v=<version> to get a
+    response browsers may cache indefinitely.
+    """
+    snapshot = get_directory(session)
+    cache_control = IMMUTABLE_CACHE if v == snapshot.version else REVALIDATE_CACHE
+    headers = {
+        "ETag": snapshot.etag,
+        "Cache-Control": cache_control,
+        "X-Directory-Version": snapshot.version,
+    }
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, headers=headers, media_type="application/json")
+
+
+@router.get("/stops/search", response_model=List[StopSearchResult])
+def search_stops(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_RESULTS),
+    session: Session = Depends(get_session),
+):
+    """
+    Stop autocomplete: names or words starting with `q` first, then
+    close spellings. Served from an in-memory index of the directory.
+    """
+    return json_response(get_stop_index(session).search(q, limit))
+
+
+@router.get("/stops/nearest", response_model=List[NearestStop])
+def nearest_stops(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=MAX_NEAREST),
+    session: Session = Depends(get_session),
+):
+    """
+    The `k` stops closest to a point, nearest first, with their route and
+    great-circle distance in metres. Stops without coordinates are left out.
+    """
+    return json_response(get_stop_locator(session).nearest(lat, lon, k))
+
+
+@router.put("/stops/{stop_id}/location", response_model=RouteStopRead)
+def update_stop_location(
+    stop_id: UUID,
+    data: StopLocationUpdate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(require_role("TO", "Only Transport Officer can move stops")),
+):
+    stop = session.get(RouteStop, stop_id)
+    if not stop:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stop not found")
+    stop.latitude = data.latitude
+    stop.longitude = data.longitude
+    session.add(stop)
+    bump_versions(session, DIRECTORY_KEY)
+    session.commit()
+    session.refresh(stop)
+    return stop
@@ -1,16 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from datetime import date
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlmodel import Session, and_, or_, select
+from typing import List, Literal, Optional
+from datetime import date, timedelta
+from uuid import UUID
 from calendar import monthrange
 
-from app.db.session import get_session
-from app.models.subscription import Subscription
+from app.db.session import estimate_count, get_session
+from app.models.subscription import Subscription, SubscriptionLeave
 from app.models.user import User
 from app.models.route import RouteStop, Route
-from app.schemas.subscription import SubscriptionRead, SubscriptionCreate
-from app.core.security import get_current_user
+from app.schemas.subscription import (
+    SubscriptionRead,
+    SubscriptionCreate,
+    SubscriptionLeaveCreate,
+    SubscriptionLeaveRead,
+    SubscriptionLeaveResult,
+    SubscriptionLeaveCancelResult,
+    OverSubscribedStop,
+    SeatAssignmentResult,
+    StopDemandForecast,
+)
+from app.core.security import get_current_user, require_role
+from app.core.responses import json_response, rows_response
+from app.core.metrics import record_cache
+from app.services.assignment import ASSIGNMENT_HORIZON_DAYS, apply_plan, assign_seats, capacity_report, plan_assignments
+from app.services.forecast import demand_forecast
+from app.services.leave import cancel_leave, file_leave
+from app.services.manifests import invalidate_manifests
+from app.services.notifications import notifier
+from app.services.stop_search import suggest_stop_names
+from app.services.versioning import bump_versions, etag_matches, get_versions, make_etag, subscription_key
+from app.core.routing import InstrumentedRoute
 
-router = APIRouter(prefix="/subscription", tags=["subscription"])
+router = APIRouter(prefix="/subscription", tags=["subscription"], route_class=InstrumentedRoute)
+
+# Field order of list rows (see SubscriptionRead)
+SUBSCRIPTION_COLUMNS = (
+    "id",
+    "user_id",
+    "user_name",
+    "stop_name",
+    "status",
+    "start_date",
+    "end_date",
+    "route_name",
+)
 
 
 @router.post("/", response_model=SubscriptionRead)
@@ -57,9 +91,13 @@ def subscribe(
             select(RouteStop).where(RouteStop.stop_name == data.stop_name)
         ).first()
         if not stop:
+            detail = f"Invalid stop name: {data.stop_name}"
+            suggestions = suggest_stop_names(session, data.stop_name)
+            if suggestions:
+                detail += f". Did you mean: {', '.join(suggestions)}?"
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid stop name: {data.stop_name}"
+                detail=detail
             )
 
         subscription = session.exec(
@@ -89,6 +127,7 @@ def subscribe(
             )
             session.add(subscription)
 
+        bump_versions(session, subscription_key(current_user.id))
         session.commit()
         session.refresh(subscription)
         route = session.get(Route, stop.route_id)
@@ -114,74 +153,119 @@ def subscribe(
 
 
 
+def _parse_request_cursor(cursor: str):
+    try:
+        start_date, _, subscription_id = cursor.partition(",")
+        return (date.fromisoformat(start_date) if start_date else None), int(subscription_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def _parse_month(month: str):
+    try:
+        year, number = (int(part) for part in month.split("-"))
+        return date(year, number, 1), date(year, number, monthrange(year, number)[1])
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_month must be YYYY-MM")
+
+
 @router.get("/requests", response_model=list[SubscriptionRead])
 def get_subscription_requests(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    route_id: Optional[UUID] = Query(None),
+    stop_name: Optional[str] = Query(None),
+    start_month: Optional[str] = Query(None, description="YYYY-MM of the requested start date"),
+    sort: Literal["start_date", "-start_date", "id", "-id"] = Query("id", description="id is submission order; prefix - to reverse"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view subscription requests")),
 ):
-    # Verify if user has TO role
-    # This is a basic check. In a more robust system, we would use a dependency like require_role("TO")
-    # For now, we check if the user is a STAFF and has the email of the TO, or we check roles.
-    # Since we implemented UserRole, let's check roles properly or stick to the simple check for now if we want to be fast.
-    # The requirement says: "only 1 transport officer".
-    # Let's check against the TO email or check if they have the TO role.
-    
-    # Check if user has TO role
-    # We need to import UserRole and Role models to do a proper check
-    from app.models.role import Role, UserRole
-    
+    """
+    Pending subscription requests, one page at a time. Pages are
+    keyset-based on (start_date, id) or id, so every page is one range
+    scan of one status index; pass the X-Next-Cursor
+    header back as `cursor` for the next page. The first page also
+    carries X-Total-Count-Estimate, read from the planner on Postgres.
+    """
+    # One statement for the whole page: the stop and route are joined in
+    # rather than looked up per row, and plain columns go straight to JSON
     statement = (
-        select(Role)
-        .join(UserRole)
-        .where(UserRole.user_id == current_user.id)
-        .where(Role.name == "TO")
-    )
-    is_to = session.exec(statement).first()
-    
-    if not is_to:
-         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only Transport Officer can view subscription requests"
+        select(
+            Subscription.id,
+            Subscription.user_id,
+            User.full_name,
+            Subscription.stop_name,
+            Subscription.status,
+            Subscription.start_date,
+            Subscription.end_date,
+            Route.route_name,
         )
-
-    # Use join to fetch Subscription and User together
-    statement = (
-        select(Subscription, User)
         .join(User, Subscription.user_id == User.id)
+        .outerjoin(RouteStop, RouteStop.stop_name == Subscription.stop_name)
+        .outerjoin(Route, Route.id == RouteStop.route_id)
         .where(Subscription.status == "PENDING")
     )
-    results = session.exec(statement).all()
-    
-    response = []
-    for sub, user in results:
-        stop = session.exec(
-            select(RouteStop).where(RouteStop.stop_name == sub.stop_name)
-        ).first()
-        route = session.get(Route, stop.route_id) if stop else None
-        route_name = route.route_name if route else None
-        
-        # Ensure we have a name to display
-        display_name = user.full_name if user.full_name else "No Name"
-
-        response.append(SubscriptionRead(
-            id=sub.id,
-            user_id=sub.user_id,
-            user_name=display_name,
-            stop_name=sub.stop_name,
-            status=sub.status,
-            start_date=sub.start_date,
-            end_date=sub.end_date,
-            route_name=route_name,
-        ))
-        
-    return response
+    if route_id is not None:
+        statement = statement.where(RouteStop.route_id == route_id)
+    if stop_name:
+        statement = statement.where(Subscription.stop_name == stop_name)
+    if start_month:
+        first_day, last_day = _parse_month(start_month)
+        statement = statement.where(Subscription.start_date.between(first_day, last_day))
+    filtered = statement
+
+    descending = sort.startswith("-")
+    by_date = sort.lstrip("-") == "start_date"
+    id_order = Subscription.id.desc() if descending else Subscription.id.asc()
+    if by_date:
+        date_order = Subscription.start_date.desc() if descending else Subscription.start_date.asc()
+        statement = statement.order_by(date_order.nulls_last(), id_order)
+    else:
+        statement = statement.order_by(id_order)
+
+    if cursor:
+        start_date, subscription_id = _parse_request_cursor(cursor)
+        id_after = Subscription.id < subscription_id if descending else Subscription.id > subscription_id
+        if not by_date:
+            statement = statement.where(id_after)
+        elif start_date is None:
+            statement = statement.where(and_(Subscription.start_date.is_(None), id_after))
+        else:
+            date_after = Subscription.start_date < start_date if descending else Subscription.start_date > start_date
+            statement = statement.where(or_(
+                date_after,
+                and_(Subscription.start_date == start_date, id_after),
+                Subscription.start_date.is_(None),
+            ))
+    results = session.exec(statement.limit(limit + 1)).all()
+
+    headers = {}
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        headers["X-Next-Cursor"] = f"{last[5].isoformat() if last[5] else ''},{last[0]}"
+    if not cursor:
+        headers["X-Total-Count-Estimate"] = str(estimate_count(session, filtered))
+
+    # Ensure we have a name to display
+    rows = [
+        (sub_id, user_id, full_name or "No Name", stop_name, sub_status, start_date, end_date, route_name)
+        for sub_id, user_id, full_name, stop_name, sub_status, start_date, end_date, route_name in results
+    ]
+    return rows_response(rows, SUBSCRIPTION_COLUMNS, headers=headers)
 
 @router.put("/{subscription_id}/approve", response_model=SubscriptionRead)
 def approve_subscription(
     subscription_id: int,
+    force: bool = Query(False, description="Approve even if the route has no seat for some days"),
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
 ):
+    """
+    Activate a pending subscription and seat the subscriber on the
+    route's upcoming trips. Refused with 409 when the buses are full on
+    some of its days, unless `force` is set.
+    """
     # Check if user has TO role
     from app.models.role import Role, UserRole
     
@@ -206,17 +290,47 @@ def approve_subscription(
     if subscription.status != "PENDING":
         raise HTTPException(status_code=400, detail="Subscription is not pending")
         
+    stop = session.exec(
+        select(RouteStop).where(RouteStop.stop_name == subscription.stop_name)
+    ).first()
+
+    plan = None
+    if stop and subscription.start_date and subscription.end_date:
+        plan = plan_assignments(
+            session,
+            max(subscription.start_date, date.today()),
+            subscription.end_date,
+            route_ids=[stop.route_id],
+            subscription_ids=[subscription.id],
+            lock=True,
+        )
+        short_days = plan.unseated.get(subscription.id)
+        if short_days and not force:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"The route's buses are full on {len(short_days)} day(s) from {short_days[0]}; "
+                    "approve with force=true to accept anyway"
+                )
+            )
+
     subscription.status = "ACTIVE"
     session.add(subscription)
+    if plan is not None:
+        # Drops the manifests of the trips it seats the subscriber on
+        apply_plan(session, plan)
+    bump_versions(session, subscription_key(subscription.user_id))
     session.commit()
     session.refresh(subscription)
     
-    stop = session.exec(
-        select(RouteStop).where(RouteStop.stop_name == subscription.stop_name)
-    ).first()
     route = session.get(Route, stop.route_id) if stop else None
     route_name = route.route_name if route else None
     
+    notifier.notify(
+        [subscription.user_id],
+        f"Your subscription from {subscription.stop_name} was approved.",
+    )
+
     user = session.get(User, subscription.user_id)
     user_name = user.full_name if user else "Unknown User"
 
@@ -231,6 +345,65 @@ def approve_subscription(
         route_name=route_name,
     )
 
+def _assignment_window(date_from, date_to):
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=ASSIGNMENT_HORIZON_DAYS)
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_to is before date_from")
+    return date_from, date_to
+
+
+@router.get("/capacity-report", response_model=List[OverSubscribedStop])
+def get_capacity_report(
+    date_from: Optional[date] = Query(None, description="First day (default: today)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: ASSIGNMENT_HORIZON_DAYS after date_from)"),
+    include_pending: bool = Query(True, description="Count pending requests as if approved"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view the capacity report")),
+):
+    """
+    Stops whose subscribers would not all get a seat on the route's
+    scheduled trips, worst first. Nothing is written.
+    """
+    date_from, date_to = _assignment_window(date_from, date_to)
+    plan = plan_assignments(session, date_from, date_to, include_pending=include_pending)
+    return capacity_report(plan)
+
+
+@router.post("/assignments", response_model=SeatAssignmentResult)
+def run_seat_assignment(
+    date_from: Optional[date] = Query(None, description="First day (default: today)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: ASSIGNMENT_HORIZON_DAYS after date_from)"),
+    route_id: Optional[UUID] = Query(None),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can assign seats")),
+):
+    """Give every active subscriber without a seat one on the scheduled trips in the window."""
+    date_from, date_to = _assignment_window(date_from, date_to)
+    plan = assign_seats(session, date_from, date_to, route_ids=[route_id] if route_id else None)
+    session.commit()
+    return SeatAssignmentResult(
+        seats_created=len(plan.seats),
+        trips=len(plan.trip_ids),
+        unseated_riders=sum(plan.shortfalls.values()),
+        over_subscribed=capacity_report(plan),
+    )
+
+
+@router.get("/demand-forecast", response_model=List[StopDemandForecast])
+def get_demand_forecast(
+    route_id: Optional[UUID] = Query(None),
+    weekday: Optional[int] = Query(None, ge=0, le=6, description="0 = Monday"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view the demand forecast")),
+):
+    """
+    Expected riders next week per stop, weekday and departure slot, with
+    each stop's pending subscription requests, from the nightly forecast.
+    """
+    return json_response(demand_forecast(session, route_id, weekday))
+
+
 @router.put("/{subscription_id}/decline", response_model=SubscriptionRead)
 def decline_subscription(
     subscription_id: int,
@@ -263,6 +436,7 @@ def decline_subscription(
         
     subscription.status = "INACTIVE" # Or REJECTED if available in enum, but defaulting to INACTIVE as per recent changes
     session.add(subscription)
+    bump_versions(session, subscription_key(subscription.user_id))
     session.commit()
     session.refresh(subscription)
     
@@ -272,6 +446,11 @@ def decline_subscription(
     route = session.get(Route, stop.route_id) if stop else None
     route_name = route.route_name if route else None
     
+    notifier.notify(
+        [subscription.user_id],
+        f"Your subscription request from {subscription.stop_name} was declined.",
+    )
+
     user = session.get(User, subscription.user_id)
     user_name = user.full_name if user else "Unknown User"
 
@@ -288,9 +467,20 @@ def decline_subscription(
 
 @router.get("/", response_model=SubscriptionRead)
 def get_subscription(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    if_none_match: Optional[str] = Header(None),
 ):
+    # Versioned ETag: a poll that changes nothing costs one key lookup
+    key = subscription_key(current_user.id)
+    (version,) = get_versions(session, key)
+    etag = make_etag(key, version)
+    if etag_matches(if_none_match, etag):
+        record_cache("etag:subscription", True)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    record_cache("etag:subscription", False)
+
     subscription = session.exec(
         select(Subscription).where(Subscription.user_id == current_user.id)
     ).first()
@@ -306,6 +496,8 @@ def get_subscription(
     ).first()
     route = session.get(Route, stop.route_id) if stop else None
     route_name = route.route_name if route else None
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
     return SubscriptionRead(
         id=subscription.id,
         user_id=subscription.user_id,
@@ -315,3 +507,72 @@ def get_subscription(
         end_date=subscription.end_date,
         route_name=route_name,
     )
+
+
+def _own_subscription(session: Session, subscription_id: int, user: User) -> Subscription:
+    subscription = session.get(Subscription, subscription_id)
+    if not subscription or subscription.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Subscription not found"
+        )
+    return subscription
+
+
+def _invalidate_leave_manifests(session: Session, subscription: Subscription, leave: SubscriptionLeave):
+    route_id = session.exec(
+        select(RouteStop.route_id).where(RouteStop.stop_name == subscription.stop_name)
+    ).first()
+    if route_id:
+        invalidate_manifests(session, route_ids=[route_id], date_from=leave.from_date, date_to=leave.to_date)
+
+
+@router.post("/leave", response_model=SubscriptionLeaveResult, status_code=status.HTTP_201_CREATED)
+def create_leave(
+    data: SubscriptionLeaveCreate,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    subscription = _own_subscription(session, data.subscription_id, current_user)
+    leave = SubscriptionLeave.model_validate(data)
+    released = file_leave(session, subscription, leave)
+    _invalidate_leave_manifests(session, subscription, leave)
+    bump_versions(session, subscription_key(current_user.id))
+    session.commit()
+    session.refresh(leave)
+    if released:
+        notifier.notify(
+            [current_user.id],
+            f"{released} seat(s) released for your leave from {leave.from_date} to {leave.to_date}.",
+        )
+    return SubscriptionLeaveResult(**leave.model_dump(), released_seats=released)
+
+
+@router.get("/leave", response_model=list[SubscriptionLeaveRead])
+def list_leaves(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    return session.exec(
+        select(SubscriptionLeave)
+        .join(Subscription, Subscription.id == SubscriptionLeave.subscription_id)
+        .where(Subscription.user_id == current_user.id)
+        .order_by(SubscriptionLeave.from_date)
+    ).all()
+
+
+@router.delete("/leave/{leave_id}", response_model=SubscriptionLeaveCancelResult)
+def delete_leave(
+    leave_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    leave = session.get(SubscriptionLeave, leave_id)
+    if not leave:
+        raise HTTPException(status_code=404, detail="Leave not found")
+    subscription = _own_subscription(session, leave.subscription_id, current_user)
+    _invalidate_leave_manifests(session, subscription, leave)
+    restored, unrestored = cancel_leave(session, subscription, leave)
+    bump_versions(session, subscription_key(current_user.id))
+    session.commit()
+    return SubscriptionLeaveCancelResult(restored_seats=restored, unrestored_trip_ids=unrestored)
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlmodel import Session, select
+from typing import List, Optional
+
+from app.db.session import get_session
+from app.models.token import Token
+from app.models.user import User
+from app.schemas.token import TokenPurchase, TokenPurchaseRead, TokenRead
+from app.services.tokens import purchase_token
+from app.core.security import get_current_user
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/tokens", tags=["tokens"], route_class=InstrumentedRoute)
+
+
+@router.post("/", response_model=TokenPurchaseRead, status_code=status.HTTP_201_CREATED)
+def buy_token(
+    data: TokenPurchase,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+    idempotency_key: Optional[str] = Header(None, max_length=100),
+):
+    """
+    Buy a single-ride token on a trip. The seat, token and payment are
+    written together; resending the same Idempotency-Key returns the
+    original purchase instead of booking again.
+    """
+    if current_user.user_type != "STAFF":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only STAFF users can buy tokens"
+        )
+
+    purchase, replayed = purchase_token(session, current_user, data, idempotency_key)
+    if replayed:
+        response.status_code = status.HTTP_200_OK
+        response.headers["Idempotent-Replayed"] = "true"
+    return purchase
+
+
+@router.get("/", response_model=List[TokenRead])
+def get_my_tokens(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    return session.exec(
+        select(Token)
+        .where(Token.user_id == current_user.id)
+        .order_by(Token.travel_date.desc(), Token.id.desc())
+    ).all()
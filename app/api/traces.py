@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.routing import InstrumentedRoute
+from app.core.security import require_role
+from app.core.tracing import InMemoryExporter, get_exporter
+
+router = APIRouter(prefix="/debug", tags=["debug"], route_class=InstrumentedRoute)
+
+
+@router.get("/traces")
+def recent_traces(
+    limit: int = Query(20, ge=1, le=200),
+    _=Depends(require_role("TO", "Only Transport Officer can view traces")),
+):
+    """
+    Most recent sampled traces, newest last, as lists of OTLP/JSON spans.
+    Only available with the in-memory exporter (TRACE_EXPORTER=memory).
+    """
+    exporter = get_exporter()
+    if not isinstance(exporter, InMemoryExporter):
+        raise HTTPException(status_code=404, detail="In-memory trace exporter is not enabled")
+    return exporter.recent(limit)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import math
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlmodel import Session, select, func
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime, timedelta
 from uuid import UUID
 
 from app.db.session import get_session
@@ -10,11 +12,57 @@ from app.models.vehicle import Vehicle
 from app.models.route import Route
 from app.models.profile import DriverProfile
 from app.models.seat_allocation import SeatAllocation
-from app.schemas.trip import TripAvailabilityRead
-from app.core.security import get_current_user
+from app.models.trip_manifest import TripManifest
+from app.schemas.trip import (
+    AutoAssignResult,
+    RosterConflict,
+    StopArrivalCreate,
+    StopArrivalRead,
+    TripAvailabilityRead,
+    TripEtaRead,
+    TripManifestRead,
+    TripAssignmentUpdate,
+    TripRead,
+    TripStatusUpdate,
+)
+from app.core.security import get_current_user, has_role, require_role
+from app.core.responses import rows_response
+from app.core.metrics import record_cache
+from app.services.eta import record_arrival, trip_etas
+from app.services.gps import forget_vehicle
+from app.services.manifests import build_manifests, trip_rider_ids
+from app.services.notifications import notifier
+from app.services.roster import ROSTER_HORIZON_DAYS, apply_assignments, auto_assign, find_conflicts, validate_assignment
+from app.services.versioning import (
+    INVENTORY_ALL, bump_versions, etag_matches, get_versions, inventory_keys, inventory_version, make_etag,
+)
+from app.core.routing import InstrumentedRoute
 from app.models.user import User
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
+
+# Allowed trip status changes
+TRIP_STATUS_TRANSITIONS = {
+    "SCHEDULED": {"STARTED"},
+    "STARTED": {"COMPLETED"},
+}
+
+# Field order of the availability rows (see TripAvailabilityRead)
+AVAILABILITY_COLUMNS = (
+    "vehicle_id",
+    "driver_profile_id",
+    "route_id",
+    "trip_date",
+    "start_time",
+    "status",
+    "id",
+    "route_name",
+    "vehicle_number",
+    "driver_name",
+    "total_capacity",
+    "booked_seats",
+    "available_seats",
+)
 
 @router.get("/availability", response_model=List[TripAvailabilityRead])
 def get_trips_availability(
@@ -24,15 +72,54 @@ def get_trips_availability(
     date_from: Optional[date] = Query(None, description="Filter trips from this date"),
     date_to: Optional[date] = Query(None, description="Filter trips up to this date"),
     route_id: Optional[UUID] = Query(None, description="Filter by specific route"),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
     Get real-time seat availability for trips.
     Accessible by authenticated users (Staff).
     """
     
-    # Base query: Trip + Vehicle + Route
+    # The result only changes when the route inventory version moves (or,
+    # without date_from, when the day rolls over)
+    if route_id:
+        key = f"inventory:{route_id}"
+        (version,) = get_versions(session, key)
+    else:
+        key = INVENTORY_ALL
+        version = inventory_version(session)
+    etag = make_etag(key, version, date_from or date.today(), date_to)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        record_cache("etag:availability", True)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    record_cache("etag:availability", False)
+
+    # Seats booked per trip, counted in the same statement through the
+    # seat_allocation.trip_id index instead of one query per trip
+    booked_count = (
+        select(func.count(SeatAllocation.id))
+        .where(SeatAllocation.trip_id == Trip.id)
+        .correlate(Trip)
+        .scalar_subquery()
+    )
+
+    # Select plain columns: the rows are encoded straight to JSON below
     query = (
-        select(Trip, Vehicle, Route, DriverProfile, User)
+        select(
+            Trip.vehicle_id,
+            Trip.driver_profile_id,
+            Trip.route_id,
+            Trip.trip_date,
+            Trip.start_time,
+            Trip.status,
+            Trip.id,
+            Route.route_name,
+            Vehicle.vehicle_number,
+            User.full_name,
+            Vehicle.capacity,
+            booked_count,
+            Vehicle.capacity - booked_count,
+        )
         .join(Vehicle, Trip.vehicle_id == Vehicle.id)
         .join(Route, Trip.route_id == Route.id)
         .join(DriverProfile, Trip.driver_profile_id == DriverProfile.id)
@@ -56,29 +143,229 @@ def get_trips_availability(
     query = query.order_by(Trip.trip_date, Trip.start_time)
     
     results = session.exec(query).all()
-    
-    response_data = []
-    
-    for trip, vehicle, route, driver_profile, driver_user in results:
-        # Count booked seats for this trip
-        # Note: In a high-traffic production app, we would optimize this N+1 query 
-        # with a group_by on the main query or a separate batch count query.
-        booked_count = session.exec(
-            select(func.count(SeatAllocation.id))
-            .where(SeatAllocation.trip_id == trip.id)
-        ).one()
-        
-        available_seats = vehicle.capacity - booked_count
-        
-        trip_data = TripAvailabilityRead(
-            **trip.dict(),
-            route_name=route.route_name,
-            vehicle_number=vehicle.vehicle_number,
-            driver_name=driver_user.full_name,
-            total_capacity=vehicle.capacity,
-            booked_seats=booked_count,
-            available_seats=available_seats
+    return rows_response(results, AVAILABILITY_COLUMNS, headers=headers)
+
+
+def _roster_window(date_from, date_to):
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=ROSTER_HORIZON_DAYS)
+    if date_to < date_from:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_to is before date_from")
+    return date_from, date_to
+
+
+@router.get("/conflicts", response_model=List[RosterConflict])
+def get_roster_conflicts(
+    date_from: Optional[date] = Query(None, description="First day (default: today)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: ROSTER_HORIZON_DAYS after date_from)"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can view roster conflicts")),
+):
+    """
+    Drivers and vehicles booked on overlapping trips, and scheduled trips
+    on vehicles under repair, in start order.
+    """
+    date_from, date_to = _roster_window(date_from, date_to)
+    return find_conflicts(session, date_from, date_to)
+
+
+@router.post("/auto-assign", response_model=AutoAssignResult)
+def auto_assign_roster(
+    date_from: Optional[date] = Query(None, description="First day (default: today)"),
+    date_to: Optional[date] = Query(None, description="Last day (default: ROSTER_HORIZON_DAYS after date_from)"),
+    dry_run: bool = Query(False, description="Only report the changes"),
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can reassign trips")),
+):
+    """
+    Give every conflicting scheduled trip a free driver and a free,
+    roadworthy vehicle with room for its booked seats. Trips that are
+    already fine keep their assignment.
+    """
+    date_from, date_to = _roster_window(date_from, date_to)
+    changes, unresolved = auto_assign(session, date_from, date_to)
+    if not dry_run:
+        apply_assignments(session, changes)
+        session.commit()
+    return AutoAssignResult(
+        applied=not dry_run,
+        reassigned=[
+            {"trip_id": c["id"], "driver_profile_id": c["driver_profile_id"], "vehicle_id": c["vehicle_id"]}
+            for c in changes
+        ],
+        unresolved_trip_ids=unresolved,
+    )
+
+
+@router.put("/{trip_id}/assignment", response_model=TripRead)
+def update_trip_assignment(
+    trip_id: UUID,
+    data: TripAssignmentUpdate,
+    session: Session = Depends(get_session),
+    _=Depends(require_role("TO", "Only Transport Officer can reassign trips")),
+):
+    """
+    Change the driver and/or vehicle of a scheduled trip. Rejected when
+    either is already on an overlapping trip, or the vehicle is under
+    repair or too small for the seats already booked.
+    """
+    trip = session.get(Trip, trip_id)
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    if trip.status != "SCHEDULED":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot reassign a {trip.status.lower()} trip"
         )
-        response_data.append(trip_data)
-        
-    return response_data
+    driver_profile_id = data.driver_profile_id or trip.driver_profile_id
+    vehicle_id = data.vehicle_id or trip.vehicle_id
+    validate_assignment(session, trip, driver_profile_id, vehicle_id)
+
+    apply_assignments(session, [{"id": trip.id, "driver_profile_id": driver_profile_id, "vehicle_id": vehicle_id}])
+    session.commit()
+    session.refresh(trip)
+    return trip
+
+
+@router.get("/{trip_id}/manifest", response_model=TripManifestRead)
+def get_trip_manifest(
+    trip_id: UUID,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Riders of a trip grouped by pickup stop, in stop order.
+    Accessible by the trip's driver and the Transport Officer.
+    """
+    # The stored manifest and the trip's driver come back in one read
+    statement = (
+        select(DriverProfile.user_id, TripManifest.body)
+        .select_from(Trip)
+        .join(DriverProfile, Trip.driver_profile_id == DriverProfile.id)
+        .outerjoin(TripManifest, TripManifest.trip_id == Trip.id)
+        .where(Trip.id == trip_id)
+    )
+    row = session.exec(statement).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    driver_user_id, body = row
+    if driver_user_id != current_user.id and not has_role(session, current_user.id, "TO"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the trip's driver or the Transport Officer can view its manifest"
+        )
+
+    if body is None:
+        # Not built yet or invalidated by a change: build this trip now
+        build_manifests(session, [trip_id])
+        session.commit()
+        body = session.get(TripManifest, trip_id).body
+    return Response(content=body, media_type="application/json")
+
+
+@router.put("/{trip_id}/status", response_model=TripRead)
+def update_trip_status(
+    trip_id: UUID,
+    data: TripStatusUpdate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Move a trip to its next status (SCHEDULED -> STARTED -> COMPLETED).
+    Accessible by the trip's driver and the Transport Officer. Everyone
+    booked on the trip is notified.
+    """
+    trip = session.get(Trip, trip_id)
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    driver = session.get(DriverProfile, trip.driver_profile_id)
+    if driver.user_id != current_user.id and not has_role(session, current_user.id, "TO"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the trip's driver or the Transport Officer can change its status"
+        )
+    if data.status not in TRIP_STATUS_TRANSITIONS.get(trip.status, set()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot change trip status from {trip.status} to {data.status}"
+        )
+
+    trip.status = data.status
+    session.add(trip)
+    bump_versions(session, *inventory_keys(trip.route_id))
+    session.commit()
+    session.refresh(trip)
+    forget_vehicle(trip.vehicle_id)
+
+    start = trip.start_time.strftime("%H:%M")
+    notifier.notify(
+        trip_rider_ids(session, trip.id),
+        f"Your {start} trip on {trip.trip_date} is now {trip.status.lower()}.",
+    )
+    return trip
+
+
+@router.post("/{trip_id}/arrivals", response_model=StopArrivalRead, status_code=status.HTTP_201_CREATED)
+def report_arrival(
+    trip_id: UUID,
+    data: StopArrivalCreate,
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Record that a started trip reached one of its stops. Reporting the
+    same stop again corrects the time. Accessible by the trip's driver
+    and the Transport Officer.
+    """
+    trip = session.get(Trip, trip_id)
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    driver = session.get(DriverProfile, trip.driver_profile_id)
+    if driver.user_id != current_user.id and not has_role(session, current_user.id, "TO"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the trip's driver or the Transport Officer can report arrivals"
+        )
+    arrived_at = record_arrival(session, trip, data.stop_id, data.arrived_at)
+    session.commit()
+    return StopArrivalRead(trip_id=trip.id, stop_id=data.stop_id, arrived_at=arrived_at)
+
+
+@router.get("/{trip_id}/eta", response_model=TripEtaRead)
+def get_trip_eta(
+    trip_id: UUID,
+    stop_id: Optional[UUID] = Query(None, description="Only this stop"),
+    session: Session = Depends(get_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Predicted arrival at each stop the trip has not reached yet, from its
+    last reported stop (or its scheduled start) and historical segment
+    times for its weekday and departure hour.
+    """
+    trip = session.get(Trip, trip_id)
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    if trip.status == "COMPLETED":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Trip is completed")
+
+    now = datetime.now()
+    last, upcoming = trip_etas(session, trip, now)
+    if stop_id is not None:
+        upcoming = [(stop, eta) for stop, eta in upcoming if stop["id"] == str(stop_id)]
+    return TripEtaRead(
+        trip_id=trip.id,
+        status=trip.status,
+        last_stop_id=last[0] if last else None,
+        last_arrived_at=last[1] if last else None,
+        stops=[
+            {
+                "stop_id": stop["id"],
+                "stop_name": stop["stop_name"],
+                "sequence_number": stop["sequence_number"],
+                "eta": eta,
+                "minutes": max(0, math.ceil((eta - now).total_seconds() / 60)),
+            }
+            for stop, eta in upcoming
+        ],
+    )
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session
+from typing import List, Optional
+from uuid import UUID
+
+from app.db.session import get_session
+from app.models.user import User
+from app.models.vehicle import Vehicle
+from app.schemas.vehicle_position import GpsIngestResult, GpsPingBatch, VehiclePositionRead
+from app.services.gps import ingest_pings, last_recorded_position, position_store, vehicle_channel
+from app.services.push import SSE_HEADERS, event_stream
+from app.core.security import get_current_user, push_user_id
+from app.core.responses import json_response
+from app.core.routing import InstrumentedRoute
+
+router = APIRouter(prefix="/vehicles", tags=["vehicles"], route_class=InstrumentedRoute)
+
+
+@router.post("/{vehicle_id}/positions", response_model=GpsIngestResult, status_code=status.HTTP_202_ACCEPTED)
+def report_positions(
+    vehicle_id: UUID,
+    batch: GpsPingBatch,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Batch of GPS pings from the vehicle's device during a started trip.
+    Pings are buffered and written in bulk a few seconds later; fixes
+    stamped far from the server clock are counted as rejected.
+    """
+    accepted, rejected = ingest_pings(session, current_user.id, vehicle_id, batch.pings)
+    return GpsIngestResult(accepted=accepted, rejected=rejected)
+
+
+@router.get("/positions", response_model=List[VehiclePositionRead])
+def get_positions(current_user: User = Depends(get_current_user)):
+    """Live position of every vehicle that has reported since this worker started."""
+    return json_response(position_store.latest())
+
+
+@router.get("/{vehicle_id}/position", response_model=VehiclePositionRead)
+def get_position(
+    vehicle_id: UUID,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    position = position_store.latest(vehicle_id) or last_recorded_position(session, vehicle_id)
+    if position is None:
+        if session.get(Vehicle, vehicle_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vehicle not found")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No position reported for this vehicle")
+    return json_response(position)
+
+
+@router.get("/{vehicle_id}/trail", response_model=List[VehiclePositionRead])
+def get_trail(
+    vehicle_id: UUID,
+    current_user: User = Depends(get_current_user)
+):
+    """The vehicle's recent positions, oldest first."""
+    return json_response(position_store.trail(vehicle_id))
+
+
+@router.get("/{vehicle_id}/stream")
+async def stream_position(
+    vehicle_id: UUID,
+    request: Request,
+    token: Optional[str] = Query(None),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Server-sent events: one `position` event per batch the vehicle reports.
+    Takes the token as a Bearer header or ?token=.
+    """
+    push_user_id(token, authorization)
+    return StreamingResponse(
+        event_stream(request, vehicle_channel(vehicle_id), "position"),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
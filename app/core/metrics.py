@@ -0,0 +1,406 @@
+"""
+In-process metrics exposed in the Prometheus text format at /metrics.
+
+Hot-path updates never take a lock: every thread writes into its own cell
+(a plain list stored in a threading.local) and a scrape sums the cells.
+Only the scraping thread reads other threads' cells, so an increment is a
+single list-slot write and scrapes can never block a request.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+class _Cells:
+    """Per-thread slots of floats that are summed when scraped."""
+
+    __slots__ = ("_size", "_local", "_cells")
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._cells = []
+
+    def mine(self):
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0.0] * self._size
+            self._local.cell = cell
+            self._cells.append(cell)  # list.append is atomic under the GIL
+        return cell
+
+    def snapshot(self):
+        totals = [0.0] * self._size
+        for cell in list(self._cells):
+            for i, value in enumerate(cell):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        _registry.append(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values, extra=None):
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _Cells(1)
+
+    def inc(self, amount=1):
+        self._cells.mine()[0] += amount
+
+    def value(self):
+        return self._cells.snapshot()[0]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return [
+            f"{self.name}{self._label_text(key)} {_fmt(child.value())}"
+            for key, child in list(self._children.items())
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ("_cells", "_base", "_function")
+
+    def __init__(self):
+        self._cells = _Cells(1)
+        self._base = 0.0
+        self._function = None
+
+    def inc(self, amount=1):
+        self._cells.mine()[0] += amount
+
+    def dec(self, amount=1):
+        self._cells.mine()[0] -= amount
+
+    def set(self, value):
+        # A set replaces whatever the threads accumulated so far
+        self._base = value - self._cells.snapshot()[0]
+
+    def set_function(self, function):
+        self._function = function
+
+    def value(self):
+        if self._function is not None:
+            return self._function()
+        return self._base + self._cells.snapshot()[0]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def samples(self):
+        lines = []
+        for key, child in list(self._children.items()):
+            try:
+                value = child.value()
+            except Exception:
+                continue
+            if value is None:
+                continue
+            lines.append(f"{self.name}{self._label_text(key)} {_fmt(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_cells")
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # one slot per bucket, one for +Inf, then sum
+        self._cells = _Cells(len(bounds) + 2)
+
+    def observe(self, value):
+        cell = self._cells.mine()
+        cell[bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        lines = []
+        for key, child in list(self._children.items()):
+            totals = child._cells.snapshot()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), totals[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _fmt(bound)
+                lines.append(f"{self.name}_bucket{self._label_text(key, ('le', le))} {_fmt(cumulative)}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_fmt(totals[-1])}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {_fmt(cumulative)}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value):
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_metrics():
+    return "\n".join(metric.render() for metric in list(_registry)) + "\n"
+
+
+# --- HTTP ---
+http_requests_total = Counter(
+    "nexusride_http_requests_total",
+    "HTTP requests handled, by route template, method and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = Histogram(
+    "nexusride_http_request_duration_seconds",
+    "HTTP request latency, by route template and method.",
+    ("method", "route"),
+)
+http_requests_in_flight = Gauge(
+    "nexusride_http_requests_in_flight",
+    "HTTP requests currently being processed.",
+)
+
+# --- Database pool (read from the engine at scrape time) ---
+db_pool_checked_out = Gauge(
+    "nexusride_db_pool_checked_out",
+    "Connections currently checked out of the SQLAlchemy pool.",
+)
+db_pool_overflow = Gauge(
+    "nexusride_db_pool_overflow",
+    "Connections opened beyond the pool size.",
+)
+db_pool_size = Gauge(
+    "nexusride_db_pool_size",
+    "Configured size of the SQLAlchemy pool.",
+)
+
+# --- Password hashing ---
+bcrypt_queue_depth = Gauge(
+    "nexusride_bcrypt_queue_depth",
+    "bcrypt hash/verify calls currently running or waiting for the CPU.",
+)
+bcrypt_duration_seconds = Histogram(
+    "nexusride_bcrypt_duration_seconds",
+    "Time spent in bcrypt hash/verify calls.",
+    ("operation",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+
+# --- Bookings ---
+token_purchases_total = Counter(
+    "nexusride_token_purchases_total",
+    "Token purchase attempts, by outcome (purchased/sold_out/replayed).",
+    ("outcome",),
+)
+
+# --- Scheduled jobs ---
+job_runs_total = Counter(
+    "nexusride_job_runs_total",
+    "Scheduled job runs, by job and outcome (success/error/skipped).",
+    ("job", "outcome"),
+)
+job_rows_total = Counter(
+    "nexusride_job_rows_total",
+    "Rows changed by scheduled jobs.",
+    ("job",),
+)
+job_duration_seconds = Histogram(
+    "nexusride_job_duration_seconds",
+    "Wall time of scheduled job runs.",
+    ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+
+# --- Caches ---
+cache_requests_total = Counter(
+    "nexusride_cache_requests_total",
+    "Cache lookups, by cache name and result (hit/miss).",
+    ("cache", "result"),
+)
+cache_hit_ratio = Gauge(
+    "nexusride_cache_hit_ratio",
+    "Lifetime hit ratio per cache.",
+    ("cache",),
+)
+
+# --- Vehicle positions ---
+gps_pings_total = Counter(
+    "nexusride_gps_pings_total",
+    "GPS pings received, by result (accepted/rejected).",
+    ("result",),
+)
+gps_pending_positions = Gauge(
+    "nexusride_gps_pending_positions",
+    "Accepted positions waiting for the next bulk insert.",
+)
+gps_positions_dropped_total = Counter(
+    "nexusride_gps_positions_dropped_total",
+    "Positions dropped because the pending buffer was full.",
+)
+
+# --- Exports ---
+export_rows_total = Counter(
+    "nexusride_export_rows_total",
+    "Rows written by streaming exports, by table.",
+    ("table",),
+)
+
+# --- Notifications ---
+notification_queue_depth = Gauge(
+    "nexusride_notification_queue_depth",
+    "Notification events waiting to be written.",
+)
+notifications_written_total = Counter(
+    "nexusride_notifications_written_total",
+    "Notification rows inserted by the fan-out writer.",
+)
+push_connections = Gauge(
+    "nexusride_push_connections",
+    "Open event-stream and long-poll connections.",
+)
+push_messages_total = Counter(
+    "nexusride_push_messages_total",
+    "Messages put into push mailboxes, by result (delivered/dropped).",
+    ("result",),
+)
+
+
+def record_cache(cache, hit):
+    """Count a lookup against `cache` and keep its hit-ratio gauge wired up."""
+    cache_requests_total.labels(cache, "hit" if hit else "miss").inc()
+    gauge = cache_hit_ratio.labels(cache)
+    if gauge._function is None:
+        gauge.set_function(lambda: _hit_ratio(cache))
+
+
+def _hit_ratio(cache):
+    hits = cache_requests_total.labels(cache, "hit").value()
+    misses = cache_requests_total.labels(cache, "miss").value()
+    total = hits + misses
+    return hits / total if total else None
+
+
+def bind_pool(engine):
+    pool = engine.pool
+    if callable(getattr(pool, "checkedout", None)):
+        db_pool_checked_out.set_function(pool.checkedout)
+    if callable(getattr(pool, "overflow", None)):
+        # QueuePool counts up from -pool_size until it actually overflows
+        db_pool_overflow.set_function(lambda: max(pool.overflow(), 0))
+    if callable(getattr(pool, "size", None)):
+        db_pool_size.set_function(pool.size)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            # Label by route template, never by raw path, to keep cardinality bounded
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_duration_seconds.labels(method, template).observe(elapsed)
+            http_requests_total.labels(method, template, status_holder[0]).inc()
@@ -0,0 +1,199 @@
+"""
+Opt-in request profiler.
+
+Set PROFILE_DIR to enable it. A request is profiled when a Transport Officer
+sends `X-Profile: 1` (or `?profile=1`), or when it is picked by
+PROFILE_SAMPLE_RATE. The handler's thread is sampled every
+PROFILE_INTERVAL_MS and the stacks are written in the folded format that
+flamegraph.pl and speedscope read directly. Only the newest
+PROFILE_MAX_FILES files are kept.
+
+Sync endpoints run on a threadpool thread of their own, so their profile
+holds only their own request. Async endpoints run on the event-loop
+thread, which is what gets sampled: the profile of an async request can
+also contain frames of other requests the loop served in the meantime.
+
+With PROFILE_DIR unset the middleware is not installed and InstrumentedRoute
+registers endpoints unchanged, so the disabled path costs nothing.
+"""
+import functools
+import inspect
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import decode_user_id, has_role
+
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+PROFILE_ROLE = "TO"
+
+PROFILING_ENABLED = bool(PROFILE_DIR)
+
+_active_profile: ContextVar = ContextVar("active_profile", default=None)
+
+
+class StackSampler:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join(stack)] += 1
+
+
+class RequestProfile:
+    def __init__(self, reason):
+        self.reason = reason
+        self.stacks = Counter()
+
+    def sample(self, thread_id):
+        return StackSampler(thread_id, PROFILE_INTERVAL_MS / 1000)
+
+    def collect(self, sampler):
+        self.stacks.update(sampler.stacks)
+
+    def write(self, method, route_path, elapsed):
+        directory = Path(PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route_path).strip("_") or "root"
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+        path = directory / f"{stamp}-{self.reason}-{method}-{slug}-{int(elapsed * 1000)}ms.folded"
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        _enforce_retention(directory)
+        return path
+
+
+def _enforce_retention(directory):
+    files = sorted(directory.glob("*.folded"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in files[PROFILE_MAX_FILES:]:
+        try:
+            stale.unlink()
+        except OSError:
+            pass
+
+
+def profiled(endpoint):
+    """Sample the endpoint's thread whenever its request is being profiled."""
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            sampler = profile.sample(threading.get_ident())
+            sampler.start()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                sampler.stop()
+                profile.collect(sampler)
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        # Runs in the threadpool; the context (and so the profile) is copied in
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        sampler = profile.sample(threading.get_ident())
+        sampler.start()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sampler.stop()
+            profile.collect(sampler)
+    return wrapper
+
+
+class ProfilingMiddleware:
+    def __init__(self, app, engine):
+        self.app = app
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self._requested(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(reason)
+        token = _active_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _active_profile.reset(token)
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or scope["path"]
+            if profile.stacks:
+                await run_in_threadpool(profile.write, scope["method"], route_path, elapsed)
+
+    async def _requested(self, scope):
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return "sampled"
+
+        headers = dict(scope.get("headers") or [])
+        flag = headers.get(b"x-profile", b"").decode()
+        if not flag:
+            query = parse_qs(scope.get("query_string", b"").decode())
+            flag = (query.get("profile") or [""])[0]
+        if flag not in {"1", "true"}:
+            return None
+
+        # Only the Transport Officer may force a profile
+        auth = headers.get(b"authorization", b"").decode()
+        if not auth.lower().startswith("bearer "):
+            return None
+        user_id = decode_user_id(auth[7:])
+        if user_id is None:
+            return None
+        if not await run_in_threadpool(self._may_profile, user_id):
+            return None
+        return "requested"
+
+    def _may_profile(self, user_id):
+        with Session(self.engine) as session:
+            return has_role(session, user_id, PROFILE_ROLE)
@@ -0,0 +1,161 @@
+"""
+Fast response helpers.
+
+List endpoints select plain column tuples and hand them to `rows_response`,
+which encodes them with orjson straight into the response body. Returning
+a Response from a handler makes FastAPI skip `response_model` validation,
+so each row is turned into JSON exactly once. Keep `response_model` on the
+route anyway: it still documents the shape in OpenAPI.
+
+CompressionMiddleware negotiates brotli or gzip for large one-shot bodies.
+Streaming responses (exports, event streams) pass through uncompressed.
+Every JSON or text response carries `Vary: Accept-Encoding`, small ones
+included, so a shared cache never hands a gzip body to a client that did
+not ask for one, or the reverse.
+"""
+import gzip
+import os
+
+import orjson
+from fastapi import Response
+
+from app.core.tracing import span
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+_COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+
+
+def json_response(content, status_code=200, headers=None):
+    with span("serialize.orjson"):
+        body = orjson.dumps(content)
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def rows_response(rows, columns, headers=None):
+    """Encode an iterable of row tuples as a JSON list of objects."""
+    with span("serialize.orjson", rows=len(rows)):
+        body = orjson.dumps([dict(zip(columns, row)) for row in rows])
+    return Response(content=body, headers=headers, media_type="application/json")
+
+
+def _pick_encoding(accept_encoding):
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def _with_vary(start_message):
+    """
+    Mark a compressible response as depending on Accept-Encoding, whether
+    or not this one was compressed, so caches keep the variants apart.
+    """
+    headers = start_message.get("headers", [])
+    content_type = b""
+    vary = None
+    for key, value in headers:
+        name = key.lower()
+        if name == b"content-type":
+            content_type = value
+        elif name == b"vary":
+            vary = value
+    if not content_type.decode("latin-1").startswith(_COMPRESSIBLE_TYPES):
+        return start_message
+    if vary is None:
+        headers = list(headers) + [(b"vary", b"Accept-Encoding")]
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        headers = [
+            (key, value + b", Accept-Encoding" if key.lower() == b"vary" else value)
+            for key, value in headers
+        ]
+    return {**start_message, "headers": headers}
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for key, value in scope.get("headers") or []:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = _pick_encoding(accept) if accept else None
+        if encoding is None:
+            async def send_uncompressed(message):
+                if message["type"] == "http.response.start":
+                    message = _with_vary(message)
+                await send(message)
+
+            await self.app(scope, receive, send_uncompressed)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = {k.lower(): v for k, v in start_message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            compressible = (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and b"content-encoding" not in headers
+                and content_type.startswith(_COMPRESSIBLE_TYPES)
+            )
+            if not compressible:
+                passthrough = True
+                await send(_with_vary(start_message))
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = brotli.compress(body, quality=4)
+            else:
+                body = gzip.compress(body, compresslevel=6)
+            new_headers = [
+                (k, v) for k, v in start_message.get("headers", [])
+                if k.lower() != b"content-length"
+            ]
+            new_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            start_message["headers"] = new_headers
+            passthrough = True
+            await send(_with_vary(start_message))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,30 @@
+from fastapi.routing import APIRoute
+
+from app.core.profiling import PROFILING_ENABLED, profiled
+from app.core.tracing import TRACING_ENABLED, traced
+
+
+def instrument_endpoint(endpoint):
+    if getattr(endpoint, "_instrumented", False):
+        # include_router() rebuilds routes from the already wrapped endpoints
+        return endpoint
+    if PROFILING_ENABLED:
+        endpoint = profiled(endpoint)
+    if TRACING_ENABLED:
+        endpoint = traced(endpoint)
+    if endpoint is not None and (PROFILING_ENABLED or TRACING_ENABLED):
+        endpoint._instrumented = True
+    return endpoint
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    Route class for every API router.
+
+    Sync endpoints run in the threadpool, so the profiler and the tracer
+    hook in here, on the endpoint itself, rather than in a middleware.
+    When both are disabled the endpoint is registered untouched.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, instrument_endpoint(endpoint), **kwargs)
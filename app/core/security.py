@@ -5,6 +5,9 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 from app.db.session import get_session
 from app.models.user import User
+from app.models.role import Role, UserRole
+from app.core.tracing import span
+from typing import Optional
 from uuid import UUID
 
 SECRET_KEY = "SECRET"
@@ -18,6 +21,10 @@ def create_access_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+    with span("auth.get_current_user"):
+        return _get_current_user(token, session)
+
+def _get_current_user(token: str, session: Session):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -36,3 +43,44 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     if user is None:
         raise credentials_exception
     return user
+
+def decode_user_id(token: str):
+    """Return the user id carried by a token, or None if it is not valid."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        return UUID(payload.get("sub"))
+    except (JWTError, ValueError, TypeError):
+        return None
+
+def push_user_id(token: Optional[str], authorization: Optional[str]):
+    """User id for push endpoints, which take the token as ?token= or a Bearer header."""
+    # EventSource cannot set headers, so the token may also come as ?token=
+    if not token and authorization and authorization.lower().startswith("bearer "):
+        token = authorization[7:]
+    user_id = decode_user_id(token) if token else None
+    if user_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_id
+
+def has_role(session: Session, user_id: UUID, role_name: str) -> bool:
+    statement = (
+        select(Role)
+        .join(UserRole)
+        .where(UserRole.user_id == user_id)
+        .where(Role.name == role_name)
+    )
+    return session.exec(statement).first() is not None
+
+def require_role(role_name: str, detail: str = "Insufficient permissions"):
+    def dependency(
+        current_user: User = Depends(get_current_user),
+        session: Session = Depends(get_session),
+    ):
+        if not has_role(session, current_user.id, role_name):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return current_user
+    return dependency
@@ -0,0 +1,306 @@
+"""
+Span-based request tracing.
+
+Spans follow the OpenTelemetry data model (trace/span ids, parent ids,
+nanosecond timestamps, attributes) and are exported in OTLP/JSON shape, so
+a file written by JsonLinesExporter can be replayed into a collector and
+any object with an `export(spans)` method can be plugged in with
+set_exporter().
+
+Configuration:
+- TRACE_SAMPLE_RATE: share of requests to trace (0 disables tracing).
+- TRACE_EXPORTER: "memory" (default) or "file".
+- TRACE_FILE: output path for the file exporter.
+
+A sampled request carries its trace in a ContextVar, which Starlette copies
+into the threadpool along with the rest of the context. Everywhere else
+`span()` sees no active trace and returns a shared no-op, so the unsampled
+path costs one ContextVar lookup.
+"""
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "memory")
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MEMORY_LIMIT = int(os.getenv("TRACE_MEMORY_LIMIT", "200"))
+
+TRACING_ENABLED = TRACE_SAMPLE_RATE > 0
+
+SERVICE_NAME = "nexusride-api"
+
+_current_span: ContextVar = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error", "_token")
+
+    def __init__(self, trace, name, parent_id, attributes=None, start_ns=None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = start_ns if start_ns is not None else time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, end_ns=None):
+        self.end_ns = end_ns if end_ns is not None else time.time_ns()
+        self.trace.finished(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.error = repr(exc)
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+    def to_otlp(self):
+        attributes = [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in self.attributes.items()
+        ]
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": attributes,
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 0},
+        }
+        return span
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans = []
+        self.root = None
+        self.handler_end_ns = None
+
+    def finished(self, span):
+        self.spans.append(span)  # list.append is atomic under the GIL
+        if span is self.root:
+            _exporter.export(self.spans)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def current_span():
+    return _current_span.get()
+
+
+def span(name, **attributes):
+    """Child span of the active span, or a no-op outside sampled requests."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+class InMemoryExporter:
+    """Keeps the most recent traces for local inspection."""
+
+    def __init__(self, limit=TRACE_MEMORY_LIMIT):
+        self.traces = deque(maxlen=limit)
+
+    def export(self, spans):
+        self.traces.append([s.to_otlp() for s in spans])
+
+    def recent(self, limit=20):
+        return list(self.traces)[-limit:]
+
+
+class JsonLinesExporter:
+    """Appends one OTLP/JSON `resourceSpans` document per trace to a file."""
+
+    def __init__(self, path=TRACE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [s.to_otlp() for s in spans],
+                }],
+            }]
+        }
+        line = json.dumps(document)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+
+
+_exporter = JsonLinesExporter() if TRACE_EXPORTER == "file" else InMemoryExporter()
+
+
+def set_exporter(exporter):
+    global _exporter
+    _exporter = exporter
+
+
+def get_exporter():
+    return _exporter
+
+
+def _parse_traceparent(value):
+    # W3C trace context: version-traceid-parentid-flags
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace_id = parent_id = None
+        sampled = random.random() < TRACE_SAMPLE_RATE
+        for key, value in scope.get("headers") or []:
+            if key == b"traceparent":
+                incoming = _parse_traceparent(value.decode())
+                if incoming:
+                    trace_id, parent_id, upstream_sampled = incoming
+                    sampled = sampled or upstream_sampled
+                break
+        if not sampled:
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(trace_id)
+        root = Span(trace, f"{scope['method']} {scope['path']}", parent_id, {
+            "http.method": scope["method"],
+            "http.target": scope["path"],
+        })
+        trace.root = root
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if trace.handler_end_ns is not None:
+                    # Time between the handler returning and the first byte
+                    # going out is FastAPI validating and encoding the result
+                    serialize = Span(trace, "response.serialize", root.span_id, start_ns=trace.handler_end_ns)
+                    serialize.end()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", trace.trace_id.encode()))
+                message["headers"] = headers
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_wrapper)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.set_attribute("http.route", route.path)
+
+
+def traced(endpoint):
+    """Wrap an endpoint in a `handler` span and mark where it returned."""
+    name = f"handler {endpoint.__name__}"
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return await endpoint(*args, **kwargs)
+            with Span(parent.trace, name, parent.span_id):
+                result = await endpoint(*args, **kwargs)
+            parent.trace.handler_end_ns = time.time_ns()
+            return result
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        parent = _current_span.get()
+        if parent is None:
+            return endpoint(*args, **kwargs)
+        with Span(parent.trace, name, parent.span_id):
+            result = endpoint(*args, **kwargs)
+        parent.trace.handler_end_ns = time.time_ns()
+        return result
+    return wrapper
+
+
+def instrument_engine(engine):
+    """Emit one span per SQL statement executed while a trace is active."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        context._trace_span = Span(parent.trace, "db.query", parent.span_id, {
+            "db.system": engine.dialect.name,
+            "db.statement": statement[:500],
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        db_span = getattr(context, "_trace_span", None)
+        if db_span is not None:
+            db_span.set_attribute("db.rows", cursor.rowcount)
+            db_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        context = exception_context.execution_context
+        db_span = getattr(context, "_trace_span", None) if context is not None else None
+        if db_span is not None:
+            db_span.error = repr(exception_context.original_exception)
+            db_span.end()
@@ -1,4 +1,4 @@
-from sqlmodel import create_engine, Session
+from sqlmodel import create_engine, func, select, Session, SQLModel
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -8,3 +8,39 @@ engine = create_engine(DATABASE_URL, echo=True)
 def get_session():
     with Session(engine) as session:
         yield session
+
+def ensure_indexes():
+    """
+    Create indexes declared on models whose tables already existed.
+    create_all() only builds indexes together with a new table.
+    """
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+def dialect_insert(session):
+    """INSERT construct of the session's dialect, for ON CONFLICT upserts."""
+    name = session.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {name}")
+    return insert
+
+def estimate_count(session, statement):
+    """
+    Row count of a SELECT for paging headers. Postgres answers from the
+    planner's estimate, so no page pays for a full count scan; other
+    databases count exactly.
+    """
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Bound parameters, not literals: EXPLAIN goes to the driver as-is
+        compiled = statement.compile(dialect=bind.dialect)
+        plan = session.connection().exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+        ).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return session.exec(select(func.count()).select_from(statement.subquery())).one()
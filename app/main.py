@@ -2,26 +2,59 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import SQLModel, Session
 
-from app.db.session import engine
+from app.db.session import engine, ensure_indexes
+from app.core.metrics import MetricsMiddleware, bind_pool
+from app.core.profiling import PROFILING_ENABLED, ProfilingMiddleware
+from app.core.tracing import TRACING_ENABLED, TracingMiddleware, instrument_engine
+from app.core.responses import CompressionMiddleware
 from app.api.auth import router as auth_router
+from app.api.metrics import router as metrics_router
+from app.api.traces import router as traces_router
 from app.api.subscription import router as subscription_router
 from app.api.trips import router as trips_router
-from app.models.notification import Notification
-from app.models.payment import Payment
+from app.api.tokens import router as tokens_router
+from app.api.payments import router as payments_router
+from app.api.notifications import router as notifications_router
+from app.api.routes import router as routes_router
+from app.api.vehicles import router as vehicles_router
+from app.api.analytics import router as analytics_router
+from app.api.exports import router as exports_router
+from app.models.demand_forecast import DemandForecast
+from app.models.notification import Notification, NotificationCounter
+from app.models.payment import Payment, RevenueRollup
 from app.models.profile import DriverProfile, StaffProfile
+from app.models.resource_version import ResourceVersion
 from app.models.role import Role, UserRole
 from app.models.route import Route, RouteStop
 from app.models.seat_allocation import SeatAllocation
-from app.models.subscription import Subscription, SubscriptionLeave
+from app.models.stop_arrival import SegmentTravelTime, StopArrival
+from app.models.subscription import LeaveSeatRelease, Subscription, SubscriptionLeave
 from app.models.token import Token
+from app.models.trip_inventory import TripInventory
+from app.models.trip_manifest import TripManifest
+from app.models.idempotency import IdempotencyKey
 from app.models.trip import Trip
 from app.models.user import User
 from app.models.vehicle import Vehicle
+from app.models.vehicle_position import VehiclePosition
+
+from app.services.scheduler import scheduler
+from app.services.notifications import notifier
+from app.services.push import hub
+from app.services.maintenance import register_maintenance_jobs
+from app.services.manifests import register_manifest_jobs
+from app.services.payments import register_payment_jobs, revenue_rollup
+from app.services.gps import position_store
+from app.services.eta import register_eta_jobs
+from app.services.assignment import register_assignment_jobs
+from app.services.analytics import register_analytics_jobs
+from app.services.forecast import register_forecast_jobs
 
 # Import seeds
 from app.seeds.roles import seed_roles_and_to
@@ -34,6 +67,8 @@ from app.seeds.trips import seed_trips
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     SQLModel.metadata.create_all(engine)
+    ensure_indexes()
+    bind_pool(engine)
     
     # Run seeds
     with Session(engine) as session:
@@ -42,9 +77,27 @@ async def lifespan(app: FastAPI):
         seed_vehicles(session)
         seed_drivers(session)
         seed_trips(session)
-            
+
+    register_maintenance_jobs(scheduler)
+    register_assignment_jobs(scheduler)
+    register_manifest_jobs(scheduler)
+    register_payment_jobs(scheduler)
+    register_eta_jobs(scheduler)
+    register_analytics_jobs(scheduler)
+    register_forecast_jobs(scheduler)
+    hub.bind(asyncio.get_running_loop())
+    notifier.start()
+    position_store.start()
+    revenue_rollup.start()
+    await scheduler.start()
+
     yield
 
+    await scheduler.stop()
+    await asyncio.to_thread(position_store.stop)
+    await asyncio.to_thread(revenue_rollup.stop)
+    await asyncio.to_thread(notifier.stop)
+
 
 app = FastAPI(lifespan=lifespan)
 
@@ -54,8 +107,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paged lists hand the next cursor back in a header the browser must see
+    expose_headers=["X-Next-Cursor", "X-Total-Count-Estimate"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, engine=engine)
+if TRACING_ENABLED:
+    instrument_engine(engine)
+    app.add_middleware(TracingMiddleware)
 
 app.include_router(auth_router)
 app.include_router(subscription_router)
 app.include_router(trips_router, prefix="/trips", tags=["trips"])
+app.include_router(routes_router)
+app.include_router(vehicles_router)
+app.include_router(analytics_router)
+app.include_router(exports_router)
+app.include_router(tokens_router)
+app.include_router(payments_router)
+app.include_router(notifications_router)
+app.include_router(metrics_router)
+app.include_router(traces_router)
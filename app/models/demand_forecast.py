@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field
+from uuid import UUID
+from datetime import date, datetime
+
+class DemandForecast(SQLModel, table=True):
+    """Smoothed riders boarding at a stop, per weekday and departure slot."""
+    __tablename__ = "demand_forecast"
+
+    route_stop_id: UUID = Field(primary_key=True, foreign_key="route_stop.id")
+    weekday: int = Field(primary_key=True) # 0 = Monday
+    slot: int = Field(primary_key=True) # Minutes after midnight of the slot's start
+    level: float
+    trend: float # Change per week
+    samples: int # Days observed
+    observed_through: date
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
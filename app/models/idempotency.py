@@ -0,0 +1,14 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_key"
+
+    user_id: UUID = Field(primary_key=True, foreign_key="user.id")
+    key: str = Field(primary_key=True, max_length=100)
+    request_hash: str
+    token_id: Optional[int] = Field(default=None, foreign_key="token.id")
+    payment_id: Optional[UUID] = Field(default=None, foreign_key="payment.id")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
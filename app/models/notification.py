@@ -1,11 +1,23 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from uuid import UUID, uuid4
 from datetime import datetime
 
 class Notification(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_notification_user_created", "user_id", "created_at", "id"),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id")
     message: str
     is_read: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class NotificationCounter(SQLModel, table=True):
+    __tablename__ = "notification_counter"
+
+    user_id: UUID = Field(primary_key=True, foreign_key="user.id")
+    unread: int = Field(default=0) # Kept equal to the user's unread notification rows
@@ -2,7 +2,7 @@ from sqlmodel import SQLModel, Field
 from typing import Optional
 from uuid import UUID, uuid4
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, date
 
 class Payment(SQLModel, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
@@ -11,3 +11,16 @@ class Payment(SQLModel, table=True):
     payment_type: str # SUBSCRIPTION / TOKEN
     status: str # SUCCESS / FAILED
     transaction_time: datetime = Field(default_factory=datetime.utcnow)
+    # What the payment is for; set at purchase or by the reconciliation job
+    token_id: Optional[int] = Field(default=None, foreign_key="token.id", index=True)
+    subscription_id: Optional[int] = Field(default=None, foreign_key="subscription.id", index=True)
+
+
+class RevenueRollup(SQLModel, table=True):
+    __tablename__ = "revenue_rollup"
+
+    day: date = Field(primary_key=True)
+    payment_type: str = Field(primary_key=True)
+    status: str = Field(primary_key=True)
+    payment_count: int = Field(default=0)
+    total_amount: Decimal = Field(default=0, max_digits=14, decimal_places=2)
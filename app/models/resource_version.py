@@ -0,0 +1,9 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+class ResourceVersion(SQLModel, table=True):
+    __tablename__ = "resource_version"
+
+    key: str = Field(primary_key=True) # e.g. subscription:<user_id>, inventory:<route_id>
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
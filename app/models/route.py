@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field
+from typing import Optional
 from uuid import UUID, uuid4
 
 
@@ -15,3 +16,5 @@ class RouteStop(SQLModel, table=True):
     route_id: UUID = Field(foreign_key="route.id")
     stop_name: str = Field(unique=True)
     sequence_number: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
@@ -6,7 +6,8 @@ class SeatAllocation(SQLModel, table=True):
     __tablename__ = "seat_allocation"
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    trip_id: UUID = Field(foreign_key="trip.id")
+    trip_id: UUID = Field(foreign_key="trip.id", index=True)
     user_id: UUID = Field(foreign_key="user.id")
     seat_type: str # SUBSCRIPTION / TOKEN / GUEST
     pickup_stop_id: UUID = Field(foreign_key="route_stop.id")
+    token_id: Optional[int] = Field(default=None, foreign_key="token.id", index=True) # Set for TOKEN seats
@@ -0,0 +1,27 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import UniqueConstraint
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+class StopArrival(SQLModel, table=True):
+    __tablename__ = "stop_arrival"
+    __table_args__ = (
+        UniqueConstraint("trip_id", "route_stop_id", name="uq_stop_arrival_trip_stop"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    trip_id: UUID = Field(foreign_key="trip.id")
+    route_stop_id: UUID = Field(foreign_key="route_stop.id")
+    arrived_at: datetime # Same local clock as trip.trip_date/start_time
+
+
+class SegmentTravelTime(SQLModel, table=True):
+    """Median travel time into a stop, from the previous stop (or the trip's start for the first)."""
+    __tablename__ = "segment_travel_time"
+
+    route_stop_id: UUID = Field(primary_key=True, foreign_key="route_stop.id")
+    weekday: int = Field(primary_key=True) # 0 = Monday, of the trip date
+    hour: int = Field(primary_key=True) # Hour of the trip's scheduled start
+    seconds: float
+    samples: int
@@ -1,10 +1,18 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from datetime import date
 from uuid import UUID
 
 
 class Subscription(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_subscription_status_end_date", "status", "end_date"),
+        # The TO request queue pages through one status in either order
+        Index("ix_subscription_status_start_date_id", "status", "start_date", "id"),
+        Index("ix_subscription_status_id", "status", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id")
     stop_name: str = Field(foreign_key="route_stop.stop_name", unique=True)
@@ -16,9 +24,22 @@ class Subscription(SQLModel, table=True):
 
 class SubscriptionLeave(SQLModel, table=True):
     __tablename__ = "subscription_leave"
+    __table_args__ = (
+        Index("ix_subscription_leave_dates", "from_date", "to_date"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    subscription_id: int = Field(foreign_key="subscription.id")
+    subscription_id: int = Field(foreign_key="subscription.id", index=True)
     from_date: date
     to_date: date
     reason: Optional[str] = None
+
+
+class LeaveSeatRelease(SQLModel, table=True):
+    __tablename__ = "leave_seat_release"
+
+    # Seats a leave gave up, so cancelling it can take back exactly those
+    id: Optional[int] = Field(default=None, primary_key=True)
+    leave_id: int = Field(foreign_key="subscription_leave.id", index=True)
+    trip_id: UUID = Field(foreign_key="trip.id")
+    pickup_stop_id: UUID = Field(foreign_key="route_stop.id")
@@ -1,14 +1,19 @@
 from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
 from typing import Optional
 from uuid import UUID, uuid4
 from datetime import datetime, date
 
 class Token(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_token_status_travel_date", "status", "travel_date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id")
     route_id: UUID = Field(foreign_key="route.id")
     pickup_stop_id: UUID = Field(foreign_key="route_stop.id")
     consumer_email: Optional[str] = None # Defaults to user's email if not provided
     travel_date: date
-    status: str # ACTIVE / CANCELLED / USED
+    status: str # ACTIVE / CANCELLED / USED / EXPIRED
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,9 @@
+from sqlmodel import SQLModel, Field
+from uuid import UUID
+
+class TripInventory(SQLModel, table=True):
+    __tablename__ = "trip_inventory"
+
+    trip_id: UUID = Field(primary_key=True, foreign_key="trip.id")
+    capacity: int
+    booked: int = Field(default=0) # Kept equal to the trip's seat_allocation rows
@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+from uuid import UUID
+from datetime import datetime
+
+class TripManifest(SQLModel, table=True):
+    __tablename__ = "trip_manifest"
+
+    trip_id: UUID = Field(primary_key=True, foreign_key="trip.id")
+    rider_count: int
+    body: str # Pre-encoded JSON document served as-is (see app/services/manifests.py)
+    built_at: datetime = Field(default_factory=datetime.utcnow)
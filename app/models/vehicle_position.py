@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Index
+from typing import Optional
+from uuid import UUID
+from datetime import datetime
+
+class VehiclePosition(SQLModel, table=True):
+    __tablename__ = "vehicle_position"
+    __table_args__ = (
+        Index("ix_vehicle_position_vehicle_recorded", "vehicle_id", "recorded_at"),
+        Index("ix_vehicle_position_trip_recorded", "trip_id", "recorded_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    vehicle_id: UUID = Field(foreign_key="vehicle.id")
+    trip_id: Optional[UUID] = Field(default=None, foreign_key="trip.id")
+    latitude: float
+    longitude: float
+    speed_kmh: Optional[float] = None
+    heading: Optional[float] = None # Degrees clockwise from north
+    recorded_at: datetime # Device time of the fix (UTC)
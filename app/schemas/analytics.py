@@ -0,0 +1,30 @@
+from sqlmodel import SQLModel
+from typing import Optional
+from uuid import UUID
+
+class UtilizationRead(SQLModel):
+    route_id: Optional[UUID] = None # Set when grouped by route or departure
+    route_name: Optional[str] = None
+    start_time: Optional[str] = None # HH:MM, when grouped by departure
+    vehicle_id: Optional[UUID] = None # Set when grouped by vehicle
+    vehicle_number: Optional[str] = None
+    trips: int
+    seats_offered: int
+    seats_booked: int
+    utilization: float # seats_booked / seats_offered
+    peak_load_factor: float # Fullest trip's booked / capacity
+    full_trips: int
+    no_show_rate: Optional[float] = None # Unused token seats on completed trips
+
+class StopLoadRead(SQLModel):
+    route_id: UUID
+    route_name: str
+    stop_id: UUID
+    stop_name: str
+    sequence_number: int
+    trips: int
+    boardings: int
+    mean_boardings: float
+    mean_on_board: float # Riders on board after this stop, per trip
+    load_factor: float # mean_on_board / mean capacity
+    trips_full_here: int # Trips that reached capacity at this stop
@@ -13,3 +13,9 @@ class NotificationRead(NotificationBase):
     id: UUID
     user_id: UUID
     created_at: datetime
+
+class UnreadCount(SQLModel):
+    unread: int
+
+class MarkedRead(SQLModel):
+    updated: int
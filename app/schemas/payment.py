@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel
+from typing import Optional
 from uuid import UUID
 from decimal import Decimal
 from datetime import datetime
@@ -10,8 +11,19 @@ class PaymentBase(SQLModel):
 
 class PaymentCreate(PaymentBase):
     user_id: UUID
+    token_id: Optional[int] = None
+    subscription_id: Optional[int] = None
 
 class PaymentRead(PaymentBase):
     id: UUID
     user_id: UUID
     transaction_time: datetime
+    token_id: Optional[int] = None
+    subscription_id: Optional[int] = None
+
+class RevenueRead(SQLModel):
+    period: str # YYYY-MM, or YYYY-MM-DD when grouped by day
+    payment_type: str
+    status: str
+    payment_count: int
+    total_amount: Decimal
@@ -1,10 +1,13 @@
-from sqlmodel import SQLModel
+from sqlmodel import SQLModel, Field
+from typing import List, Optional
 from uuid import UUID
 
 
 class RouteStopBase(SQLModel):
     stop_name: str
     sequence_number: int
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 
 class RouteStopCreate(RouteStopBase):
@@ -27,3 +30,34 @@ class RouteCreate(RouteBase):
 
 class RouteRead(RouteBase):
     id: UUID
+
+
+class DirectoryStop(RouteStopBase):
+    id: UUID
+
+
+class DirectoryRoute(RouteRead):
+    stops: List[DirectoryStop]
+
+
+class DirectoryRead(SQLModel):
+    version: str
+    routes: List[DirectoryRoute]
+
+
+class StopSearchResult(DirectoryStop):
+    route_id: UUID
+    route_name: str
+    match: str # prefix / fuzzy
+    score: float
+
+
+class StopLocationUpdate(SQLModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+
+
+class NearestStop(DirectoryStop):
+    route_id: UUID
+    route_name: str
+    distance_m: float
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel
+from typing import Optional
 from uuid import UUID
 
 class SeatAllocationBase(SQLModel):
@@ -6,6 +7,7 @@ class SeatAllocationBase(SQLModel):
     user_id: UUID
     seat_type: str
     pickup_stop_id: UUID
+    token_id: Optional[int] = None
 
 class SeatAllocationCreate(SeatAllocationBase):
     pass
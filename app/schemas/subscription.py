@@ -1,5 +1,5 @@
 from sqlmodel import SQLModel
-from typing import Optional
+from typing import List, Optional
 from datetime import date
 from uuid import UUID
 
@@ -30,3 +30,39 @@ class SubscriptionLeaveCreate(SubscriptionLeaveBase):
 
 class SubscriptionLeaveRead(SubscriptionLeaveBase):
     id: int
+
+class SubscriptionLeaveResult(SubscriptionLeaveRead):
+    released_seats: int
+
+class SubscriptionLeaveCancelResult(SQLModel):
+    restored_seats: int
+    unrestored_trip_ids: List[UUID]
+
+class OverSubscribedStop(SQLModel):
+    stop_id: UUID
+    stop_name: str
+    route_id: UUID
+    route_name: str
+    riders: int # Most riders needing a seat on one day
+    max_unseated: int
+    short_days: int
+    first_short_date: date
+
+class SeatAssignmentResult(SQLModel):
+    seats_created: int
+    trips: int
+    unseated_riders: int
+    over_subscribed: List[OverSubscribedStop]
+
+class StopDemandForecast(SQLModel):
+    route_id: UUID
+    route_name: str
+    stop_id: UUID
+    stop_name: str
+    sequence_number: int
+    weekday: int # 0 = Monday
+    start_time: str # HH:MM, start of the departure slot
+    expected_riders: float
+    trend: float # Change per week
+    samples: int # Days observed
+    pending_requests: int
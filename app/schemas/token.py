@@ -2,6 +2,7 @@ from sqlmodel import SQLModel
 from uuid import UUID
 from datetime import datetime, date
 from typing import Optional
+from decimal import Decimal
 
 class TokenBase(SQLModel):
     route_id: UUID
@@ -18,3 +19,14 @@ class TokenRead(TokenBase):
     user_id: UUID
     created_at: datetime
     consumer_email: Optional[str] = None
+
+class TokenPurchase(SQLModel):
+    trip_id: UUID
+    pickup_stop_id: UUID
+    consumer_email: Optional[str] = None
+
+class TokenPurchaseRead(TokenRead):
+    trip_id: UUID
+    seat_allocation_id: UUID
+    payment_id: UUID
+    amount: Decimal
@@ -1,6 +1,7 @@
 from sqlmodel import SQLModel
+from typing import List, Optional
 from uuid import UUID
-from datetime import date, time
+from datetime import date, datetime, time
 
 class TripBase(SQLModel):
     vehicle_id: UUID
@@ -23,3 +24,74 @@ class TripAvailabilityRead(TripRead):
     total_capacity: int
     booked_seats: int
     available_seats: int
+
+class ManifestSubscriber(SQLModel):
+    user_id: UUID
+    name: Optional[str] = None
+
+class ManifestTokenRider(ManifestSubscriber):
+    token_id: int
+    consumer_email: Optional[str] = None
+
+class ManifestStop(SQLModel):
+    stop_id: UUID
+    stop_name: str
+    sequence_number: int
+    subscribers: List[ManifestSubscriber]
+    tokens: List[ManifestTokenRider]
+
+class TripManifestRead(SQLModel):
+    trip_id: UUID
+    route_id: UUID
+    trip_date: date
+    built_at: datetime
+    rider_count: int
+    stops: List[ManifestStop]
+
+class TripStatusUpdate(SQLModel):
+    status: str
+
+class StopArrivalCreate(SQLModel):
+    stop_id: UUID
+    arrived_at: Optional[datetime] = None # Defaults to now
+
+class StopArrivalRead(SQLModel):
+    trip_id: UUID
+    stop_id: UUID
+    arrived_at: datetime
+
+class StopEta(SQLModel):
+    stop_id: UUID
+    stop_name: str
+    sequence_number: int
+    eta: datetime
+    minutes: int
+
+class TripEtaRead(SQLModel):
+    trip_id: UUID
+    status: str
+    last_stop_id: Optional[UUID] = None
+    last_arrived_at: Optional[datetime] = None
+    stops: List[StopEta]
+
+
+class TripAssignmentUpdate(SQLModel):
+    driver_profile_id: Optional[int] = None # Unchanged when omitted
+    vehicle_id: Optional[UUID] = None
+
+class RosterConflict(SQLModel):
+    kind: str # DRIVER / VEHICLE / UNDER_REPAIR
+    resource_id: str # Driver profile id or vehicle id
+    trip_ids: List[UUID]
+    starts_at: datetime
+    ends_at: datetime
+
+class TripReassignment(SQLModel):
+    trip_id: UUID
+    driver_profile_id: int
+    vehicle_id: UUID
+
+class AutoAssignResult(SQLModel):
+    applied: bool
+    reassigned: List[TripReassignment]
+    unresolved_trip_ids: List[UUID]
@@ -0,0 +1,27 @@
+from sqlmodel import SQLModel, Field
+from typing import List, Optional
+from uuid import UUID
+from datetime import datetime
+
+class GpsPing(SQLModel):
+    latitude: float = Field(ge=-90, le=90)
+    longitude: float = Field(ge=-180, le=180)
+    speed_kmh: Optional[float] = Field(default=None, ge=0)
+    heading: Optional[float] = Field(default=None, ge=0, lt=360)
+    recorded_at: datetime
+
+class GpsPingBatch(SQLModel):
+    pings: List[GpsPing] = Field(min_length=1, max_length=500)
+
+class GpsIngestResult(SQLModel):
+    accepted: int
+    rejected: int
+
+class VehiclePositionRead(SQLModel):
+    vehicle_id: UUID
+    trip_id: Optional[UUID] = None
+    latitude: float
+    longitude: float
+    speed_kmh: Optional[float] = None
+    heading: Optional[float] = None
+    recorded_at: datetime
@@ -1,26 +1,29 @@
 from sqlmodel import Session, select
 from app.models.route import Route, RouteStop
+from app.services.versioning import DIRECTORY_KEY, bump_versions
 
 def seed_routes(session: Session):
+    # (stop name, latitude, longitude)
     route_definitions = {
         "Route-1": [
-            "Tongi Station Road",
-            "Uttara Sector 7",
-            "Airport",
-            "Banani",
-            "Mohakhali",
-            "Farmgate",
+            ("Tongi Station Road", 23.8911, 90.4023),
+            ("Uttara Sector 7", 23.8694, 90.395),
+            ("Airport", 23.8513, 90.4082),
+            ("Banani", 23.7937, 90.4066),
+            ("Mohakhali", 23.7779, 90.405),
+            ("Farmgate", 23.7573, 90.3898),
         ],
         "Route-2": [
-            "Abdullahpur",
-            "Mirpur 10",
-            "Agargaon",
-            "Bijoy Sarani",
-            "Shahbagh",
-            "Motijheel",
+            ("Abdullahpur", 23.8798, 90.4004),
+            ("Mirpur 10", 23.8069, 90.3687),
+            ("Agargaon", 23.7781, 90.38),
+            ("Bijoy Sarani", 23.765, 90.389),
+            ("Shahbagh", 23.7386, 90.3958),
+            ("Motijheel", 23.733, 90.4172),
         ],
     }
 
+    changed = False
     for route_name, stops in route_definitions.items():
         route = session.exec(
             select(Route).where(Route.route_name == route_name)
@@ -28,10 +31,11 @@ def seed_routes(session: Session):
         if not route:
             route = Route(route_name=route_name, is_active=True)
             session.add(route)
+            changed = True
             session.commit()
             session.refresh(route)
 
-        for index, stop_name in enumerate(stops, start=1):
+        for index, (stop_name, latitude, longitude) in enumerate(stops, start=1):
             existing_stop = session.exec(
                 select(RouteStop).where(RouteStop.stop_name == stop_name)
             ).first()
@@ -41,7 +45,19 @@ def seed_routes(session: Session):
                         route_id=route.id,
                         stop_name=stop_name,
                         sequence_number=index,
+                        latitude=latitude,
+                        longitude=longitude,
                     )
                 )
+                changed = True
+            elif existing_stop.latitude is None:
+                # Stops seeded before they had coordinates
+                existing_stop.latitude = latitude
+                existing_stop.longitude = longitude
+                session.add(existing_stop)
+                changed = True
+
+    if changed:
+        bump_versions(session, DIRECTORY_KEY)
 
     session.commit()
@@ -4,6 +4,7 @@ from app.models.trip import Trip
 from app.models.route import Route
 from app.models.vehicle import Vehicle
 from app.models.profile import DriverProfile
+from app.services.versioning import bump_versions, inventory_keys
 
 def seed_trips(session: Session):
     trip_seed = [
@@ -47,6 +48,7 @@ def seed_trips(session: Session):
     
     profiles = session.exec(select(DriverProfile)).all()
     profile_by_vehicle_id = {p.assigned_vehicle_id: p for p in profiles if p.assigned_vehicle_id}
+    changed_routes = set()
 
     for trip in trip_seed:
         route = route_map.get(trip["route_name"])
@@ -79,5 +81,9 @@ def seed_trips(session: Session):
                     status=trip["status"],
                 )
             )
+            changed_routes.add(route.id)
+
+    if changed_routes:
+        bump_versions(session, *inventory_keys(*changed_routes))
 
     session.commit()
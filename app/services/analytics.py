@@ -0,0 +1,339 @@
+"""
+Occupancy and utilization analytics.
+
+Reports are built from per-day columnar summaries. Loading a run of days
+reads their trips in one query and their seat allocations in batches of
+ANALYTICS_BATCH_SIZE rows (a server-side cursor where the driver has
+one), and reduces each batch with NumPy to per-trip counts and per
+(trip, stop) boardings. Routes, vehicles and stops are interned to small
+integer codes, so a day is a handful of int arrays.
+
+Days before today are cached per worker (up to ANALYTICS_CACHE_DAYS of
+them, least recently used first out) and are not read again: their
+trips have run and their seats no longer move. Today and later days are
+always read fresh. The warm_analytics job keeps the last
+ANALYTICS_CACHE_DAYS days loaded, so a report over a year is a
+concatenation and a few bincounts.
+
+No-shows are token seats on completed trips whose token was never
+marked USED; subscription seats carry no boarding record.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import String, type_coerce
+from sqlmodel import Session, select
+
+from app.core.metrics import record_cache
+from app.db.session import engine
+from app.models.route import Route
+from app.models.seat_allocation import SeatAllocation
+from app.models.token import Token
+from app.models.trip import Trip
+from app.models.vehicle import Vehicle
+from app.services.directory import get_directory
+
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "50000"))
+ANALYTICS_CACHE_DAYS = int(os.getenv("ANALYTICS_CACHE_DAYS", "400"))
+ANALYTICS_DEFAULT_DAYS = int(os.getenv("ANALYTICS_DEFAULT_DAYS", "28"))
+
+_EMPTY = np.zeros(0, dtype=np.int64)
+
+
+class _Codes:
+    """
+    Interns ids to dense integer codes. Values may be UUIDs or the
+    driver's raw form of one; only each new value is parsed.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.codes = {}  # raw value -> code
+        self.by_id = {}  # UUID -> code
+
+    def __call__(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            uuid = value if isinstance(value, UUID) else UUID(str(value))
+            code = self.by_id.setdefault(uuid, len(self.ids))
+            if code == len(self.ids):
+                self.ids.append(uuid)
+            self.codes[value] = code
+        return code
+
+
+_routes = _Codes()
+_vehicles = _Codes()
+_stops = _Codes()
+
+
+class DayStats:
+    """One day's trips and boardings as parallel arrays."""
+
+    __slots__ = (
+        "route", "vehicle", "departure", "capacity", "booked", "checked", "no_shows",
+        "board_trip", "board_stop", "boardings",
+    )
+
+    def __init__(self, trips, boardings):
+        self.route, self.vehicle, self.departure, self.capacity, self.booked, self.checked, self.no_shows = trips
+        # Boardings are sorted by trip; board_trip indexes this day's trips
+        self.board_trip, self.board_stop, self.boardings = boardings
+
+
+def _load_days(session: Session, date_from, date_to):
+    """DayStats for every day in [date_from, date_to]."""
+    # Ids of trips and stops are matched in the driver's raw form; parsing
+    # a UUID per seat would cost more than everything else here together
+    trips = session.exec(
+        select(
+            type_coerce(Trip.id, String), Trip.trip_date, Trip.route_id, Trip.vehicle_id, Trip.start_time,
+            Trip.status, Vehicle.capacity,
+        )
+        .join(Vehicle, Trip.vehicle_id == Vehicle.id)
+        .where(Trip.trip_date >= date_from)
+        .where(Trip.trip_date <= date_to)
+        .order_by(Trip.trip_date, Trip.start_time, Trip.id)
+    ).all()
+    count = len(trips)
+    index = {row[0]: position for position, row in enumerate(trips)}
+    day = np.fromiter((row[1].toordinal() for row in trips), np.int64, count)
+    route = np.fromiter((_routes(row[2]) for row in trips), np.int64, count)
+    vehicle = np.fromiter((_vehicles(row[3]) for row in trips), np.int64, count)
+    departure = np.fromiter((row[4].hour * 60 + row[4].minute for row in trips), np.int64, count)
+    completed = np.fromiter((row[5] == "COMPLETED" for row in trips), bool, count)
+    capacity = np.fromiter((row[6] for row in trips), np.int64, count)
+
+    booked = np.zeros(count, dtype=np.int64)
+    checked = np.zeros(count, dtype=np.int64)
+    no_shows = np.zeros(count, dtype=np.int64)
+    keys = []
+    seats = session.exec(
+        select(
+            type_coerce(SeatAllocation.trip_id, String),
+            type_coerce(SeatAllocation.pickup_stop_id, String),
+            SeatAllocation.seat_type,
+            Token.status,
+        )
+        .join(Trip, SeatAllocation.trip_id == Trip.id)
+        .outerjoin(Token, SeatAllocation.token_id == Token.id)
+        .where(Trip.trip_date >= date_from)
+        .where(Trip.trip_date <= date_to)
+        .execution_options(yield_per=ANALYTICS_BATCH_SIZE)
+    )
+    for batch in seats.partitions():
+        size = len(batch)
+        trip = np.fromiter((index[row[0]] for row in batch), np.int64, size)
+        stop = np.fromiter((_stops(row[1]) for row in batch), np.int64, size)
+        token = np.fromiter((row[2] == "TOKEN" for row in batch), bool, size)
+        used = np.fromiter((row[3] == "USED" for row in batch), bool, size)
+        booked += np.bincount(trip, minlength=count)
+        token &= completed[trip]
+        checked += np.bincount(trip, weights=token, minlength=count).astype(np.int64)
+        no_shows += np.bincount(trip, weights=token & ~used, minlength=count).astype(np.int64)
+        keys.append((trip << 32) | stop)
+
+    if keys:
+        pairs, boardings = np.unique(np.concatenate(keys), return_counts=True)
+    else:
+        pairs, boardings = _EMPTY, _EMPTY
+    board_trip = pairs >> 32
+    board_stop = pairs & 0xFFFFFFFF
+
+    days = {}
+    for ordinal in range(date_from.toordinal(), date_to.toordinal() + 1):
+        lo, hi = np.searchsorted(day, [ordinal, ordinal + 1])
+        blo, bhi = np.searchsorted(board_trip, [lo, hi])
+        days[date.fromordinal(ordinal)] = DayStats(
+            tuple(column[lo:hi] for column in (route, vehicle, departure, capacity, booked, checked, no_shows)),
+            (board_trip[blo:bhi] - lo, board_stop[blo:bhi], boardings[blo:bhi]),
+        )
+    return days
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _runs(days):
+    """Consecutive stretches of a sorted list of days, as (first, last)."""
+    runs = []
+    for day in days:
+        if runs and runs[-1][1] + timedelta(days=1) == day:
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def get_days(session: Session, date_from, date_to):
+    """DayStats for each day in the window, from the cache where possible."""
+    today = date.today()
+    wanted = [date_from + timedelta(days=offset) for offset in range((date_to - date_from).days + 1)]
+    with _lock:
+        found = {}
+        missing = []
+        for day in wanted:
+            stats = _cache.get(day)
+            if stats is None:
+                missing.append(day)
+            else:
+                _cache.move_to_end(day)
+                found[day] = stats
+        record_cache("analytics", not missing)
+        for first, last in _runs(missing):
+            loaded = _load_days(session, first, last)
+            found.update(loaded)
+            for day, stats in loaded.items():
+                if day < today:
+                    _cache[day] = stats
+        while len(_cache) > ANALYTICS_CACHE_DAYS:
+            _cache.popitem(last=False)
+    return [found[day] for day in wanted]
+
+
+def _concat(days):
+    """All trips and boardings of the window, with boardings indexing the trips."""
+    trips = [np.concatenate([getattr(d, name) for d in days]) if days else _EMPTY for name in DayStats.__slots__[:7]]
+    offsets = np.cumsum([0] + [len(d.route) for d in days[:-1]])
+    board_trip = np.concatenate([d.board_trip + offset for d, offset in zip(days, offsets)]) if days else _EMPTY
+    board_stop = np.concatenate([d.board_stop for d in days]) if days else _EMPTY
+    boardings = np.concatenate([d.boardings for d in days]) if days else _EMPTY
+    return trips, (board_trip, board_stop, boardings)
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def utilization_report(session: Session, date_from, date_to, group_by="route"):
+    """Seats offered and booked per route, departure (route and start time) or vehicle."""
+    (route, vehicle, departure, capacity, booked, checked, no_shows), _ = _concat(get_days(session, date_from, date_to))
+    if group_by == "vehicle":
+        keys = vehicle
+    elif group_by == "departure":
+        keys = route * 1440 + departure
+    else:
+        keys = route
+    groups, inverse = np.unique(keys, return_inverse=True)
+    size = len(groups)
+    trips = np.bincount(inverse, minlength=size)
+    offered = np.bincount(inverse, weights=capacity, minlength=size)
+    taken = np.bincount(inverse, weights=booked, minlength=size)
+    checked = np.bincount(inverse, weights=checked, minlength=size)
+    missed = np.bincount(inverse, weights=no_shows, minlength=size)
+    load = _ratio(booked.astype(float), capacity)
+    peak = np.zeros(size)
+    np.maximum.at(peak, inverse, load)
+    full = np.bincount(inverse, weights=(booked >= capacity) & (capacity > 0), minlength=size)
+    utilization = _ratio(taken, offered)
+    no_show_rate = _ratio(missed, checked)
+
+    route_names = dict(session.exec(select(Route.id, Route.route_name)).all())
+    vehicle_numbers = dict(session.exec(select(Vehicle.id, Vehicle.vehicle_number)).all())
+    rows = []
+    for position in np.argsort(-utilization, kind="stable"):
+        key = int(groups[position])
+        row = {}
+        if group_by == "vehicle":
+            vehicle_id = _vehicles.ids[key]
+            row.update(vehicle_id=vehicle_id, vehicle_number=vehicle_numbers.get(vehicle_id))
+        else:
+            route_id = _routes.ids[key // 1440 if group_by == "departure" else key]
+            row.update(route_id=route_id, route_name=route_names.get(route_id))
+            if group_by == "departure":
+                row["start_time"] = f"{key % 1440 // 60:02d}:{key % 60:02d}"
+        row.update(
+            trips=int(trips[position]),
+            seats_offered=int(offered[position]),
+            seats_booked=int(taken[position]),
+            utilization=round(float(utilization[position]), 4),
+            peak_load_factor=round(float(peak[position]), 4),
+            full_trips=int(full[position]),
+            no_show_rate=round(float(no_show_rate[position]), 4) if checked[position] else None,
+        )
+        rows.append(row)
+    return rows
+
+
+def peak_stop_report(session: Session, date_from, date_to, route_id=None):
+    """
+    Boardings and on-board load after each stop, per route in sequence
+    order, with the number of trips that filled up at that stop.
+    """
+    trips, (board_trip, board_stop, boardings) = _concat(get_days(session, date_from, date_to))
+    route, capacity, booked = trips[0], trips[3], trips[4]
+    directory = get_directory(session)
+    routes = [r for r in directory.routes if route_id is None or r["id"] == str(route_id)]
+
+    # Sequence position of every known stop; stops no longer on a route stay -1
+    position = np.full(len(_stops.ids), -1, dtype=np.int64)
+    for r in routes:
+        for sequence, stop in enumerate(r["stops"]):
+            code = _stops.by_id.get(UUID(stop["id"]))
+            if code is not None:
+                position[code] = sequence
+    keep = position[board_stop] >= 0
+    board_trip, board_stop, boardings = board_trip[keep], board_stop[keep], boardings[keep]
+
+    # Riders on board after each boarding, counted along each trip
+    order = np.lexsort((position[board_stop], board_trip))
+    board_trip, board_stop, boardings = board_trip[order], board_stop[order], boardings[order]
+    running = np.cumsum(boardings)
+    starts = np.r_[True, board_trip[1:] != board_trip[:-1]] if len(board_trip) else np.zeros(0, bool)
+    running -= np.maximum.accumulate(np.where(starts, running - boardings, 0)) if len(running) else 0
+    full = (running >= capacity[board_trip]) & (capacity[board_trip] > 0)
+    fills = full & ~np.r_[False, full[:-1] & ~starts[1:]] if len(full) else full
+
+    stops = len(_stops.ids)
+    boarded = np.bincount(board_stop, weights=boardings, minlength=stops)
+    filled = np.bincount(board_stop, weights=fills, minlength=stops)
+    route_trips = np.bincount(route, minlength=len(_routes.ids))
+    route_seats = np.bincount(route, weights=capacity, minlength=len(_routes.ids))
+
+    rows = []
+    for r in routes:
+        code = _routes.by_id.get(UUID(r["id"]))
+        count = int(route_trips[code]) if code is not None else 0
+        if not count:
+            continue
+        seats = float(route_seats[code])
+        on_board = 0.0
+        for stop in r["stops"]:
+            stop_code = _stops.by_id.get(UUID(stop["id"]))
+            stop_boardings = float(boarded[stop_code]) if stop_code is not None else 0.0
+            on_board += stop_boardings
+            rows.append({
+                "route_id": r["id"],
+                "route_name": r["route_name"],
+                "stop_id": stop["id"],
+                "stop_name": stop["stop_name"],
+                "sequence_number": stop["sequence_number"],
+                "trips": count,
+                "boardings": int(stop_boardings),
+                "mean_boardings": round(stop_boardings / count, 2),
+                "mean_on_board": round(on_board / count, 2),
+                "load_factor": round(on_board / seats, 4) if seats else 0.0,
+                "trips_full_here": int(filled[stop_code]) if stop_code is not None else 0,
+            })
+    return rows
+
+
+def warm_analytics(days=ANALYTICS_CACHE_DAYS):
+    """Load the days before today that this worker has not cached yet."""
+    today = date.today()
+    with _lock:
+        cached = len(_cache)
+    with Session(engine) as session:
+        get_days(session, today - timedelta(days=days), today - timedelta(days=1))
+    with _lock:
+        return max(len(_cache) - cached, 0)
+
+
+def register_analytics_jobs(scheduler):
+    # Each worker warms its own cache, so this skips the advisory lock
+    scheduler.add_job("warm_analytics", warm_analytics, 3600, initial_delay=60, exclusive=False)
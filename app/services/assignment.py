@@ -0,0 +1,276 @@
+"""
+Subscriber-to-trip seat assignment.
+
+Every ACTIVE subscriber who is not on leave gets one SUBSCRIPTION seat a
+day on a SCHEDULED trip of their stop's route, and no trip is filled
+beyond its capacity. A plan is built from a handful of queries (trips with
+their capacity, seats already held, subscriptions, leaves) and solved in memory, one (route, day) at a time:
+
+- seats already held, whether tokens or earlier assignments, stay where
+  they are and count against capacity;
+- the remaining riders are taken stop by stop in sequence order, oldest
+  subscription first, so when a route is short it is the later stops
+  that are left over, as they would be on the road;
+- a stop's riders board together on the earliest trip with room for all
+  of them, and are split over trips only when no single trip has room.
+
+Riders who fit nowhere are reported per stop and day. apply_plan()
+writes the new seats with bulk INSERTs and recounts the inventory of the
+touched trips. The inventory rows are locked while the plan is built, so
+token sales cannot take the same seats in between.
+"""
+import os
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlmodel import Session, func, or_, select
+
+from app.db.session import engine
+from app.models.route import Route, RouteStop
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import Subscription
+from app.models.trip import Trip
+from app.models.trip_inventory import TripInventory
+from app.models.vehicle import Vehicle
+from app.services.leave import load_leave_index
+from app.services.manifests import invalidate_manifests
+from app.services.scheduler import seconds_until_hour
+from app.services.seats import ensure_inventory, recount_inventory
+from app.services.versioning import bump_versions, inventory_keys
+
+ASSIGNMENT_HORIZON_DAYS = int(os.getenv("ASSIGNMENT_HORIZON_DAYS", "7"))
+ASSIGNMENT_HOUR = int(os.getenv("ASSIGNMENT_HOUR", "1"))
+ASSIGNMENT_INSERT_CHUNK = 1000
+
+
+class AssignmentPlan:
+    def __init__(self):
+        self.seats = []  # SeatAllocation rows to insert
+        self.trip_ids = set()  # trips that get new seats
+        self.route_ids = set()
+        self.requested = Counter()  # (stop_id, day) -> riders needing a seat
+        self.shortfalls = Counter()  # (stop_id, day) -> riders left without one
+        self.unseated = defaultdict(list)  # subscription id -> days without a seat
+        self.stops = {}  # stop_id -> (stop_name, route_id, route_name)
+
+
+def plan_assignments(
+    session: Session,
+    date_from: date,
+    date_to: date,
+    route_ids=None,
+    include_pending=False,
+    subscription_ids=(),
+    lock=False,
+):
+    """
+    Seats the subscribers would get on trips between date_from and date_to.
+
+    `include_pending` counts every PENDING subscription as if approved;
+    `subscription_ids` does so for just those. Pass lock=True when the
+    plan is going to be applied in the same transaction.
+    """
+    plan = AssignmentPlan()
+    trip_filter = [
+        Trip.status == "SCHEDULED",
+        Trip.trip_date >= date_from,
+        Trip.trip_date <= date_to,
+    ]
+    if route_ids is not None:
+        trip_filter.append(Trip.route_id.in_(list(route_ids)))
+
+    if lock:
+        ensure_inventory(session, session.exec(select(Trip.id).where(*trip_filter)).all())
+        session.exec(
+            select(TripInventory.trip_id)
+            .join(Trip, Trip.id == TripInventory.trip_id)
+            .where(*trip_filter)
+            .order_by(TripInventory.trip_id)
+            .with_for_update(of=TripInventory)
+        ).all()
+
+    trips = session.exec(
+        select(Trip.id, Trip.route_id, Trip.trip_date, Vehicle.capacity, TripInventory.capacity, TripInventory.booked)
+        .join(Vehicle, Trip.vehicle_id == Vehicle.id)
+        .outerjoin(TripInventory, TripInventory.trip_id == Trip.id)
+        .where(*trip_filter)
+        .order_by(Trip.route_id, Trip.trip_date, Trip.start_time)
+    ).all()
+    if not trips:
+        return plan
+
+    trip_day = {}
+    trips_by_day = defaultdict(list)
+    capacity = {}
+    booked = Counter()
+    for trip_id, route_id, trip_date, vehicle_capacity, inventory_capacity, inventory_booked in trips:
+        trip_day[trip_id] = (route_id, trip_date)
+        trips_by_day[(route_id, trip_date)].append(trip_id)
+        capacity[trip_id] = inventory_capacity if inventory_capacity is not None else vehicle_capacity
+        if inventory_booked is not None:
+            booked[trip_id] = inventory_booked
+
+    # Subscribers who already have their seat that day
+    seated = {
+        (user_id, trip_day[trip_id])
+        for trip_id, user_id in session.exec(
+            select(SeatAllocation.trip_id, SeatAllocation.user_id)
+            .join(Trip, Trip.id == SeatAllocation.trip_id)
+            .where(*trip_filter)
+            .where(SeatAllocation.seat_type == "SUBSCRIPTION")
+        ).all()
+    }
+    # Trips never booked through the inventory: count their seats
+    for trip_id, count in session.exec(
+        select(SeatAllocation.trip_id, func.count(SeatAllocation.id))
+        .join(Trip, Trip.id == SeatAllocation.trip_id)
+        .outerjoin(TripInventory, TripInventory.trip_id == Trip.id)
+        .where(*trip_filter)
+        .where(TripInventory.trip_id.is_(None))
+        .group_by(SeatAllocation.trip_id)
+    ).all():
+        booked[trip_id] = count
+
+    wanted = [Subscription.status == "ACTIVE"]
+    if include_pending:
+        wanted.append(Subscription.status == "PENDING")
+    if subscription_ids:
+        wanted.append(Subscription.id.in_(list(subscription_ids)))
+    subscriptions = session.exec(
+        select(
+            Subscription.id,
+            Subscription.user_id,
+            Subscription.start_date,
+            Subscription.end_date,
+            RouteStop.id,
+            RouteStop.route_id,
+            RouteStop.stop_name,
+            Route.route_name,
+        )
+        .join(RouteStop, RouteStop.stop_name == Subscription.stop_name)
+        .join(Route, Route.id == RouteStop.route_id)
+        .where(or_(*wanted))
+        .where(RouteStop.route_id.in_({route_id for route_id, _ in trips_by_day}))
+        .where(Subscription.start_date <= date_to)
+        .where(Subscription.end_date >= date_from)
+        .order_by(RouteStop.route_id, RouteStop.sequence_number, Subscription.id)
+    ).all()
+
+    stops_by_route = defaultdict(dict)  # route -> stop -> [subscriptions], in stop order
+    for sub_id, user_id, start, end, stop_id, route_id, stop_name, route_name in subscriptions:
+        stops_by_route[route_id].setdefault(stop_id, []).append((sub_id, user_id, start, end))
+        plan.stops[stop_id] = (stop_name, route_id, route_name)
+    on_leave = load_leave_index(session, date_from, date_to, [row[0] for row in subscriptions])
+
+    leave_cache = {}
+    for (route_id, day), day_trips in trips_by_day.items():
+        stops = stops_by_route.get(route_id)
+        if not stops:
+            continue
+        if day not in leave_cache:
+            leave_cache[day] = on_leave.values_at(day)
+        away = leave_cache[day]
+        free = [capacity[trip_id] - booked[trip_id] for trip_id in day_trips]
+
+        for stop_id, stop_subscriptions in stops.items():
+            riders = [
+                (sub_id, user_id)
+                for sub_id, user_id, start, end in stop_subscriptions
+                if start <= day <= end and sub_id not in away and (user_id, (route_id, day)) not in seated
+            ]
+            if not riders:
+                continue
+            plan.requested[(stop_id, day)] += len(riders)
+
+            whole = next((i for i, room in enumerate(free) if room >= len(riders)), None)
+            placements = []
+            if whole is not None:
+                placements.append((whole, riders))
+                free[whole] -= len(riders)
+            else:
+                remaining = riders
+                for i, room in enumerate(free):
+                    if room <= 0 or not remaining:
+                        continue
+                    placements.append((i, remaining[:room]))
+                    free[i] -= len(remaining[:room])
+                    remaining = remaining[room:]
+                for sub_id, _ in remaining:
+                    plan.unseated[sub_id].append(day)
+                if remaining:
+                    plan.shortfalls[(stop_id, day)] += len(remaining)
+
+            for i, group in placements:
+                trip_id = day_trips[i]
+                plan.trip_ids.add(trip_id)
+                plan.route_ids.add(route_id)
+                for _, user_id in group:
+                    plan.seats.append({
+                        "id": uuid4(),
+                        "trip_id": trip_id,
+                        "user_id": user_id,
+                        "seat_type": "SUBSCRIPTION",
+                        "pickup_stop_id": stop_id,
+                        "token_id": None,
+                    })
+    return plan
+
+
+def apply_plan(session: Session, plan: AssignmentPlan):
+    """Insert the planned seats and resync the trips' inventory. Returns the seats created."""
+    for start in range(0, len(plan.seats), ASSIGNMENT_INSERT_CHUNK):
+        session.exec(insert(SeatAllocation), params=plan.seats[start:start + ASSIGNMENT_INSERT_CHUNK])
+    if plan.trip_ids:
+        recount_inventory(session, plan.trip_ids)
+        invalidate_manifests(session, trip_ids=plan.trip_ids)
+        bump_versions(session, *inventory_keys(*plan.route_ids))
+    return len(plan.seats)
+
+
+def assign_seats(session: Session, date_from: date, date_to: date, route_ids=None):
+    """Seat every ACTIVE subscriber who has no seat yet. Returns the plan that was applied."""
+    plan = plan_assignments(session, date_from, date_to, route_ids=route_ids, lock=True)
+    apply_plan(session, plan)
+    return plan
+
+
+def capacity_report(plan: AssignmentPlan):
+    """Stops whose riders did not all get a seat, worst first."""
+    by_stop = defaultdict(list)
+    for (stop_id, day), short in plan.shortfalls.items():
+        by_stop[stop_id].append((day, short))
+    report = []
+    for stop_id, days in by_stop.items():
+        stop_name, route_id, route_name = plan.stops[stop_id]
+        days.sort()
+        report.append({
+            "stop_id": stop_id,
+            "stop_name": stop_name,
+            "route_id": route_id,
+            "route_name": route_name,
+            "riders": max(plan.requested[(stop_id, day)] for day, _ in days),
+            "max_unseated": max(short for _, short in days),
+            "short_days": len(days),
+            "first_short_date": days[0][0],
+        })
+    report.sort(key=lambda row: (-row["max_unseated"], -row["short_days"], row["stop_name"]))
+    return report
+
+
+def assign_upcoming_seats():
+    today = date.today()
+    with Session(engine) as session:
+        plan = assign_seats(session, today, today + timedelta(days=ASSIGNMENT_HORIZON_DAYS))
+        session.commit()
+    return len(plan.seats)
+
+
+def register_assignment_jobs(scheduler):
+    scheduler.add_job(
+        "assign_seats",
+        assign_upcoming_seats,
+        24 * 3600,
+        initial_delay=seconds_until_hour(ASSIGNMENT_HOUR),
+    )
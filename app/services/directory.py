@@ -0,0 +1,83 @@
+"""
+Route and stop directory.
+
+The directory (every route with its stops in sequence order) is built
+into an immutable DirectorySnapshot: the data, its JSON body encoded once,
+and a content hash that serves as both version and ETag. Every worker
+computes the same hash for the same data, so ETags stay valid across
+workers and restarts.
+
+A worker keeps its current snapshot in memory. A request costs one
+primary-key read of the `directory` resource version. The snapshot is
+rebuilt only when that version has moved, i.e. when a write that
+changes routes or stops called bump_versions(session, DIRECTORY_KEY).
+"""
+import hashlib
+import threading
+
+import orjson
+from sqlmodel import Session, select
+
+from app.core.metrics import record_cache
+from app.models.route import Route, RouteStop
+from app.services.versioning import DIRECTORY_KEY, get_versions
+
+
+class DirectorySnapshot:
+    __slots__ = ("source_version", "version", "etag", "routes", "body")
+
+    def __init__(self, source_version, routes):
+        self.source_version = source_version
+        self.routes = routes
+        content = orjson.dumps(routes, option=orjson.OPT_SORT_KEYS)
+        self.version = hashlib.blake2b(content, digest_size=8).hexdigest()
+        self.etag = f'W/"{self.version}"'
+        self.body = orjson.dumps({"version": self.version, "routes": routes})
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _build(session: Session, source_version):
+    routes = session.exec(select(Route).order_by(Route.route_name)).all()
+    stops = session.exec(
+        select(RouteStop).order_by(RouteStop.route_id, RouteStop.sequence_number)
+    ).all()
+    by_route = {}
+    for stop in stops:
+        by_route.setdefault(stop.route_id, []).append({
+            "id": stop.id,
+            "stop_name": stop.stop_name,
+            "sequence_number": stop.sequence_number,
+            "latitude": stop.latitude,
+            "longitude": stop.longitude,
+        })
+    data = [
+        {
+            "id": route.id,
+            "route_name": route.route_name,
+            "is_active": route.is_active,
+            "stops": by_route.get(route.id, []),
+        }
+        for route in routes
+    ]
+    # Round-trip so the snapshot only holds JSON types (str ids), frozen
+    # in the exact form clients see
+    return DirectorySnapshot(source_version, orjson.loads(orjson.dumps(data)))
+
+
+def get_directory(session: Session) -> DirectorySnapshot:
+    global _snapshot
+    (source_version,) = get_versions(session, DIRECTORY_KEY)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.source_version == source_version:
+        record_cache("directory", True)
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.source_version != source_version:
+            record_cache("directory", False)
+            snapshot = _build(session, source_version)
+            _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,298 @@
+"""
+Stop arrival predictions.
+
+Drivers report when the bus reaches each stop (`stop_arrival`). From that
+history the rebuild_segment_times job derives, for every stop, the median
+time to reach it from the previous stop on its route (from the trip's
+scheduled start, for the first stop), per weekday of the trip date and
+hour of its scheduled start. The aggregation is vectorised with NumPy:
+one query loads the window, a sort and a difference give every segment
+duration, and a grouped sort gives the medians. They are written to
+`segment_travel_time` and ETA_KEY is bumped.
+
+Each worker turns those rows into an EtaModel holding, per route, an
+array `cumulative[stop + 1, weekday, hour]` of seconds from the trip's
+start to each stop. Thin cells borrow from the same hour on other
+weekdays, then from the stop's overall median, then fall back to
+ETA_DEFAULT_SEGMENT_SECONDS. Answering an ETA is an array lookup, and
+the model is rebuilt only when the directory or ETA_KEY has moved.
+"""
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from app.core.metrics import record_cache
+from app.db.session import dialect_insert, engine
+from app.models.route import RouteStop
+from app.models.stop_arrival import SegmentTravelTime, StopArrival
+from app.models.trip import Trip
+from app.services.directory import get_directory
+from app.services.scheduler import seconds_until_hour
+from app.services.versioning import ETA_KEY, bump_versions, get_versions
+
+ETA_HISTORY_DAYS = int(os.getenv("ETA_HISTORY_DAYS", "56"))
+ETA_MIN_SAMPLES = int(os.getenv("ETA_MIN_SAMPLES", "3"))
+ETA_DEFAULT_SEGMENT_SECONDS = float(os.getenv("ETA_DEFAULT_SEGMENT_SECONDS", "240"))
+ETA_BUILD_HOUR = int(os.getenv("ETA_BUILD_HOUR", "3"))
+# Longer gaps are breakdowns or late reports, not travel times
+ETA_MAX_SEGMENT_SECONDS = 2 * 3600
+
+WEEKDAYS = 7
+HOURS = 24
+
+
+def _epoch_seconds(moments):
+    return np.array(moments, dtype="datetime64[us]").astype(np.int64) / 1e6
+
+
+def segment_medians(rows, positions):
+    """
+    Median seconds into each stop, per (stop, weekday, hour).
+
+    `rows` are (trip_id, route_stop_id, arrived_at, trip_date, start_time);
+    `positions` maps route_stop_id to the stop's index on its route.
+    Returns (route_stop_id, weekday, hour, seconds, samples) tuples.
+    """
+    rows = [row for row in rows if row[1] in positions]
+    if not rows:
+        return []
+    count = len(rows)
+    trip_codes = {}
+    stop_ids = list({row[1]: None for row in rows})
+    stop_codes = {stop_id: code for code, stop_id in enumerate(stop_ids)}
+
+    trip = np.fromiter((trip_codes.setdefault(row[0], len(trip_codes)) for row in rows), np.int64, count)
+    stop = np.fromiter((stop_codes[row[1]] for row in rows), np.int64, count)
+    position = np.fromiter((positions[row[1]] for row in rows), np.int64, count)
+    weekday = np.fromiter((row[3].weekday() for row in rows), np.int64, count)
+    hour = np.fromiter((row[4].hour for row in rows), np.int64, count)
+    arrived = _epoch_seconds([row[2] for row in rows])
+    started = _epoch_seconds([datetime.combine(row[3], row[4]) for row in rows])
+
+    order = np.lexsort((position, trip))
+    trip, stop, position, weekday, hour, arrived, started = (
+        column[order] for column in (trip, stop, position, weekday, hour, arrived, started)
+    )
+
+    # Consecutive stops reported by the same trip, plus each first stop
+    # measured from the scheduled start
+    follows = (trip[1:] == trip[:-1]) & (position[1:] == position[:-1] + 1)
+    first = position == 0
+    seg_stop = np.concatenate((stop[1:][follows], stop[first]))
+    seg_weekday = np.concatenate((weekday[1:][follows], weekday[first]))
+    seg_hour = np.concatenate((hour[1:][follows], hour[first]))
+    seconds = np.concatenate(((arrived[1:] - arrived[:-1])[follows], (arrived - started)[first]))
+
+    valid = (seconds > 0) & (seconds <= ETA_MAX_SEGMENT_SECONDS)
+    key = (seg_stop[valid] * WEEKDAYS + seg_weekday[valid]) * HOURS + seg_hour[valid]
+    seconds = seconds[valid]
+    if not len(key):
+        return []
+
+    order = np.lexsort((seconds, key))
+    key, seconds = key[order], seconds[order]
+    keys, starts, counts = np.unique(key, return_index=True, return_counts=True)
+    medians = (seconds[starts + (counts - 1) // 2] + seconds[starts + counts // 2]) / 2
+    stop_index, cell = np.divmod(keys, WEEKDAYS * HOURS)
+    cell_weekday, cell_hour = np.divmod(cell, HOURS)
+    return [
+        (stop_ids[s], w, h, m, c)
+        for s, w, h, m, c in zip(
+            stop_index.tolist(), cell_weekday.tolist(), cell_hour.tolist(), medians.tolist(), counts.tolist()
+        )
+    ]
+
+
+def _stop_positions(session: Session):
+    positions = {}
+    route_id = None
+    index = 0
+    for stop_id, stop_route_id in session.exec(
+        select(RouteStop.id, RouteStop.route_id).order_by(RouteStop.route_id, RouteStop.sequence_number)
+    ).all():
+        index = index + 1 if stop_route_id == route_id else 0
+        route_id = stop_route_id
+        positions[stop_id] = index
+    return positions
+
+
+def rebuild_segment_times():
+    since = date.today() - timedelta(days=ETA_HISTORY_DAYS)
+    with Session(engine) as session:
+        rows = session.exec(
+            select(StopArrival.trip_id, StopArrival.route_stop_id, StopArrival.arrived_at, Trip.trip_date, Trip.start_time)
+            .join(Trip, StopArrival.trip_id == Trip.id)
+            .where(Trip.trip_date >= since)
+        ).all()
+        medians = segment_medians(rows, _stop_positions(session))
+
+        session.exec(delete(SegmentTravelTime))
+        if medians:
+            session.exec(insert(SegmentTravelTime), params=[
+                {"route_stop_id": s, "weekday": w, "hour": h, "seconds": m, "samples": c}
+                for s, w, h, m, c in medians
+            ])
+        bump_versions(session, ETA_KEY)
+        session.commit()
+    return len(medians)
+
+
+def _fill(seconds, samples):
+    known = samples >= ETA_MIN_SAMPLES
+    weighted = np.where(samples > 0, seconds * samples, 0.0)
+
+    hour_samples = samples.sum(axis=1, keepdims=True)
+    hour_mean = np.divide(
+        weighted.sum(axis=1, keepdims=True), hour_samples,
+        out=np.zeros(hour_samples.shape), where=hour_samples > 0,
+    )
+    stop_samples = samples.sum(axis=(1, 2), keepdims=True)
+    stop_mean = np.divide(
+        weighted.sum(axis=(1, 2), keepdims=True), stop_samples,
+        out=np.zeros(stop_samples.shape), where=stop_samples > 0,
+    )
+    return np.where(
+        known, seconds,
+        np.where(
+            hour_samples >= ETA_MIN_SAMPLES, hour_mean,
+            np.where(stop_samples > 0, stop_mean, ETA_DEFAULT_SEGMENT_SECONDS),
+        ),
+    )
+
+
+class RouteEta:
+    __slots__ = ("stops", "positions", "cumulative")
+
+    def __init__(self, stops, cumulative):
+        self.stops = stops
+        self.positions = {stop["id"]: index for index, stop in enumerate(stops)}
+        self.cumulative = cumulative
+
+
+class EtaModel:
+    def __init__(self, key, routes, cells):
+        self.key = key
+        by_stop = {}
+        for stop_id, weekday, hour, seconds, samples in cells:
+            by_stop.setdefault(str(stop_id), []).append((weekday, hour, seconds, samples))
+
+        self.routes = {}
+        for route in routes:
+            stops = route["stops"]
+            seconds = np.zeros((len(stops), WEEKDAYS, HOURS))
+            samples = np.zeros((len(stops), WEEKDAYS, HOURS), dtype=np.int64)
+            for index, stop in enumerate(stops):
+                for weekday, hour, value, count in by_stop.get(stop["id"], ()):
+                    seconds[index, weekday, hour] = value
+                    samples[index, weekday, hour] = count
+            cumulative = np.concatenate(
+                (np.zeros((1, WEEKDAYS, HOURS)), np.cumsum(_fill(seconds, samples), axis=0))
+            )
+            self.routes[route["id"]] = RouteEta(stops, cumulative)
+
+    def offsets(self, route_id, weekday, hour):
+        """(stops, seconds from the trip's start to each stop) for the trip's bucket."""
+        route = self.routes.get(str(route_id))
+        if route is None:
+            return [], []
+        return route.stops, route.cumulative[1:, weekday, hour].tolist()
+
+
+_model = None
+_lock = threading.Lock()
+
+
+def get_eta_model(session: Session) -> EtaModel:
+    global _model
+    directory = get_directory(session)
+    (eta_version,) = get_versions(session, ETA_KEY)
+    key = (directory.version, eta_version)
+    model = _model
+    if model is not None and model.key == key:
+        record_cache("eta", True)
+        return model
+    with _lock:
+        model = _model
+        if model is None or model.key != key:
+            record_cache("eta", False)
+            cells = session.exec(select(
+                SegmentTravelTime.route_stop_id,
+                SegmentTravelTime.weekday,
+                SegmentTravelTime.hour,
+                SegmentTravelTime.seconds,
+                SegmentTravelTime.samples,
+            )).all()
+            model = EtaModel(key, directory.routes, cells)
+            _model = model
+    return model
+
+
+def trip_etas(session: Session, trip: Trip, now=None):
+    """Predicted arrival at each stop the trip has not reached yet."""
+    now = now or datetime.now()
+    stops, offsets = get_eta_model(session).offsets(
+        trip.route_id, trip.trip_date.weekday(), trip.start_time.hour
+    )
+    last = session.exec(
+        select(StopArrival.route_stop_id, StopArrival.arrived_at)
+        .where(StopArrival.trip_id == trip.id)
+        .order_by(StopArrival.arrived_at.desc())
+        .limit(1)
+    ).first()
+
+    positions = {stop["id"]: index for index, stop in enumerate(stops)}
+    if last is not None and str(last[0]) in positions:
+        reached = positions[str(last[0])]
+        anchor, base = last[1], offsets[reached]
+    else:
+        reached = -1
+        anchor, base = datetime.combine(trip.trip_date, trip.start_time), 0.0
+
+    upcoming = []
+    for index in range(reached + 1, len(stops)):
+        upcoming.append((stops[index], anchor + timedelta(seconds=offsets[index] - base)))
+    # A bus that should already be at its next stop is running late by
+    # that much everywhere downstream
+    if upcoming and trip.status == "STARTED" and upcoming[0][1] < now:
+        delay = now - upcoming[0][1]
+        upcoming = [(stop, eta + delay) for stop, eta in upcoming]
+    return last, upcoming
+
+
+def record_arrival(session: Session, trip: Trip, stop_id, arrived_at=None):
+    if trip.status != "STARTED":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Arrivals can only be reported for a started trip"
+        )
+    stop = session.get(RouteStop, stop_id)
+    if stop is None or stop.route_id != trip.route_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Stop is not on this trip's route")
+    arrived_at = arrived_at or datetime.now()
+    if arrived_at.tzinfo is not None:
+        arrived_at = arrived_at.astimezone().replace(tzinfo=None)
+
+    insert_statement = dialect_insert(session)
+    session.exec(
+        insert_statement(StopArrival)
+        .values(trip_id=trip.id, route_stop_id=stop_id, arrived_at=arrived_at)
+        .on_conflict_do_update(
+            index_elements=["trip_id", "route_stop_id"],
+            set_={"arrived_at": arrived_at},
+        )
+    )
+    return arrived_at
+
+
+def register_eta_jobs(scheduler):
+    scheduler.add_job(
+        "rebuild_segment_times",
+        rebuild_segment_times,
+        24 * 3600,
+        initial_delay=seconds_until_hour(ETA_BUILD_HOUR),
+    )
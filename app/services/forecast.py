@@ -0,0 +1,199 @@
+"""
+Demand forecasts per stop, weekday and departure slot.
+
+Each night the update_demand_forecast job reads the days after the last
+one it saw (at most FORECAST_HISTORY_DAYS back on the first run), up to
+yesterday. For every trip that ran, the riders at each stop of its route
+are its seat allocations picked up there (subscription and token seats
+alike), and trips in the same FORECAST_SLOT_MINUTES slot are added up.
+A stop where nobody boarded counts as zero riders. The newest
+observed_through in the table is the watermark for the next run.
+
+Every (stop, weekday, slot) keeps Holt's linear smoothing state: a level
+and a weekly trend, updated once per observed day with FORECAST_ALPHA and
+FORECAST_BETA. Keying by weekday and slot is the seasonal part: Monday
+07:30 is never smoothed with Friday 17:00. An update touches only the
+rows of the days it reads, so the nightly run costs one day of seats
+rather than the whole history. Seats changed on days already read are
+not revisited.
+
+The forecast for the coming week is level + trend, never below zero.
+"""
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session, func, select
+
+from app.db.session import dialect_insert, engine
+from app.models.demand_forecast import DemandForecast
+from app.models.route import RouteStop
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import Subscription
+from app.models.trip import Trip
+from app.services.directory import get_directory
+from app.services.scheduler import seconds_until_hour
+
+FORECAST_SLOT_MINUTES = int(os.getenv("FORECAST_SLOT_MINUTES", "30"))
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "182"))
+FORECAST_ALPHA = float(os.getenv("FORECAST_ALPHA", "0.3"))
+FORECAST_BETA = float(os.getenv("FORECAST_BETA", "0.1"))
+FORECAST_HOUR = int(os.getenv("FORECAST_HOUR", "4"))
+FORECAST_CHUNK_SIZE = int(os.getenv("FORECAST_CHUNK_SIZE", "1000"))
+
+
+def slot_of(start_time):
+    minutes = start_time.hour * 60 + start_time.minute
+    return minutes - minutes % FORECAST_SLOT_MINUTES
+
+
+def smooth(state, riders):
+    """Holt's linear update of (level, trend, samples) with one observation."""
+    level, trend, samples = state
+    if samples == 0:
+        return float(riders), 0.0, 1
+    new_level = FORECAST_ALPHA * riders + (1 - FORECAST_ALPHA) * (level + trend)
+    new_trend = FORECAST_BETA * (new_level - level) + (1 - FORECAST_BETA) * trend
+    return new_level, new_trend, samples + 1
+
+
+def daily_riders(session: Session, date_from, date_to):
+    """{day: {(stop_id, slot): riders}} for every stop of every route that ran a trip."""
+    route_stops = defaultdict(list)
+    for route_id, stop_id in session.exec(select(RouteStop.route_id, RouteStop.id)).all():
+        route_stops[route_id].append(stop_id)
+
+    riders = defaultdict(lambda: defaultdict(int))
+    trips = session.exec(
+        select(Trip.trip_date, Trip.start_time, Trip.route_id)
+        .where(Trip.trip_date >= date_from)
+        .where(Trip.trip_date <= date_to)
+        .distinct()
+    ).all()
+    for trip_date, start_time, route_id in trips:
+        for stop_id in route_stops.get(route_id, ()):
+            riders[trip_date][(stop_id, slot_of(start_time))] += 0
+
+    boarded = session.exec(
+        select(Trip.trip_date, Trip.start_time, SeatAllocation.pickup_stop_id, func.count(SeatAllocation.id))
+        .join(Trip, SeatAllocation.trip_id == Trip.id)
+        .where(Trip.trip_date >= date_from)
+        .where(Trip.trip_date <= date_to)
+        .group_by(Trip.trip_date, Trip.start_time, SeatAllocation.pickup_stop_id)
+    ).all()
+    for trip_date, start_time, stop_id, count in boarded:
+        riders[trip_date][(stop_id, slot_of(start_time))] += count
+    return riders
+
+
+def update_demand_forecast(today=None):
+    """Fold the days not seen yet into the forecasts. Returns rows written."""
+    today = today or date.today()
+    with Session(engine) as session:
+        seen = session.exec(select(func.max(DemandForecast.observed_through))).one()
+        date_from = seen + timedelta(days=1) if seen else today - timedelta(days=FORECAST_HISTORY_DAYS)
+        date_to = today - timedelta(days=1)
+        if date_from > date_to:
+            return 0
+
+        riders = daily_riders(session, date_from, date_to)
+        weekdays = {day.weekday() for day in riders}
+        states = {
+            (stop_id, weekday, slot): (level, trend, samples)
+            for stop_id, weekday, slot, level, trend, samples in session.exec(
+                select(
+                    DemandForecast.route_stop_id, DemandForecast.weekday, DemandForecast.slot,
+                    DemandForecast.level, DemandForecast.trend, DemandForecast.samples,
+                ).where(DemandForecast.weekday.in_(weekdays))
+            ).all()
+        } if weekdays else {}
+
+        changed = set()
+        for day in sorted(riders):
+            weekday = day.weekday()
+            for (stop_id, slot), count in riders[day].items():
+                key = (stop_id, weekday, slot)
+                states[key] = smooth(states.get(key, (0.0, 0.0, 0)), count)
+                changed.add(key)
+
+        now = datetime.utcnow()
+        rows = []
+        for stop_id, weekday, slot in changed:
+            level, trend, samples = states[(stop_id, weekday, slot)]
+            rows.append({
+                "route_stop_id": stop_id, "weekday": weekday, "slot": slot,
+                "level": level, "trend": trend, "samples": samples,
+                "observed_through": date_to, "updated_at": now,
+            })
+        insert = dialect_insert(session)
+        for start in range(0, len(rows), FORECAST_CHUNK_SIZE):
+            statement = insert(DemandForecast).values(rows[start:start + FORECAST_CHUNK_SIZE])
+            session.exec(statement.on_conflict_do_update(
+                index_elements=["route_stop_id", "weekday", "slot"],
+                set_={
+                    name: getattr(statement.excluded, name)
+                    for name in ("level", "trend", "samples", "observed_through", "updated_at")
+                },
+            ))
+        session.commit()
+    return len(rows)
+
+
+def demand_forecast(session: Session, route_id=None, weekday=None):
+    """
+    Next week's expected riders per stop, weekday and slot, in route and
+    stop order, with the stop's pending subscription requests.
+    """
+    stops = {}
+    for route in get_directory(session).routes:
+        if route_id is not None and route["id"] != str(route_id):
+            continue
+        for stop in route["stops"]:
+            stops[stop["id"]] = (route, stop)
+    if not stops:
+        return []
+
+    pending = dict(session.exec(
+        select(Subscription.stop_name, func.count(Subscription.id))
+        .where(Subscription.status == "PENDING")
+        .group_by(Subscription.stop_name)
+    ).all())
+    statement = select(
+        DemandForecast.route_stop_id, DemandForecast.weekday, DemandForecast.slot,
+        DemandForecast.level, DemandForecast.trend, DemandForecast.samples,
+    )
+    if route_id is not None:
+        statement = statement.join(RouteStop, DemandForecast.route_stop_id == RouteStop.id).where(RouteStop.route_id == route_id)
+    if weekday is not None:
+        statement = statement.where(DemandForecast.weekday == weekday)
+
+    rows = []
+    for stop_id, day, slot, level, trend, samples in session.exec(statement).all():
+        found = stops.get(str(stop_id))
+        if found is None:
+            continue
+        route, stop = found
+        rows.append({
+            "route_id": route["id"],
+            "route_name": route["route_name"],
+            "stop_id": stop["id"],
+            "stop_name": stop["stop_name"],
+            "sequence_number": stop["sequence_number"],
+            "weekday": day,
+            "start_time": f"{slot // 60:02d}:{slot % 60:02d}",
+            "expected_riders": round(max(level + trend, 0.0), 2),
+            "trend": round(trend, 3),
+            "samples": samples,
+            "pending_requests": pending.get(stop["stop_name"], 0),
+        })
+    rows.sort(key=lambda row: (row["route_name"], row["weekday"], row["start_time"], row["sequence_number"]))
+    return rows
+
+
+def register_forecast_jobs(scheduler):
+    scheduler.add_job(
+        "update_demand_forecast",
+        update_demand_forecast,
+        24 * 3600,
+        initial_delay=seconds_until_hour(FORECAST_HOUR),
+    )
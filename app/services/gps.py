@@ -0,0 +1,242 @@
+"""
+Live vehicle positions.
+
+Driver devices post pings in batches. A batch is handled in memory only:
+- the vehicle's trail, a ring buffer of its last GPS_TRAIL_SIZE
+  positions, is extended; the newest entry is its live position;
+- the pings are appended to a pending list;
+- the newest position is published once per batch on the push channel
+  `vehicle:<id>`.
+
+A flusher thread moves the pending list to `vehicle_position` every
+GPS_FLUSH_SECONDS, or as soon as a full chunk is waiting, in bulk INSERTs
+of GPS_INSERT_CHUNK rows, so thousands of pings per second cost a few
+statements instead of a commit each. Pending rows are per worker, so
+every worker runs its own flusher, whether or not it runs the scheduler.
+If the database is unavailable, the rows are kept and retried up to
+GPS_MAX_PENDING; beyond that the oldest are dropped. Rows still pending
+at shutdown are written before the flusher stops.
+
+The vehicle -> STARTED trip mapping that authorizes a device is cached
+for GPS_TRIP_CACHE_SECONDS. Trip status changes drop the entry.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from app.core.security import has_role
+from app.core.metrics import gps_pending_positions, gps_pings_total, gps_positions_dropped_total
+from app.db.session import engine
+from app.models.profile import DriverProfile
+from app.models.trip import Trip
+from app.models.vehicle_position import VehiclePosition
+from app.services.push import hub
+
+GPS_TRAIL_SIZE = int(os.getenv("GPS_TRAIL_SIZE", "60"))
+GPS_FLUSH_SECONDS = float(os.getenv("GPS_FLUSH_SECONDS", "2"))
+GPS_INSERT_CHUNK = int(os.getenv("GPS_INSERT_CHUNK", "1000"))
+GPS_MAX_PENDING = int(os.getenv("GPS_MAX_PENDING", "200000"))
+GPS_TRIP_CACHE_SECONDS = float(os.getenv("GPS_TRIP_CACHE_SECONDS", "30"))
+# Pings stamped further from the server clock than this are rejected
+GPS_MAX_CLOCK_SKEW = timedelta(minutes=5)
+GPS_MAX_AGE = timedelta(hours=6)
+
+logger = logging.getLogger(__name__)
+
+POSITION_FIELDS = ("vehicle_id", "trip_id", "latitude", "longitude", "speed_kmh", "heading", "recorded_at")
+
+
+def vehicle_channel(vehicle_id):
+    return f"vehicle:{vehicle_id}"
+
+
+def _utc_naive(moment):
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+class PositionStore:
+    def __init__(self, trail_size=GPS_TRAIL_SIZE, max_pending=GPS_MAX_PENDING):
+        self.trail_size = trail_size
+        self.max_pending = max_pending
+        self._trails = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        gps_pending_positions.set_function(lambda: len(self._pending))
+
+    def ingest(self, vehicle_id, trip_id, pings):
+        """Buffer a batch of pings. Returns (accepted, rejected)."""
+        now = datetime.utcnow()
+        rows = []
+        for ping in pings:
+            recorded_at = _utc_naive(ping.recorded_at)
+            if recorded_at > now + GPS_MAX_CLOCK_SKEW or recorded_at < now - GPS_MAX_AGE:
+                continue
+            rows.append({
+                "vehicle_id": vehicle_id,
+                "trip_id": trip_id,
+                "latitude": ping.latitude,
+                "longitude": ping.longitude,
+                "speed_kmh": ping.speed_kmh,
+                "heading": ping.heading,
+                "recorded_at": recorded_at,
+            })
+        rejected = len(pings) - len(rows)
+        if rejected:
+            gps_pings_total.labels("rejected").inc(rejected)
+        if not rows:
+            return 0, rejected
+        rows.sort(key=lambda row: row["recorded_at"])
+
+        with self._lock:
+            trail = self._trails.get(vehicle_id)
+            if trail is None:
+                trail = self._trails[vehicle_id] = deque(maxlen=self.trail_size)
+            previous = trail[-1] if trail else None
+            # Late pings still go to history, but never move the bus backwards
+            for row in rows:
+                if not trail or row["recorded_at"] >= trail[-1]["recorded_at"]:
+                    trail.append(row)
+            self._pending.extend(rows)
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+            chunk_ready = len(self._pending) >= GPS_INSERT_CHUNK
+            latest = trail[-1]
+
+        if chunk_ready:
+            self._wake.set()
+
+        if overflow > 0:
+            gps_positions_dropped_total.inc(overflow)
+        gps_pings_total.labels("accepted").inc(len(rows))
+        if latest is not previous:
+            hub.publish(vehicle_channel(vehicle_id), latest)
+        return len(rows), rejected
+
+    def latest(self, vehicle_id=None):
+        with self._lock:
+            if vehicle_id is not None:
+                trail = self._trails.get(vehicle_id)
+                return trail[-1] if trail else None
+            return [trail[-1] for trail in self._trails.values() if trail]
+
+    def trail(self, vehicle_id):
+        with self._lock:
+            return list(self._trails.get(vehicle_id, ()))
+
+    def flush(self):
+        """Write pending pings to vehicle_position. Returns the number written."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            with Session(engine) as session:
+                for start in range(0, len(rows), GPS_INSERT_CHUNK):
+                    session.exec(insert(VehiclePosition), params=rows[start:start + GPS_INSERT_CHUNK])
+                session.commit()
+        except Exception:
+            with self._lock:
+                # Older rows go back in front; the cap still applies
+                self._pending[:0] = rows
+                overflow = len(self._pending) - self.max_pending
+                if overflow > 0:
+                    del self._pending[:overflow]
+            if overflow > 0:
+                gps_positions_dropped_total.inc(overflow)
+            raise
+        return len(rows)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="gps-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait(GPS_FLUSH_SECONDS)
+            self._wake.clear()
+            stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing GPS positions failed")
+            if stopping:
+                return
+
+
+position_store = PositionStore()
+
+
+_trip_cache = {}
+
+
+def active_trip(session: Session, vehicle_id):
+    """(trip_id, driver user_id) of the vehicle's STARTED trip, or None."""
+    cached = _trip_cache.get(vehicle_id)
+    now = time.monotonic()
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    row = session.exec(
+        select(Trip.id, DriverProfile.user_id)
+        .join(DriverProfile, Trip.driver_profile_id == DriverProfile.id)
+        .where(Trip.vehicle_id == vehicle_id)
+        .where(Trip.status == "STARTED")
+        .order_by(Trip.trip_date.desc(), Trip.start_time.desc())
+    ).first()
+    result = tuple(row) if row else None
+    _trip_cache[vehicle_id] = (now + GPS_TRIP_CACHE_SECONDS, result)
+    return result
+
+
+def forget_vehicle(vehicle_id):
+    _trip_cache.pop(vehicle_id, None)
+
+
+def ingest_pings(session: Session, user_id, vehicle_id, pings):
+    trip = active_trip(session, vehicle_id)
+    if trip is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Vehicle has no started trip"
+        )
+    trip_id, driver_user_id = trip
+    if driver_user_id != user_id and not has_role(session, user_id, "TO"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only the vehicle's current driver or the Transport Officer can report its position"
+        )
+    return position_store.ingest(vehicle_id, trip_id, pings)
+
+
+def last_recorded_position(session: Session, vehicle_id):
+    """Newest stored position, for vehicles this worker has not heard from."""
+    row = session.exec(
+        select(*(getattr(VehiclePosition, field) for field in POSITION_FIELDS))
+        .where(VehiclePosition.vehicle_id == vehicle_id)
+        .order_by(VehiclePosition.recorded_at.desc())
+        .limit(1)
+    ).first()
+    return dict(zip(POSITION_FIELDS, row)) if row else None
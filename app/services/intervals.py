@@ -0,0 +1,73 @@
+"""
+Static interval index.
+
+Intervals are closed `[start, end]` ranges of anything orderable (dates,
+datetimes, numbers), each carrying a value. They are kept sorted by start
+in an implicit balanced tree: the middle of every slice is a node, and
+`_max_end` stores the largest end in the node's subtree. A search skips
+any subtree that ends before the query range or starts after it, so
+finding the k intervals that overlap a range costs O(log n + k) after an
+O(n log n) build.
+"""
+
+
+class IntervalIndex:
+    def __init__(self, intervals=()):
+        items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in items]
+        self._ends = [item[1] for item in items]
+        self._values = [item[2] for item in items]
+        self._max_end = [None] * len(items)
+        self._build(0, len(items))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def _build(self, lo, hi):
+        # Iterative post-order so deep indexes cannot hit the recursion limit
+        stack = [(lo, hi, False)]
+        while stack:
+            lo, hi, ready = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if not ready:
+                stack.append((lo, hi, True))
+                stack.append((lo, mid, False))
+                stack.append((mid + 1, hi, False))
+                continue
+            best = self._ends[mid]
+            for child in (self._node(lo, mid), self._node(mid + 1, hi)):
+                if child is not None and self._max_end[child] > best:
+                    best = self._max_end[child]
+            self._max_end[mid] = best
+
+    @staticmethod
+    def _node(lo, hi):
+        return (lo + hi) // 2 if lo < hi else None
+
+    def overlapping(self, start, end=None):
+        """(start, end, value) of every interval that intersects [start, end]."""
+        if end is None:
+            end = start
+        found = []
+        stack = [(0, len(self._starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] < start:
+                continue  # everything below ends too early
+            stack.append((lo, mid))
+            if self._starts[mid] <= end:
+                if self._ends[mid] >= start:
+                    found.append((self._starts[mid], self._ends[mid], self._values[mid]))
+                stack.append((mid + 1, hi))
+        return found
+
+    def values_at(self, point):
+        return {value for _, _, value in self.overlapping(point, point)}
+
+    def any_overlap(self, start, end=None):
+        return bool(self.overlapping(start, end))
@@ -0,0 +1,156 @@
+"""
+Leave-aware seat handling for subscriptions.
+
+Filing a leave deletes the subscriber's SUBSCRIPTION seats on the trips
+inside the leave range and gives them back to the trip inventory, where
+token buyers can take them. The released (trip, stop) pairs are kept in
+`leave_seat_release`, so cancelling the leave takes back exactly those
+seats while they are still free. Only trips in the affected date range
+are touched; nothing else is recomputed.
+
+`load_leave_index` builds an IntervalIndex over every leave overlapping a
+date window. It answers "who is on leave on day d" for the manifest
+builder and the seat assignment solver.
+"""
+from collections import Counter
+from datetime import date
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import LeaveSeatRelease, Subscription, SubscriptionLeave
+from app.models.trip import Trip
+from app.services.intervals import IntervalIndex
+from app.services.seats import release_seats, reserve_seat
+from app.services.versioning import bump_versions, inventory_keys
+
+
+def load_leave_index(session: Session, date_from: date, date_to: date, subscription_ids=None):
+    """IntervalIndex of leaves overlapping [date_from, date_to], valued by subscription id."""
+    statement = (
+        select(SubscriptionLeave.from_date, SubscriptionLeave.to_date, SubscriptionLeave.subscription_id)
+        .where(SubscriptionLeave.from_date <= date_to)
+        .where(SubscriptionLeave.to_date >= date_from)
+    )
+    if subscription_ids is not None:
+        statement = statement.where(SubscriptionLeave.subscription_id.in_(list(subscription_ids)))
+    return IntervalIndex(session.exec(statement).all())
+
+
+def file_leave(session: Session, subscription: Subscription, leave: SubscriptionLeave):
+    """Validate and store a leave, releasing its seats. Returns released seat count."""
+    # Row lock: concurrent filings for the subscription check overlaps in turn
+    session.refresh(subscription, with_for_update=True)
+    if subscription.status != "ACTIVE":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Leave can only be filed for an active subscription"
+        )
+    if leave.from_date > leave.to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date cannot be after to_date"
+        )
+    if leave.to_date < date.today():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Leave cannot end in the past"
+        )
+    if (subscription.start_date and leave.from_date < subscription.start_date) or (
+        subscription.end_date and leave.to_date > subscription.end_date
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Leave must fall within the subscription period"
+        )
+
+    overlapping = session.exec(
+        select(SubscriptionLeave.id)
+        .where(SubscriptionLeave.subscription_id == subscription.id)
+        .where(SubscriptionLeave.from_date <= leave.to_date)
+        .where(SubscriptionLeave.to_date >= leave.from_date)
+        .limit(1)
+    ).first()
+    if overlapping is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Leave overlaps an existing leave"
+        )
+
+    session.add(leave)
+    session.flush()
+
+    # Only upcoming trips inside the leave give seats back
+    first_day = max(leave.from_date, date.today())
+    released = session.exec(
+        delete(SeatAllocation)
+        .where(SeatAllocation.user_id == subscription.user_id)
+        .where(SeatAllocation.seat_type == "SUBSCRIPTION")
+        .where(SeatAllocation.trip_id.in_(
+            select(Trip.id)
+            .where(Trip.trip_date >= first_day)
+            .where(Trip.trip_date <= leave.to_date)
+        ))
+        .returning(SeatAllocation.trip_id, SeatAllocation.pickup_stop_id)
+    ).all()
+
+    if released:
+        session.add_all([
+            LeaveSeatRelease(leave_id=leave.id, trip_id=trip_id, pickup_stop_id=stop_id)
+            for trip_id, stop_id in released
+        ])
+        per_trip = Counter(trip_id for trip_id, _ in released)
+        release_seats(session, per_trip)
+        _bump_routes(session, per_trip)
+    return len(released)
+
+
+def cancel_leave(session: Session, subscription: Subscription, leave: SubscriptionLeave):
+    """
+    Delete a leave and take back its seats on trips that have not run yet.
+    Returns (restored count, trip ids whose seat was sold in the meantime).
+    """
+    # Same row lock as file_leave: concurrent cancellations of the leave run
+    # in turn, and only the first one still finds it to restore its seats
+    session.refresh(subscription, with_for_update=True)
+    still_filed = session.exec(
+        select(SubscriptionLeave.id).where(SubscriptionLeave.id == leave.id)
+    ).first()
+    if still_filed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Leave not found")
+
+    releases = session.exec(
+        select(LeaveSeatRelease.trip_id, LeaveSeatRelease.pickup_stop_id)
+        .join(Trip, Trip.id == LeaveSeatRelease.trip_id)
+        .where(LeaveSeatRelease.leave_id == leave.id)
+        .where(Trip.trip_date >= date.today())
+    ).all()
+
+    restored = []
+    unrestored = []
+    for trip_id, stop_id in releases:
+        if reserve_seat(session, trip_id):
+            session.add(SeatAllocation(
+                trip_id=trip_id,
+                user_id=subscription.user_id,
+                seat_type="SUBSCRIPTION",
+                pickup_stop_id=stop_id,
+            ))
+            restored.append(trip_id)
+        else:
+            unrestored.append(trip_id)
+
+    session.exec(delete(LeaveSeatRelease).where(LeaveSeatRelease.leave_id == leave.id))
+    session.delete(leave)
+    if restored:
+        _bump_routes(session, restored)
+    return len(restored), unrestored
+
+
+def _bump_routes(session: Session, trip_ids):
+    route_ids = session.exec(
+        select(Trip.route_id).where(Trip.id.in_(list(trip_ids))).distinct()
+    ).all()
+    bump_versions(session, *inventory_keys(*route_ids))
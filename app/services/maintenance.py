@@ -0,0 +1,101 @@
+"""
+Set-based maintenance jobs run by the scheduler.
+
+Each job works in chunks of MAINTENANCE_CHUNK_SIZE rows, one short
+transaction per chunk, so it never holds locks on a large share of a
+table and stops cleanly between chunks.
+"""
+import os
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import Subscription
+from app.models.token import Token
+from app.models.trip import Trip
+from app.services.manifests import invalidate_manifests
+from app.services.notifications import notifier
+from app.services.seats import release_seats
+from app.services.versioning import bump_versions, inventory_keys, subscription_key
+
+MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+MAINTENANCE_CHUNK_SIZE = int(os.getenv("MAINTENANCE_CHUNK_SIZE", "500"))
+
+
+def expire_tokens(chunk_size=MAINTENANCE_CHUNK_SIZE):
+    """ACTIVE tokens whose travel date has passed become EXPIRED."""
+    today = date.today()
+    total = 0
+    while True:
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Token.id)
+                .where(Token.status == "ACTIVE")
+                .where(Token.travel_date < today)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return total
+            # The trips already ran, so their seat allocations stay as history
+            session.exec(update(Token).where(Token.id.in_(ids)).values(status="EXPIRED"))
+            session.commit()
+        total += len(ids)
+
+
+def expire_subscriptions(chunk_size=MAINTENANCE_CHUNK_SIZE):
+    """
+    ACTIVE/PENDING subscriptions past their end date become INACTIVE and
+    give back any seats they still hold on upcoming trips.
+    """
+    today = date.today()
+    total = 0
+    while True:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Subscription.id, Subscription.user_id)
+                .where(Subscription.status.in_(["ACTIVE", "PENDING"]))
+                .where(Subscription.end_date < today)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                return total
+            ids = [row[0] for row in rows]
+            user_ids = [row[1] for row in rows]
+
+            session.exec(
+                update(Subscription).where(Subscription.id.in_(ids)).values(status="INACTIVE")
+            )
+            released = session.exec(
+                delete(SeatAllocation)
+                .where(SeatAllocation.user_id.in_(user_ids))
+                .where(SeatAllocation.seat_type == "SUBSCRIPTION")
+                .where(SeatAllocation.trip_id.in_(select(Trip.id).where(Trip.trip_date >= today)))
+                .returning(SeatAllocation.trip_id, SeatAllocation.user_id)
+            ).all()
+
+            keys = [subscription_key(user_id) for user_id in user_ids]
+            if released:
+                per_trip = Counter(row[0] for row in released)
+                release_seats(session, per_trip)
+                invalidate_manifests(session, trip_ids=per_trip)
+                route_ids = session.exec(
+                    select(Trip.route_id).where(Trip.id.in_(list(per_trip))).distinct()
+                ).all()
+                keys += inventory_keys(*route_ids)
+            bump_versions(session, *keys)
+            session.commit()
+        if released:
+            notifier.notify(
+                {row[1] for row in released},
+                "Your subscription has ended and your seats on upcoming trips were released.",
+            )
+        total += len(ids)
+
+
+def register_maintenance_jobs(scheduler):
+    scheduler.add_job("expire_tokens", expire_tokens, MAINTENANCE_INTERVAL_SECONDS, initial_delay=30)
+    scheduler.add_job("expire_subscriptions", expire_subscriptions, MAINTENANCE_INTERVAL_SECONDS, initial_delay=30)
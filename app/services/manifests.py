@@ -0,0 +1,208 @@
+"""
+Precomputed rider manifests.
+
+A manifest lists, stop by stop in sequence order, who boards a trip: the
+subscribers the seat assignment gave a SUBSCRIPTION seat on it, plus
+holders of tokens booked on it. It is stored per trip in `trip_manifest`
+as a ready-encoded JSON document, so the driver endpoint is one
+primary-key read with no joins and no re-encoding.
+
+The builder works on batches of trips. It loads the stops, subscription
+seats and token seats of the whole batch in three queries and groups the
+riders by trip and pickup stop. Leaves and subscription expiry delete
+seats, so the seat rows alone say who rides.
+
+Manifests are rebuilt nightly for the next MANIFEST_HORIZON_DAYS days.
+Writes that change riders call invalidate_manifests(), which drops the
+affected rows; the next read rebuilds that one trip.
+"""
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+import orjson
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.db.session import dialect_insert, engine
+from app.models.route import RouteStop
+from app.models.seat_allocation import SeatAllocation
+from app.models.token import Token
+from app.models.trip import Trip
+from app.models.trip_manifest import TripManifest
+from app.models.user import User
+from app.services.scheduler import seconds_until_hour
+
+MANIFEST_HORIZON_DAYS = int(os.getenv("MANIFEST_HORIZON_DAYS", "7"))
+MANIFEST_BUILD_HOUR = int(os.getenv("MANIFEST_BUILD_HOUR", "2"))
+MANIFEST_BATCH_SIZE = int(os.getenv("MANIFEST_BATCH_SIZE", "200"))
+
+BOARDING_TOKEN_STATUSES = ("ACTIVE", "USED")
+
+
+def build_manifests(session: Session, trip_ids):
+    """Build and upsert the manifests of the given trips. Returns the number built."""
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return 0
+    trips = session.exec(
+        select(Trip.id, Trip.route_id, Trip.trip_date).where(Trip.id.in_(trip_ids))
+    ).all()
+    if not trips:
+        return 0
+    route_ids = {route_id for _, route_id, _ in trips}
+
+    stops_by_route = defaultdict(list)
+    for stop_id, route_id, stop_name, sequence in session.exec(
+        select(RouteStop.id, RouteStop.route_id, RouteStop.stop_name, RouteStop.sequence_number)
+        .where(RouteStop.route_id.in_(route_ids))
+        .order_by(RouteStop.sequence_number)
+    ).all():
+        stops_by_route[route_id].append((stop_id, stop_name, sequence))
+
+    # Subscribers ride the trips the seat assignment gave them a seat on;
+    # leaves and expiry take those seats away again
+    subscribers_by_trip = defaultdict(list)
+    for trip_id, stop_id, user_id, full_name in session.exec(
+        select(
+            SeatAllocation.trip_id,
+            SeatAllocation.pickup_stop_id,
+            SeatAllocation.user_id,
+            User.full_name,
+        )
+        .join(User, SeatAllocation.user_id == User.id)
+        .where(SeatAllocation.trip_id.in_(trip_ids))
+        .where(SeatAllocation.seat_type == "SUBSCRIPTION")
+        .order_by(User.full_name, SeatAllocation.user_id)
+    ).all():
+        subscribers_by_trip[trip_id].append((stop_id, {"user_id": user_id, "name": full_name}))
+
+    tokens_by_trip = defaultdict(list)
+    for trip_id, stop_id, token_id, user_id, full_name, consumer_email in session.exec(
+        select(
+            SeatAllocation.trip_id,
+            SeatAllocation.pickup_stop_id,
+            Token.id,
+            Token.user_id,
+            User.full_name,
+            Token.consumer_email,
+        )
+        .join(Token, SeatAllocation.token_id == Token.id)
+        .join(User, Token.user_id == User.id)
+        .where(SeatAllocation.trip_id.in_(trip_ids))
+        .where(Token.status.in_(BOARDING_TOKEN_STATUSES))
+        .order_by(Token.id)
+    ).all():
+        tokens_by_trip[trip_id].append((stop_id, {
+            "token_id": token_id,
+            "user_id": user_id,
+            "name": full_name,
+            "consumer_email": consumer_email,
+        }))
+
+    now = datetime.utcnow()
+    rows = []
+    for trip_id, route_id, trip_date in trips:
+        stops = {
+            stop_id: {
+                "stop_id": stop_id,
+                "stop_name": stop_name,
+                "sequence_number": sequence,
+                "subscribers": [],
+                "tokens": [],
+            }
+            for stop_id, stop_name, sequence in stops_by_route[route_id]
+        }
+        for stop_id, rider in subscribers_by_trip[trip_id]:
+            if stop_id in stops:
+                stops[stop_id]["subscribers"].append(rider)
+        for stop_id, rider in tokens_by_trip[trip_id]:
+            if stop_id in stops:
+                stops[stop_id]["tokens"].append(rider)
+
+        rider_count = len(subscribers_by_trip[trip_id]) + len(tokens_by_trip[trip_id])
+        body = orjson.dumps({
+            "trip_id": trip_id,
+            "route_id": route_id,
+            "trip_date": trip_date,
+            "built_at": now,
+            "rider_count": rider_count,
+            "stops": list(stops.values()),
+        }).decode()
+        rows.append({"trip_id": trip_id, "rider_count": rider_count, "body": body, "built_at": now})
+
+    insert = dialect_insert(session)
+    statement = insert(TripManifest).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["trip_id"],
+        set_={
+            "rider_count": statement.excluded.rider_count,
+            "body": statement.excluded.body,
+            "built_at": statement.excluded.built_at,
+        },
+    )
+    session.exec(statement)
+    return len(rows)
+
+
+def invalidate_manifests(session: Session, trip_ids=None, route_ids=None, date_from=None, date_to=None):
+    """Drop stored manifests of the given trips, or of a route's trips in a date range."""
+    if trip_ids is None and route_ids is None:
+        # An unfiltered call would drop every stored manifest
+        raise ValueError("invalidate_manifests needs trip_ids or route_ids")
+    statement = delete(TripManifest)
+    if trip_ids is not None:
+        statement = statement.where(TripManifest.trip_id.in_(list(trip_ids)))
+    if route_ids is not None:
+        trips = select(Trip.id).where(Trip.route_id.in_(list(route_ids)))
+        if date_from is not None:
+            trips = trips.where(Trip.trip_date >= date_from)
+        if date_to is not None:
+            trips = trips.where(Trip.trip_date <= date_to)
+        statement = statement.where(TripManifest.trip_id.in_(trips))
+    session.exec(statement)
+
+
+def trip_rider_ids(session: Session, trip_id):
+    """User ids of everyone boarding the trip, read from its manifest."""
+    manifest = session.get(TripManifest, trip_id)
+    if manifest is None:
+        build_manifests(session, [trip_id])
+        session.commit()
+        manifest = session.get(TripManifest, trip_id)
+    if manifest is None:
+        return []
+    document = orjson.loads(manifest.body)
+    return [
+        UUID(rider["user_id"])
+        for stop in document["stops"]
+        for rider in stop["subscribers"] + stop["tokens"]
+    ]
+
+
+def rebuild_manifests(horizon_days=MANIFEST_HORIZON_DAYS, batch_size=MANIFEST_BATCH_SIZE):
+    """Rebuild the manifests of every trip from today to the horizon."""
+    today = date.today()
+    with Session(engine) as session:
+        trip_ids = session.exec(
+            select(Trip.id)
+            .where(Trip.trip_date >= today)
+            .where(Trip.trip_date <= today + timedelta(days=horizon_days))
+            .order_by(Trip.trip_date, Trip.route_id)
+        ).all()
+    total = 0
+    for start in range(0, len(trip_ids), batch_size):
+        with Session(engine) as session:
+            total += build_manifests(session, trip_ids[start:start + batch_size])
+            session.commit()
+    return total
+
+
+def register_manifest_jobs(scheduler):
+    scheduler.add_job(
+        "rebuild_manifests",
+        rebuild_manifests,
+        24 * 3600,
+        initial_delay=seconds_until_hour(MANIFEST_BUILD_HOUR),
+    )
@@ -0,0 +1,166 @@
+"""
+Notification fan-out.
+
+Handlers call `notifier.notify(user_ids, message)` after their own commit.
+The event goes onto an in-process queue and the handler returns at once.
+A writer thread drains the queue in batches of up to NOTIFY_BATCH_SIZE
+events. Each batch is written in one transaction: one multi-row INSERT of
+every recipient's notification, and one upsert that adds each recipient's
+new rows to `notification_counter`. The unread badge is then a single
+primary-key read.
+
+Once committed, each batch is also published to the recipients' push
+channels, waking their open event streams and long-polls.
+
+Events still queued at shutdown are written before the writer stops. If
+the writer is not running (scripts, tests), notify() writes inline.
+"""
+import logging
+import os
+import queue
+import threading
+from collections import Counter
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import case, insert, update
+from sqlmodel import Session
+
+from app.core.metrics import notification_queue_depth, notifications_written_total
+from app.db.session import dialect_insert, engine
+from app.models.notification import Notification, NotificationCounter
+from app.services.push import hub, user_channel
+
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "200"))
+# Longest a batch may take from its timestamp to its commit; long-polls
+# look this far back for rows another worker committed late
+NOTIFY_POLL_GRACE_SECONDS = float(os.getenv("NOTIFY_POLL_GRACE_SECONDS", "5"))
+# Rows per INSERT statement, below every driver's bind-parameter limit
+NOTIFY_INSERT_CHUNK = 500
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class NotificationDispatcher:
+    def __init__(self, batch_size=NOTIFY_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._listeners = []
+        notification_queue_depth.set_function(self._queue.qsize)
+
+    def add_listener(self, callback):
+        """Call `callback(rows)` with every batch of notification rows once committed."""
+        self._listeners.append(callback)
+
+    def notify(self, user_ids, message):
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return
+        event = (user_ids, message)
+        if self._thread is None:
+            self._write([event])
+        else:
+            self._queue.put(event)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="notification-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            event = self._queue.get()
+            while True:
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception:
+                    logger.exception("Writing %d notification events failed", len(batch))
+
+    def _write(self, events):
+        # Stamped when written rather than when queued, so a backlog in the
+        # queue cannot push rows further behind than the commit itself
+        created_at = datetime.utcnow()
+        rows = [
+            {"id": uuid4(), "user_id": user_id, "message": message, "is_read": False, "created_at": created_at}
+            for user_ids, message in events
+            for user_id in user_ids
+        ]
+        per_user = Counter(row["user_id"] for row in rows)
+        with Session(engine) as session:
+            for start in range(0, len(rows), NOTIFY_INSERT_CHUNK):
+                session.exec(insert(Notification).values(rows[start:start + NOTIFY_INSERT_CHUNK]))
+            upsert = dialect_insert(session)
+            # Sorted so concurrent writers lock counter rows in the same order
+            statement = upsert(NotificationCounter).values(
+                [{"user_id": user_id, "unread": count} for user_id, count in sorted(per_user.items(), key=lambda item: str(item[0]))]
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={"unread": NotificationCounter.unread + statement.excluded.unread},
+            )
+            session.exec(statement)
+            session.commit()
+        notifications_written_total.inc(len(rows))
+        for callback in self._listeners:
+            try:
+                callback(rows)
+            except Exception:
+                logger.exception("Notification listener failed")
+
+
+def _push_rows(rows):
+    hub.publish_many((user_channel(row["user_id"]), row) for row in rows)
+
+
+notifier = NotificationDispatcher()
+notifier.add_listener(_push_rows)
+
+
+def mark_read(session: Session, user_id, notification_ids=None):
+    """
+    Mark the user's unread notifications (all, or the given ids) as read
+    with one UPDATE and take them off the counter. Does not commit.
+    """
+    statement = (
+        update(Notification)
+        .where(Notification.user_id == user_id)
+        .where(Notification.is_read.is_(False))
+        .values(is_read=True)
+    )
+    if notification_ids is not None:
+        statement = statement.where(Notification.id.in_(list(notification_ids)))
+    updated = session.exec(statement).rowcount
+    if updated:
+        session.exec(
+            update(NotificationCounter)
+            .where(NotificationCounter.user_id == user_id)
+            .values(unread=case(
+                (NotificationCounter.unread > updated, NotificationCounter.unread - updated),
+                else_=0,
+            ))
+        )
+    return updated
@@ -0,0 +1,279 @@
+"""
+Payment ledger.
+
+Every payment goes through record_payment(). Once its transaction has
+committed, the caller counts it with revenue_rollup.add(). That adds it to
+this worker's deltas for the `revenue_rollup` row of its day x
+payment_type x status. A flusher thread folds the deltas into the table
+every REVENUE_FLUSH_SECONDS, with one statement for all of them:
+
+    INSERT ... ON CONFLICT (day, payment_type, status)
+    DO UPDATE SET payment_count = payment_count + :count,
+                  total_amount = total_amount + :amount
+
+Revenue reports sum at most a few hundred rollup rows per year instead of
+scanning `payment`. The rollup row of the day is shared by every payment
+of one type, so no purchase writes it: purchases only add to the
+in-memory deltas, and the row is locked once per flush instead of once
+per payment. A report flushes its own worker first; other workers'
+payments show up within one flush interval. Deltas that fail to write
+are kept and retried. The deltas still pending at shutdown are written
+before the flusher stops.
+
+Payments recorded without a reference are linked to their token or
+subscription by the reconcile_payments job, in bulk.
+"""
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from sqlalchemy import exists, update
+from sqlmodel import Session, select
+
+from app.db.session import dialect_insert, engine
+from app.models.payment import Payment, RevenueRollup
+from app.models.subscription import Subscription
+from app.models.token import Token
+from app.services.maintenance import MAINTENANCE_CHUNK_SIZE
+
+PAYMENT_TYPES = {"SUBSCRIPTION", "TOKEN"}
+PAYMENT_STATUSES = {"SUCCESS", "FAILED"}
+
+REVENUE_FLUSH_SECONDS = float(os.getenv("REVENUE_FLUSH_SECONDS", "5"))
+PAYMENT_RECONCILE_INTERVAL_SECONDS = int(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "900"))
+# Largest gap between a token's creation and its payment that still matches
+PAYMENT_MATCH_WINDOW = timedelta(minutes=int(os.getenv("PAYMENT_MATCH_WINDOW_MINUTES", "60")))
+
+logger = logging.getLogger(__name__)
+
+
+def record_payment(session: Session, payment: Payment):
+    """Add a payment. Does not commit; count it with revenue_rollup.add() after the commit."""
+    if payment.payment_type not in PAYMENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid payment_type: {payment.payment_type}"
+        )
+    if payment.status not in PAYMENT_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid payment status: {payment.status}"
+        )
+    if payment.amount is None or payment.amount <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Payment amount must be positive"
+        )
+
+    session.add(payment)
+    session.flush()
+    return payment
+
+
+class RevenueRollupBuffer:
+    def __init__(self):
+        self._deltas = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def add(self, payment: Payment):
+        """Count a committed payment."""
+        key = (payment.transaction_time.date(), payment.payment_type, payment.status)
+        with self._lock:
+            count, amount = self._deltas.get(key, (0, Decimal("0")))
+            self._deltas[key] = (count + 1, amount + Decimal(payment.amount))
+
+    def _merge(self, deltas):
+        with self._lock:
+            for key, (count, amount) in deltas.items():
+                pending_count, pending_amount = self._deltas.get(key, (0, Decimal("0")))
+                self._deltas[key] = (pending_count + count, pending_amount + amount)
+
+    def flush(self):
+        """Fold the pending deltas into revenue_rollup. Returns the number of rows written."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        if not deltas:
+            return 0
+        try:
+            with Session(engine) as session:
+                insert = dialect_insert(session)
+                statement = insert(RevenueRollup).values([
+                    {"day": day, "payment_type": type_, "status": status_, "payment_count": count, "total_amount": amount}
+                    # Sorted, so concurrent flushes lock the rows in the same order
+                    for (day, type_, status_), (count, amount) in sorted(deltas.items())
+                ])
+                statement = statement.on_conflict_do_update(
+                    index_elements=["day", "payment_type", "status"],
+                    set_={
+                        "payment_count": RevenueRollup.payment_count + statement.excluded.payment_count,
+                        "total_amount": RevenueRollup.total_amount + statement.excluded.total_amount,
+                    },
+                )
+                session.exec(statement)
+                session.commit()
+        except Exception:
+            self._merge(deltas)
+            raise
+        return len(deltas)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="revenue-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=10.0):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            self._wake.wait(REVENUE_FLUSH_SECONDS)
+            self._wake.clear()
+            stopping = self._stopping
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Flushing the revenue rollup failed")
+            if stopping:
+                return
+
+
+revenue_rollup = RevenueRollupBuffer()
+
+
+def revenue_report(session: Session, date_from, date_to, group_by="month", payment_type=None, payment_status=None):
+    """Totals per period, payment type and status, summed from the rollup."""
+    revenue_rollup.flush()
+    statement = (
+        select(
+            RevenueRollup.day,
+            RevenueRollup.payment_type,
+            RevenueRollup.status,
+            RevenueRollup.payment_count,
+            RevenueRollup.total_amount,
+        )
+        .where(RevenueRollup.day >= date_from)
+        .where(RevenueRollup.day <= date_to)
+    )
+    if payment_type:
+        statement = statement.where(RevenueRollup.payment_type == payment_type)
+    if payment_status:
+        statement = statement.where(RevenueRollup.status == payment_status)
+
+    totals = defaultdict(lambda: [0, Decimal("0")])
+    for day, type_, status_, count, amount in session.exec(statement).all():
+        period = day.strftime("%Y-%m") if group_by == "month" else day.isoformat()
+        entry = totals[(period, type_, status_)]
+        entry[0] += count
+        entry[1] += Decimal(amount)
+    return [
+        {
+            "period": period,
+            "payment_type": type_,
+            "status": status_,
+            "payment_count": count,
+            "total_amount": amount.quantize(Decimal("0.01")),
+        }
+        for (period, type_, status_), (count, amount) in sorted(totals.items())
+    ]
+
+
+def _reconcile_subscription_payments(chunk_size):
+    latest_subscription = (
+        select(Subscription.id)
+        .where(Subscription.user_id == Payment.user_id)
+        .order_by(Subscription.id.desc())
+        .limit(1)
+        .correlate(Payment)
+        .scalar_subquery()
+    )
+    total = 0
+    while True:
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Payment.id)
+                .where(Payment.payment_type == "SUBSCRIPTION")
+                .where(Payment.status == "SUCCESS")
+                .where(Payment.subscription_id.is_(None))
+                .where(exists().where(Subscription.user_id == Payment.user_id))
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return total
+            session.exec(
+                update(Payment)
+                .where(Payment.id.in_(ids))
+                .values(subscription_id=latest_subscription)
+            )
+            session.commit()
+        total += len(ids)
+
+
+def _reconcile_token_payments(chunk_size):
+    total = 0
+    last_id = None
+    while True:
+        with Session(engine) as session:
+            statement = (
+                select(Payment.id, Payment.user_id, Payment.transaction_time)
+                .where(Payment.payment_type == "TOKEN")
+                .where(Payment.status == "SUCCESS")
+                .where(Payment.token_id.is_(None))
+                .order_by(Payment.id)
+                .limit(chunk_size)
+            )
+            if last_id is not None:
+                statement = statement.where(Payment.id > last_id)
+            payments = session.exec(statement).all()
+            if not payments:
+                return total
+            last_id = payments[-1][0]
+
+            # Unpaid tokens of the same users, one query for the chunk
+            paid = select(Payment.token_id).where(Payment.token_id.is_not(None))
+            tokens = defaultdict(list)
+            for token_id, user_id, created_at in session.exec(
+                select(Token.id, Token.user_id, Token.created_at)
+                .where(Token.user_id.in_({user_id for _, user_id, _ in payments}))
+                .where(Token.id.not_in(paid))
+            ).all():
+                tokens[user_id].append((token_id, created_at))
+
+            matches = []
+            for payment_id, user_id, paid_at in sorted(payments, key=lambda p: p[2]):
+                candidates = tokens.get(user_id)
+                if not candidates:
+                    continue
+                token_id, created_at = min(candidates, key=lambda t: abs(t[1] - paid_at))
+                if abs(created_at - paid_at) > PAYMENT_MATCH_WINDOW:
+                    continue
+                candidates.remove((token_id, created_at))
+                matches.append({"id": payment_id, "token_id": token_id})
+
+            if matches:
+                # Bulk UPDATE by primary key, one executemany for the chunk
+                session.exec(update(Payment), params=matches)
+                session.commit()
+            total += len(matches)
+
+
+def reconcile_payments(chunk_size=MAINTENANCE_CHUNK_SIZE):
+    """Link successful payments without a reference to their token or subscription."""
+    return _reconcile_subscription_payments(chunk_size) + _reconcile_token_payments(chunk_size)
+
+
+def register_payment_jobs(scheduler):
+    scheduler.add_job("reconcile_payments", reconcile_payments, PAYMENT_RECONCILE_INTERVAL_SECONDS, initial_delay=60)
@@ -0,0 +1,142 @@
+"""
+In-memory push hub for server-sent events and long-polls.
+
+Every open connection owns a Mailbox subscribed to one channel (for
+example `user:<id>`). A mailbox is a few slots: a deque of at most
+PUSH_MAILBOX_SIZE messages and, while the connection is idle, one future
+to wake it. Thousands of idle connections therefore cost a few hundred
+bytes each, plus their socket.
+
+publish() may be called from any thread. It returns at once when nobody
+listens on the channel; otherwise it hands the message to the event loop
+with call_soon_threadsafe, and only the mailboxes of that channel are
+woken. A mailbox that overflows drops its oldest message and is flagged,
+so the connection can tell its client to refetch instead of silently
+missing events.
+
+event_stream() turns a channel into a server-sent event body: one event
+per message, `resync` after an overflow, and a comment every
+PUSH_KEEPALIVE_SECONDS so proxies keep idle streams open.
+"""
+import asyncio
+import os
+from collections import deque
+
+import orjson
+
+from app.core.metrics import push_connections, push_messages_total
+
+PUSH_MAILBOX_SIZE = int(os.getenv("PUSH_MAILBOX_SIZE", "32"))
+PUSH_KEEPALIVE_SECONDS = float(os.getenv("PUSH_KEEPALIVE_SECONDS", "20"))
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Mailbox:
+    __slots__ = ("channel", "messages", "overflowed", "_waiter")
+
+    def __init__(self, channel, size):
+        self.channel = channel
+        self.messages = deque(maxlen=size)
+        self.overflowed = False
+        self._waiter = None
+
+    def _put(self, message):
+        if len(self.messages) == self.messages.maxlen:
+            self.overflowed = True
+            push_messages_total.labels("dropped").inc()
+        self.messages.append(message)
+        push_messages_total.labels("delivered").inc()
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def wait(self, timeout):
+        """Messages received so far, waiting up to `timeout` seconds for the first one."""
+        if not self.messages:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await asyncio.wait_for(self._waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiter = None
+        messages = list(self.messages)
+        self.messages.clear()
+        return messages
+
+
+class PushHub:
+    def __init__(self, mailbox_size=PUSH_MAILBOX_SIZE):
+        self.mailbox_size = mailbox_size
+        self._channels = {}
+        self._loop = None
+
+    def bind(self, loop):
+        """Attach the event loop that owns the mailboxes (called at startup)."""
+        self._loop = loop
+
+    def subscribe(self, channel):
+        """Open a mailbox on the channel. Call from the event loop."""
+        mailbox = Mailbox(channel, self.mailbox_size)
+        self._channels.setdefault(channel, set()).add(mailbox)
+        push_connections.inc()
+        return mailbox
+
+    def unsubscribe(self, mailbox):
+        subscribers = self._channels.get(mailbox.channel)
+        if subscribers is not None:
+            subscribers.discard(mailbox)
+            if not subscribers:
+                del self._channels[mailbox.channel]
+        push_connections.dec()
+
+    def publish(self, channel, message):
+        self.publish_many([(channel, message)])
+
+    def publish_many(self, items):
+        """Deliver (channel, message) pairs. Safe to call from any thread."""
+        # Reading the dict from another thread is safe under the GIL; the
+        # worst case is a message for a connection that just closed
+        items = [(channel, message) for channel, message in items if channel in self._channels]
+        loop = self._loop
+        if not items or loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(items)
+        else:
+            loop.call_soon_threadsafe(self._deliver, items)
+
+    def _deliver(self, items):
+        for channel, message in items:
+            for mailbox in self._channels.get(channel, ()):
+                mailbox._put(message)
+
+
+hub = PushHub()
+
+
+async def event_stream(request, channel, event):
+    """SSE body for one channel; runs until the client disconnects."""
+    mailbox = hub.subscribe(channel)
+    name = event.encode()
+    try:
+        yield b"retry: 5000\n\n"
+        while not await request.is_disconnected():
+            messages = await mailbox.wait(PUSH_KEEPALIVE_SECONDS)
+            if mailbox.overflowed:
+                mailbox.overflowed = False
+                yield b"event: resync\ndata: {}\n\n"
+            if not messages:
+                yield b": keepalive\n\n"
+            for message in messages:
+                yield b"event: " + name + b"\ndata: " + orjson.dumps(message) + b"\n\n"
+    finally:
+        hub.unsubscribe(mailbox)
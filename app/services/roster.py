@@ -0,0 +1,262 @@
+"""
+Driver and vehicle rostering.
+
+A trip occupies its driver and its vehicle from its scheduled start until
+the predicted arrival at its last stop (the ETA model's run time for the
+route, weekday and hour) plus ROSTER_TURNAROUND_MINUTES. Two trips
+conflict when they share a driver or a vehicle and their windows
+overlap; a trip also conflicts with its vehicle being UNDER_REPAIR.
+
+find_conflicts() builds one IntervalIndex per driver and per vehicle, so
+checking a month of trips costs O(n log n + conflicts) instead of
+comparing every pair. auto_assign() walks the scheduled trips in start
+order, keeps each one's driver and vehicle when they are free, and
+otherwise gives it a free driver and a free, roadworthy vehicle big
+enough for the seats already booked. Started and completed trips are
+never moved, but they do occupy their resources.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlmodel import Session, func, select
+
+from app.models.profile import DriverProfile
+from app.models.seat_allocation import SeatAllocation
+from app.models.trip import Trip
+from app.models.trip_inventory import TripInventory
+from app.models.vehicle import Vehicle
+from app.services.eta import get_eta_model
+from app.services.intervals import IntervalIndex
+from app.services.versioning import bump_versions, inventory_keys
+
+ROSTER_TURNAROUND_MINUTES = int(os.getenv("ROSTER_TURNAROUND_MINUTES", "15"))
+ROSTER_MIN_TRIP_MINUTES = int(os.getenv("ROSTER_MIN_TRIP_MINUTES", "30"))
+ROSTER_HORIZON_DAYS = int(os.getenv("ROSTER_HORIZON_DAYS", "7"))
+
+UNAVAILABLE_VEHICLE_STATUSES = ("UNDER_REPAIR",)
+
+
+class TripWindows:
+    """Occupied window of each trip, from the ETA model's run times."""
+
+    def __init__(self, session: Session):
+        self._model = get_eta_model(session)
+        self._durations = {}
+
+    def __call__(self, route_id, trip_date, start_time):
+        key = (route_id, trip_date.weekday(), start_time.hour)
+        duration = self._durations.get(key)
+        if duration is None:
+            _, offsets = self._model.offsets(*key)
+            run = max(offsets[-1] if offsets else 0.0, ROSTER_MIN_TRIP_MINUTES * 60)
+            duration = timedelta(seconds=run, minutes=ROSTER_TURNAROUND_MINUTES)
+            self._durations[key] = duration
+        start = datetime.combine(trip_date, start_time)
+        return start, start + duration
+
+
+def _load_trips(session: Session, date_from, date_to):
+    # A day of margin on both sides catches trips running over midnight
+    return session.exec(
+        select(
+            Trip.id, Trip.route_id, Trip.trip_date, Trip.start_time, Trip.status,
+            Trip.driver_profile_id, Trip.vehicle_id, Vehicle.status,
+        )
+        .join(Vehicle, Trip.vehicle_id == Vehicle.id)
+        .where(Trip.trip_date >= date_from - timedelta(days=1))
+        .where(Trip.trip_date <= date_to + timedelta(days=1))
+        .order_by(Trip.trip_date, Trip.start_time, Trip.id)
+    ).all()
+
+
+def find_conflicts(session: Session, date_from, date_to):
+    """Double-booked drivers and vehicles, and trips on vehicles under repair."""
+    window = TripWindows(session)
+    trips = _load_trips(session, date_from, date_to)
+    by_resource = defaultdict(list)
+    conflicts = []
+    for trip_id, route_id, trip_date, start_time, trip_status, driver_id, vehicle_id, vehicle_status in trips:
+        if trip_status == "COMPLETED":
+            continue
+        start, end = window(route_id, trip_date, start_time)
+        in_range = date_from <= trip_date <= date_to
+        by_resource[("DRIVER", driver_id)].append((start, end, (trip_id, in_range)))
+        by_resource[("VEHICLE", vehicle_id)].append((start, end, (trip_id, in_range)))
+        if in_range and trip_status == "SCHEDULED" and vehicle_status in UNAVAILABLE_VEHICLE_STATUSES:
+            conflicts.append({
+                "kind": "UNDER_REPAIR",
+                "resource_id": str(vehicle_id),
+                "trip_ids": [trip_id],
+                "starts_at": start,
+                "ends_at": end,
+            })
+
+    for (kind, resource_id), windows in by_resource.items():
+        if len(windows) < 2:
+            continue
+        index = IntervalIndex(windows)
+        for start, end, (trip_id, in_range) in windows:
+            if not in_range:
+                continue
+            for other_start, other_end, (other_id, _) in index.overlapping(start, end):
+                # Windows are half-open, and each pair is reported once
+                if other_start < end and other_end > start and (other_start, str(other_id)) > (start, str(trip_id)):
+                    conflicts.append({
+                        "kind": kind,
+                        "resource_id": str(resource_id),
+                        "trip_ids": [trip_id, other_id],
+                        "starts_at": max(start, other_start),
+                        "ends_at": min(end, other_end),
+                    })
+    conflicts.sort(key=lambda c: (c["starts_at"], c["kind"], c["resource_id"]))
+    return conflicts
+
+
+def _booked_seats(session: Session, trip_ids):
+    booked = dict(session.exec(
+        select(SeatAllocation.trip_id, func.count(SeatAllocation.id))
+        .where(SeatAllocation.trip_id.in_(list(trip_ids)))
+        .group_by(SeatAllocation.trip_id)
+    ).all()) if trip_ids else {}
+    return booked
+
+
+def validate_assignment(session: Session, trip: Trip, driver_profile_id, vehicle_id):
+    """Raise unless the driver and vehicle can run the trip."""
+    vehicle = session.get(Vehicle, vehicle_id)
+    if vehicle is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Vehicle not found")
+    if session.get(DriverProfile, driver_profile_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Driver not found")
+    if vehicle.status in UNAVAILABLE_VEHICLE_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Vehicle {vehicle.vehicle_number} is {vehicle.status.lower().replace('_', ' ')}"
+        )
+    booked = _booked_seats(session, [trip.id]).get(trip.id, 0)
+    if vehicle.capacity < booked:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Vehicle {vehicle.vehicle_number} seats {vehicle.capacity}, but {booked} seats are booked"
+        )
+
+    window = TripWindows(session)
+    start, end = window(trip.route_id, trip.trip_date, trip.start_time)
+    others = session.exec(
+        select(Trip.id, Trip.route_id, Trip.trip_date, Trip.start_time, Trip.driver_profile_id, Trip.vehicle_id)
+        .where(Trip.id != trip.id)
+        .where(Trip.status != "COMPLETED")
+        .where(Trip.trip_date >= trip.trip_date - timedelta(days=1))
+        .where(Trip.trip_date <= trip.trip_date + timedelta(days=1))
+        .where((Trip.driver_profile_id == driver_profile_id) | (Trip.vehicle_id == vehicle_id))
+    ).all()
+    for other_id, route_id, trip_date, start_time, other_driver, other_vehicle in others:
+        other_start, other_end = window(route_id, trip_date, start_time)
+        if other_start < end and other_end > start:
+            who = "Driver" if other_driver == driver_profile_id else f"Vehicle {vehicle.vehicle_number}"
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"{who} is already on the {start_time.strftime('%H:%M')} trip on {trip_date}"
+            )
+
+
+def auto_assign(session: Session, date_from, date_to):
+    """
+    Resolve conflicts among SCHEDULED trips in [date_from, date_to].
+    Returns (changes, unresolved trip ids); changes are not yet written.
+    """
+    window = TripWindows(session)
+    trips = _load_trips(session, date_from, date_to)
+    vehicles = {
+        vehicle_id: (capacity, vehicle_status)
+        for vehicle_id, capacity, vehicle_status in session.exec(
+            select(Vehicle.id, Vehicle.capacity, Vehicle.status).order_by(Vehicle.vehicle_number)
+        ).all()
+    }
+    drivers = {
+        driver_id: assigned_vehicle_id
+        for driver_id, assigned_vehicle_id in session.exec(
+            select(DriverProfile.id, DriverProfile.assigned_vehicle_id).order_by(DriverProfile.id)
+        ).all()
+    }
+
+    movable = []
+    fixed = defaultdict(list)  # resource -> windows of trips that cannot move
+    for trip_id, route_id, trip_date, start_time, trip_status, driver_id, vehicle_id, _ in trips:
+        start, end = window(route_id, trip_date, start_time)
+        if trip_status == "SCHEDULED" and date_from <= trip_date <= date_to:
+            movable.append((start, end, trip_id, driver_id, vehicle_id))
+        elif trip_status != "COMPLETED":
+            fixed[("DRIVER", driver_id)].append((start, end, trip_id))
+            fixed[("VEHICLE", vehicle_id)].append((start, end, trip_id))
+    fixed = {resource: IntervalIndex(windows) for resource, windows in fixed.items()}
+    booked = _booked_seats(session, [trip[2] for trip in movable])
+
+    busy_until = {}  # resource -> end of its latest window taken in this pass
+
+    def free(resource, start, end):
+        if busy_until.get(resource, start) > start:
+            return False
+        index = fixed.get(resource)
+        return index is None or not any(
+            other_start < end and other_end > start
+            for other_start, other_end, _ in index.overlapping(start, end)
+        )
+
+    def fits(vehicle_id, trip_id):
+        capacity, vehicle_status = vehicles[vehicle_id]
+        return vehicle_status not in UNAVAILABLE_VEHICLE_STATUSES and capacity >= booked.get(trip_id, 0)
+
+    changes = []
+    unresolved = []
+    for start, end, trip_id, driver_id, vehicle_id in movable:
+        new_driver = driver_id
+        if not free(("DRIVER", driver_id), start, end):
+            # Prefer a driver who normally drives this bus
+            candidates = sorted(drivers, key=lambda d: drivers[d] != vehicle_id)
+            new_driver = next((d for d in candidates if free(("DRIVER", d), start, end)), None)
+
+        new_vehicle = vehicle_id
+        if not (fits(vehicle_id, trip_id) and free(("VEHICLE", vehicle_id), start, end)):
+            preferred = drivers.get(new_driver)
+            candidates = sorted(
+                (v for v in vehicles if fits(v, trip_id)),
+                key=lambda v: (v != preferred, vehicles[v][0]),
+            )
+            new_vehicle = next((v for v in candidates if free(("VEHICLE", v), start, end)), None)
+
+        if new_driver is None or new_vehicle is None:
+            unresolved.append(trip_id)
+            continue
+        busy_until[("DRIVER", new_driver)] = end
+        busy_until[("VEHICLE", new_vehicle)] = end
+        if (new_driver, new_vehicle) != (driver_id, vehicle_id):
+            changes.append({"id": trip_id, "driver_profile_id": new_driver, "vehicle_id": new_vehicle})
+    return changes, unresolved
+
+
+def apply_assignments(session: Session, changes):
+    """Write trip reassignments and carry vehicle capacities into the inventory."""
+    if not changes:
+        return
+    session.exec(update(Trip), params=changes)
+    capacities = dict(session.exec(
+        select(Vehicle.id, Vehicle.capacity).where(Vehicle.id.in_({c["vehicle_id"] for c in changes}))
+    ).all())
+    inventory = [
+        {"trip_id": c["id"], "capacity": capacities[c["vehicle_id"]]}
+        for c in changes
+    ]
+    existing = set(session.exec(
+        select(TripInventory.trip_id).where(TripInventory.trip_id.in_([c["id"] for c in changes]))
+    ).all())
+    inventory = [row for row in inventory if row["trip_id"] in existing]
+    if inventory:
+        session.exec(update(TripInventory), params=inventory)
+    route_ids = session.exec(
+        select(Trip.route_id).where(Trip.id.in_([c["id"] for c in changes])).distinct()
+    ).all()
+    bump_versions(session, *inventory_keys(*route_ids))
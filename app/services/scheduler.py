@@ -0,0 +1,122 @@
+"""
+In-process job scheduler.
+
+Jobs are plain sync functions that return the number of rows they touched.
+Each runs on its own asyncio task, started from the app's lifespan. The
+function itself runs in a worker thread so the event loop never waits on
+the database. With several workers, a Postgres advisory lock per job keeps
+one run at a time; the jobs are set-based and idempotent, so an extra run
+would only find nothing left to do. Jobs that work on the worker's own
+memory (exclusive=False) skip the lock and run on every worker.
+
+Set SCHEDULER_ENABLED=0 to start a worker without jobs.
+"""
+import asyncio
+import logging
+import os
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app.core.metrics import job_duration_seconds, job_rows_total, job_runs_total
+from app.db.session import engine
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, name, func, interval, initial_delay=0.0, exclusive=True):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.exclusive = exclusive
+        self.last_run = None
+        self.last_rows = None
+        self.last_error = None
+
+
+@contextmanager
+def job_lock(name):
+    """Cluster-wide lock for one job run; always acquired off Postgres."""
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    key = zlib.crc32(f"nexusride-job:{name}".encode())
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": key}).scalar()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": key})
+
+
+def seconds_until_hour(hour):
+    """Delay until the next local `hour` o'clock, for daily jobs."""
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = {}
+        self._tasks = []
+
+    def add_job(self, name, func, interval, initial_delay=0.0, exclusive=True):
+        self.jobs[name] = Job(name, func, interval, initial_delay, exclusive)
+
+    async def start(self):
+        if not SCHEDULER_ENABLED:
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job):
+        await asyncio.sleep(job.initial_delay)
+        while True:
+            await asyncio.to_thread(self._run_once, job)
+            await asyncio.sleep(job.interval)
+
+    def _run_once(self, job):
+        start = time.perf_counter()
+        try:
+            if not job.exclusive:
+                rows = job.func() or 0
+            else:
+                with job_lock(job.name) as acquired:
+                    if not acquired:
+                        job_runs_total.labels(job.name, "skipped").inc()
+                        return 0
+                    rows = job.func() or 0
+        except Exception as e:
+            job.last_error = repr(e)
+            job_runs_total.labels(job.name, "error").inc()
+            logger.exception("Scheduled job %s failed", job.name)
+            return 0
+        finally:
+            job.last_run = time.time()
+            job_duration_seconds.labels(job.name).observe(time.perf_counter() - start)
+
+        job.last_rows = rows
+        job.last_error = None
+        job_runs_total.labels(job.name, "success").inc()
+        job_rows_total.labels(job.name).inc(rows)
+        return rows
+
+
+scheduler = Scheduler()
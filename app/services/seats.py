@@ -0,0 +1,104 @@
+"""
+Seat inventory per trip.
+
+`trip_inventory` holds one row per trip with its capacity and the number of
+booked seats, kept equal to the trip's seat_allocation rows by every writer.
+Reserving a seat is one conditional UPDATE:
+
+    UPDATE trip_inventory SET booked = booked + 1
+    WHERE trip_id = :trip AND booked < capacity
+
+The row lock it takes serialises buyers of the same trip only for the rest
+of their transaction, and the capacity check and the increment cannot be
+separated, so the last seat is sold exactly once without SELECT ... FOR
+UPDATE or retries. Inventory rows are created lazily from the current
+allocations the first time a trip is booked.
+"""
+from sqlalchemy import case, update
+from sqlmodel import Session, func, select
+
+from app.db.session import dialect_insert
+from app.models.seat_allocation import SeatAllocation
+from app.models.trip import Trip
+from app.models.trip_inventory import TripInventory
+from app.models.vehicle import Vehicle
+
+
+def ensure_inventory(session: Session, trip_ids):
+    """Create missing inventory rows from the trips' current allocations."""
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return
+    booked = (
+        select(func.count(SeatAllocation.id))
+        .where(SeatAllocation.trip_id == Trip.id)
+        .correlate(Trip)
+        .scalar_subquery()
+    )
+    source = (
+        select(Trip.id, Vehicle.capacity, booked)
+        .join(Vehicle, Trip.vehicle_id == Vehicle.id)
+        .where(Trip.id.in_(trip_ids))
+    )
+    insert = dialect_insert(session)
+    statement = (
+        insert(TripInventory)
+        .from_select(["trip_id", "capacity", "booked"], source)
+        .on_conflict_do_nothing(index_elements=["trip_id"])
+    )
+    session.exec(statement)
+
+
+def reserve_seat(session: Session, trip_id) -> bool:
+    """Take one seat on the trip if any is left. Returns False when sold out."""
+    statement = (
+        update(TripInventory)
+        .where(TripInventory.trip_id == trip_id)
+        .where(TripInventory.booked < TripInventory.capacity)
+        .values(booked=TripInventory.booked + 1)
+    )
+    if session.exec(statement).rowcount == 1:
+        return True
+
+    exists = session.exec(
+        select(TripInventory.trip_id).where(TripInventory.trip_id == trip_id)
+    ).first()
+    if exists is not None:
+        return False
+    ensure_inventory(session, [trip_id])
+    return session.exec(statement).rowcount == 1
+
+
+def release_seats(session: Session, released):
+    """Give back seats, `released` mapping trip_id -> number of seats."""
+    # Rows are locked in trip_id order, as plan_assignments(lock=True) does,
+    # so the two cannot deadlock
+    for trip_id, count in sorted(released.items()):
+        if count <= 0:
+            continue
+        session.exec(
+            update(TripInventory)
+            .where(TripInventory.trip_id == trip_id)
+            .values(booked=case(
+                (TripInventory.booked > count, TripInventory.booked - count),
+                else_=0,
+            ))
+        )
+
+
+def recount_inventory(session: Session, trip_ids):
+    """Resync booked counts after bulk allocation changes."""
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return
+    ensure_inventory(session, trip_ids)
+    booked = (
+        select(func.count(SeatAllocation.id))
+        .where(SeatAllocation.trip_id == TripInventory.trip_id)
+        .scalar_subquery()
+    )
+    session.exec(
+        update(TripInventory)
+        .where(TripInventory.trip_id.in_(trip_ids))
+        .values(booked=booked)
+    )
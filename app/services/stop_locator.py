@@ -0,0 +1,117 @@
+"""
+Nearest-stop lookup.
+
+Every stop with coordinates becomes a point on the unit sphere (x, y, z).
+Straight-line distance between such points orders them exactly like
+great-circle distance, so a plain 3-d k-d tree answers "k nearest" with
+no map projection; the chord length is turned into metres only for the
+results.
+
+The tree is implicit: points are stored in one list, each slice's middle
+element is a node and its halves are the subtrees, split on x, y and z
+in turn. A search walks toward the query point first and enters the
+other half of a node only if the splitting plane is closer than the
+k-th best distance so far, which touches O(log n + k) nodes in practice.
+The tree is rebuilt from the directory snapshot when its version
+changes, i.e. whenever a stop or its location changes.
+"""
+import heapq
+import math
+import threading
+
+from sqlmodel import Session
+
+from app.services.directory import get_directory
+
+EARTH_RADIUS_M = 6371008.8
+MAX_NEAREST = 20
+
+
+def _unit_vector(latitude, longitude):
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+def _chord_to_metres(chord_squared):
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+class StopLocator:
+    def __init__(self, version, routes):
+        self.version = version
+        self._items = []  # (point, stop) in tree order
+        for route in routes:
+            for stop in route["stops"]:
+                if stop["latitude"] is None or stop["longitude"] is None:
+                    continue
+                self._items.append((
+                    _unit_vector(stop["latitude"], stop["longitude"]),
+                    {**stop, "route_id": route["id"], "route_name": route["route_name"]},
+                ))
+        self._build(0, len(self._items), 0)
+
+    def __len__(self):
+        return len(self._items)
+
+    def _build(self, lo, hi, axis):
+        if hi - lo <= 1:
+            return
+        items = self._items[lo:hi]
+        items.sort(key=lambda item: item[0][axis])
+        self._items[lo:hi] = items
+        mid = (lo + hi) // 2
+        self._build(lo, mid, (axis + 1) % 3)
+        self._build(mid + 1, hi, (axis + 1) % 3)
+
+    def nearest(self, latitude, longitude, k=5):
+        """The k stops closest to the point, nearest first, with `distance_m`."""
+        if k <= 0 or not self._items:
+            return []
+        target = _unit_vector(latitude, longitude)
+        items = self._items
+        best = []  # max-heap of (-chord², index)
+
+        def visit(lo, hi, axis):
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            point = items[mid][0]
+            dx = target[0] - point[0]
+            dy = target[1] - point[1]
+            dz = target[2] - point[2]
+            distance = dx * dx + dy * dy + dz * dz
+            if len(best) < k:
+                heapq.heappush(best, (-distance, mid))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, mid))
+
+            offset = target[axis] - point[axis]
+            near, far = ((lo, mid), (mid + 1, hi)) if offset < 0 else ((mid + 1, hi), (lo, mid))
+            next_axis = (axis + 1) % 3
+            visit(near[0], near[1], next_axis)
+            if len(best) < k or offset * offset < -best[0][0]:
+                visit(far[0], far[1], next_axis)
+
+        visit(0, len(items), 0)
+        return [
+            {**items[index][1], "distance_m": round(_chord_to_metres(-negative), 1)}
+            for negative, index in sorted(best, reverse=True)
+        ]
+
+
+_locator = None
+_lock = threading.Lock()
+
+
+def get_stop_locator(session: Session) -> StopLocator:
+    global _locator
+    snapshot = get_directory(session)
+    locator = _locator
+    if locator is not None and locator.version == snapshot.version:
+        return locator
+    with _lock:
+        if _locator is None or _locator.version != snapshot.version:
+            _locator = StopLocator(snapshot.version, snapshot.routes)
+        return _locator
@@ -0,0 +1,162 @@
+"""
+In-memory stop name search.
+
+Two structures are built from the route directory snapshot:
+
+- a trie over every stop name and every word in it, so "upd" finds
+  nothing, "utt" finds "Uttara Sector 7" and "sec" finds it too;
+- a trigram index (trigram -> stop ids) for typo-tolerant matches,
+  ranked by Dice similarity of the trigram sets, so "Mirpor" still
+  finds "Mirpur 10".
+
+Both are keyed by casefolded text. Lookups touch only the trie path of
+the query and the posting lists of its trigrams. Every trie node stores
+its best completions, computed once per build, so even a one-letter
+prefix is answered without walking its subtree. Lookups stay well under
+a millisecond for thousands of stops. The index is rebuilt only when the
+directory version changes.
+"""
+import re
+import threading
+from collections import Counter
+
+from sqlmodel import Session
+
+from app.services.directory import get_directory
+
+FUZZY_MIN_SCORE = 0.3
+# Completions kept per trie node; also the largest page a search returns
+MAX_RESULTS = 20
+
+_WORD = re.compile(r"\w+")
+# Non-string trie keys, so they cannot collide with characters
+_END = 0  # entries whose key ends at this node
+_TOP = 1  # best MAX_RESULTS completions below this node
+
+
+def _normalize(text):
+    return " ".join(_WORD.findall(text.casefold()))
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StopSearchIndex:
+    def __init__(self, version, routes):
+        self.version = version
+        self.entries = []
+        self._trie = {}
+        self._grams = {}
+        self._gram_counts = []
+        for route in routes:
+            for stop in route["stops"]:
+                self._add({
+                    "id": stop["id"],
+                    "stop_name": stop["stop_name"],
+                    "sequence_number": stop["sequence_number"],
+                    "route_id": route["id"],
+                    "route_name": route["route_name"],
+                })
+        self._rank_completions()
+
+    def _add(self, entry):
+        index = len(self.entries)
+        self.entries.append(entry)
+        name = _normalize(entry["stop_name"])
+        words = name.split()
+        # Rank 0: the whole name starts with the query; rank 1: a later word does
+        keys = [(name, 0)] + [(" ".join(words[i:]), 1) for i in range(1, len(words))]
+        for key, rank in keys:
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, []).append((rank, index))
+        grams = _trigrams(name)
+        self._gram_counts.append(len(grams))
+        for gram in grams:
+            self._grams.setdefault(gram, []).append(index)
+
+    def _rank_completions(self):
+        # Iterative post-order: a node's completions are merged from its
+        # own entries and its children's completions
+        stack = [(self._trie, False)]
+        while stack:
+            node, ready = stack.pop()
+            children = [child for key, child in node.items() if isinstance(key, str)]
+            if not ready:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            best = {}
+            candidates = [(rank, index) for rank, index in node.get(_END, ())]
+            for child in children:
+                candidates.extend(child[_TOP])
+            for rank, index in candidates:
+                if rank < best.get(index, 2):
+                    best[index] = rank
+            ranked = sorted(
+                ((rank, index) for index, rank in best.items()),
+                key=lambda item: (item[0], self.entries[item[1]]["stop_name"]),
+            )
+            node[_TOP] = ranked[:MAX_RESULTS]
+
+    def prefix(self, query, limit=10):
+        node = self._trie
+        for char in _normalize(query):
+            node = node.get(char)
+            if node is None:
+                return []
+        return [index for _, index in node.get(_TOP, ())[:limit]]
+
+    def fuzzy(self, query, limit=10, min_score=FUZZY_MIN_SCORE):
+        grams = _trigrams(_normalize(query))
+        if not grams:
+            return []
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        scored = []
+        for index, count in shared.items():
+            score = 2 * count / (len(grams) + self._gram_counts[index])
+            if score >= min_score:
+                scored.append((score, index))
+        scored.sort(key=lambda item: (-item[0], self.entries[item[1]]["stop_name"]))
+        return [(index, score) for score, index in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """Prefix matches first, then fuzzy matches, each entry once."""
+        results = []
+        seen = set()
+        for index in self.prefix(query, limit):
+            seen.add(index)
+            results.append({**self.entries[index], "match": "prefix", "score": 1.0})
+        if len(results) < limit:
+            for index, score in self.fuzzy(query, limit):
+                if index in seen:
+                    continue
+                results.append({**self.entries[index], "match": "fuzzy", "score": round(score, 3)})
+                if len(results) >= limit:
+                    break
+        return results
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_stop_index(session: Session) -> StopSearchIndex:
+    global _index
+    snapshot = get_directory(session)
+    index = _index
+    if index is not None and index.version == snapshot.version:
+        return index
+    with _lock:
+        if _index is None or _index.version != snapshot.version:
+            _index = StopSearchIndex(snapshot.version, snapshot.routes)
+        return _index
+
+
+def suggest_stop_names(session: Session, query, limit=3):
+    return [result["stop_name"] for result in get_stop_index(session).search(query, limit)]
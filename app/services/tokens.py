@@ -0,0 +1,181 @@
+"""
+Single-ride token purchase.
+
+A purchase writes the Token, its TOKEN SeatAllocation and the Payment in
+one transaction. The seat is taken with the conditional UPDATE in
+app.services.seats, as late as possible, so the trip's inventory row
+stays locked only for the final inserts and commit. No row shared with
+purchases on other trips is written in that transaction. The route's
+inventory version is bumped right after the commit, and the payment is
+counted in the revenue rollup by its flusher (app.services.payments).
+
+Clients may send an Idempotency-Key. The key row is inserted first, and
+its primary key makes a concurrent retry wait for the original
+transaction. The retry then replays the stored result instead of booking
+again.
+"""
+import hashlib
+import os
+from datetime import date
+from decimal import Decimal
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core.metrics import token_purchases_total
+from app.models.idempotency import IdempotencyKey
+from app.models.payment import Payment
+from app.models.route import RouteStop
+from app.models.seat_allocation import SeatAllocation
+from app.models.token import Token
+from app.models.trip import Trip
+from app.models.user import User
+from app.schemas.token import TokenPurchase, TokenPurchaseRead
+from app.services.manifests import invalidate_manifests
+from app.services.payments import record_payment, revenue_rollup
+from app.services.seats import reserve_seat
+from app.services.versioning import bump_versions, inventory_keys
+
+TOKEN_PRICE = Decimal(os.getenv("TOKEN_PRICE", "50.00"))
+
+BOOKABLE_TRIP_STATUSES = {"SCHEDULED"}
+
+
+def _request_hash(data: TokenPurchase):
+    raw = f"{data.trip_id}|{data.pickup_stop_id}|{data.consumer_email or ''}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _purchase_read(token, allocation, payment, trip_id):
+    return TokenPurchaseRead(
+        id=token.id,
+        user_id=token.user_id,
+        route_id=token.route_id,
+        travel_date=token.travel_date,
+        pickup_stop_id=token.pickup_stop_id,
+        status=token.status,
+        consumer_email=token.consumer_email,
+        created_at=token.created_at,
+        trip_id=trip_id,
+        seat_allocation_id=allocation.id,
+        payment_id=payment.id,
+        amount=payment.amount,
+    )
+
+
+def _replay(session: Session, record: IdempotencyKey, request_hash: str):
+    if record.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request",
+        )
+    if record.token_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+        )
+    token = session.get(Token, record.token_id)
+    payment = session.get(Payment, record.payment_id)
+    allocation = session.exec(
+        select(SeatAllocation).where(SeatAllocation.token_id == record.token_id)
+    ).first()
+    # The seat can be removed after the purchase, e.g. with its trip
+    if token is None or payment is None or allocation is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="The purchase made with this Idempotency-Key no longer exists",
+        )
+    token_purchases_total.labels("replayed").inc()
+    return _purchase_read(token, allocation, payment, allocation.trip_id)
+
+
+def purchase_token(session: Session, user: User, data: TokenPurchase, idempotency_key=None):
+    """Returns (purchase, replayed)."""
+    request_hash = _request_hash(data)
+
+    if idempotency_key:
+        record = session.get(IdempotencyKey, (user.id, idempotency_key))
+        if record is not None:
+            return _replay(session, record, request_hash), True
+
+    trip = session.get(Trip, data.trip_id)
+    if not trip:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trip not found")
+    if trip.status not in BOOKABLE_TRIP_STATUSES or trip.trip_date < date.today():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Tokens can only be bought for upcoming scheduled trips",
+        )
+
+    stop = session.get(RouteStop, data.pickup_stop_id)
+    if not stop or stop.route_id != trip.route_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pickup stop is not on this trip's route",
+        )
+
+    record = None
+    if idempotency_key:
+        record = IdempotencyKey(user_id=user.id, key=idempotency_key, request_hash=request_hash)
+        session.add(record)
+        try:
+            session.flush()
+        except IntegrityError:
+            # A concurrent retry got there first; its commit released us
+            session.rollback()
+            record = session.get(IdempotencyKey, (user.id, idempotency_key))
+            return _replay(session, record, request_hash), True
+
+    token = Token(
+        user_id=user.id,
+        route_id=trip.route_id,
+        pickup_stop_id=stop.id,
+        consumer_email=data.consumer_email or user.email,
+        travel_date=trip.trip_date,
+        status="ACTIVE",
+    )
+    session.add(token)
+    session.flush()
+
+    # Everything above is private to this transaction; from here on the
+    # trip's inventory row is locked until commit
+    if not reserve_seat(session, trip.id):
+        session.rollback()
+        token_purchases_total.labels("sold_out").inc()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No seats left on this trip")
+
+    allocation = SeatAllocation(
+        trip_id=trip.id,
+        user_id=user.id,
+        seat_type="TOKEN",
+        pickup_stop_id=stop.id,
+        token_id=token.id,
+    )
+    session.add(allocation)
+    payment = record_payment(session, Payment(
+        user_id=user.id,
+        amount=TOKEN_PRICE,
+        payment_type="TOKEN",
+        status="SUCCESS",
+        token_id=token.id,
+    ))
+    if record is not None:
+        record.token_id = token.id
+        record.payment_id = payment.id
+        session.add(record)
+    invalidate_manifests(session, trip_ids=[trip.id])
+    session.commit()
+    revenue_rollup.add(payment)
+
+    # In its own short transaction, after the seat's lock is gone. Until it
+    # commits, readers get the new seat under the old ETag, which only
+    # costs them one more full response later
+    bump_versions(session, *inventory_keys(trip.route_id))
+    session.commit()
+    session.refresh(token)
+    session.refresh(payment)
+    session.refresh(allocation)
+
+    token_purchases_total.labels("purchased").inc()
+    return _purchase_read(token, allocation, payment, trip.id), False
@@ -0,0 +1,85 @@
+"""
+Version counters behind the conditional GET endpoints.
+
+Every write that changes what a cached read returns bumps the matching key
+in the same transaction. A read turns the versions into an ETag and can
+answer If-None-Match with 304 after one primary-key lookup, without
+running its real query.
+
+Read the versions *before* the data they describe. A concurrent write can
+then only leave the client with an ETag that is too old, which costs one
+extra full response, never a stale body.
+
+Seat inventory is versioned per route only. The version of the whole
+inventory is the sum of the route counters, so no write ever touches a
+row shared by every route: each counter only grows, and so does the sum.
+"""
+import hashlib
+from datetime import datetime
+
+from sqlmodel import Session, func, select
+
+from app.db.session import dialect_insert
+from app.models.resource_version import ResourceVersion
+
+INVENTORY_ALL = "inventory:*"  # derived, see inventory_version()
+DIRECTORY_KEY = "directory"  # routes and their stops
+ETA_KEY = "eta"  # segment travel times
+
+
+def subscription_key(user_id):
+    return f"subscription:{user_id}"
+
+
+def inventory_keys(*route_ids):
+    """Keys to bump when seats or trips on these routes change."""
+    return [f"inventory:{route_id}" for route_id in route_ids]
+
+
+def bump_versions(session: Session, *keys):
+    keys = sorted(set(keys))  # fixed order so concurrent bumps cannot deadlock
+    if not keys:
+        return
+    insert = dialect_insert(session)
+    now = datetime.utcnow()
+    statement = insert(ResourceVersion).values(
+        [{"key": key, "version": 1, "updated_at": now} for key in keys]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"version": ResourceVersion.version + 1, "updated_at": now},
+    )
+    session.exec(statement)
+
+
+def get_versions(session: Session, *keys):
+    rows = session.exec(
+        select(ResourceVersion.key, ResourceVersion.version).where(ResourceVersion.key.in_(keys))
+    ).all()
+    versions = dict(rows)
+    return [versions.get(key, 0) for key in keys]
+
+
+def inventory_version(session: Session):
+    """Version of the inventory of all routes: the sum of the route counters."""
+    # INVENTORY_ALL itself is no longer bumped; older databases may still have it
+    return session.exec(
+        select(func.coalesce(func.sum(ResourceVersion.version), 0))
+        .where(ResourceVersion.key.startswith("inventory:"))
+        .where(ResourceVersion.key != INVENTORY_ALL)
+    ).one()
+
+
+def make_etag(*parts):
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
@@ -1,9 +1,27 @@
+import time
 from passlib.context import CryptContext
 
+from app.core.metrics import bcrypt_queue_depth, bcrypt_duration_seconds
+from app.core.tracing import span
+
 pwd_ctx = CryptContext(schemes=["bcrypt"])
 
 def hash_password(password: str):
-    return pwd_ctx.hash(password)
+    bcrypt_queue_depth.inc()
+    start = time.perf_counter()
+    try:
+        with span("bcrypt.hash"):
+            return pwd_ctx.hash(password)
+    finally:
+        bcrypt_queue_depth.dec()
+        bcrypt_duration_seconds.labels("hash").observe(time.perf_counter() - start)
 
 def verify_password(password, hashed):
-    return pwd_ctx.verify(password, hashed)
+    bcrypt_queue_depth.inc()
+    start = time.perf_counter()
+    try:
+        with span("bcrypt.verify"):
+            return pwd_ctx.verify(password, hashed)
+    finally:
+        bcrypt_queue_depth.dec()
+        bcrypt_duration_seconds.labels("verify").observe(time.perf_counter() - start)
@@ -10,6 +10,9 @@ import { useAuth } from '../../context/auth-context';
 export default function SubscriptionRequestsPage() {
   const [requests, setRequests] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalEstimate, setTotalEstimate] = useState(null);
   const [error, setError] = useState(null);
   const [processingId, setProcessingId] = useState(null);
   const navigate = useNavigate();
@@ -19,27 +22,37 @@ export default function SubscriptionRequestsPage() {
     fetchRequests();
   }, []);
 
-  const fetchRequests = async () => {
+  const fetchRequests = async (cursor = null) => {
     try {
       const token = localStorage.getItem('token');
       if (!token) return;
-      const data = await getSubscriptionRequests(token);
-      setRequests(data);
+      if (cursor) setLoadingMore(true);
+      const page = await getSubscriptionRequests(token, cursor);
+      // Later pages are appended; only the first one resets the list
+      setRequests((prev) => (cursor ? [...prev, ...page.requests] : page.requests));
+      setNextCursor(page.nextCursor);
+      if (!cursor) setTotalEstimate(page.totalEstimate);
     } catch (err) {
       console.error('Failed to fetch requests:', err);
       setError('Failed to load subscription requests');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  const removeRequest = (id) => {
+    setRequests((prev) => prev.filter((req) => req.id !== id));
+    setTotalEstimate((prev) => (prev != null ? Math.max(prev - 1, 0) : prev));
+  };
+
   const handleApprove = async (id) => {
     setProcessingId(id);
     try {
       const token = localStorage.getItem('token');
       await approveSubscription(id, token);
       // Remove the approved request from the list
-      setRequests((prev) => prev.filter((req) => req.id !== id));
+      removeRequest(id);
     } catch (err) {
       console.error('Failed to approve subscription:', err);
       // You might want to show a toast or error message here
@@ -57,7 +70,7 @@ export default function SubscriptionRequestsPage() {
       const token = localStorage.getItem('token');
       await declineSubscription(id, token);
       // Remove the declined request from the list
-      setRequests((prev) => prev.filter((req) => req.id !== id));
+      removeRequest(id);
     } catch (err) {
       console.error('Failed to decline subscription:', err);
     } finally {
@@ -74,7 +87,10 @@ export default function SubscriptionRequestsPage() {
           </Button>
           <div>
             <h1 className="text-2xl font-bold text-gray-900 tracking-tight">Pending Requests</h1>
-            <p className="text-sm text-gray-500 font-medium">Review and manage subscription applications</p>
+            <p className="text-sm text-gray-500 font-medium">
+              Review and manage subscription applications
+              {totalEstimate != null && ` · about ${totalEstimate} pending`}
+            </p>
           </div>
         </div>
 
@@ -89,7 +105,7 @@ export default function SubscriptionRequestsPage() {
           <div className="flex justify-center py-12">
             <div className="animate-spin rounded-full h-10 w-10 border-b-2 border-primary-600"></div>
           </div>
-        ) : requests.length === 0 ? (
+        ) : requests.length === 0 && !nextCursor ? (
           <Card className="border-dashed border-2">
             <CardContent className="flex flex-col items-center justify-center py-16 text-center">
               <div className="bg-gray-50 p-4 rounded-full mb-4">
@@ -166,6 +182,14 @@ export default function SubscriptionRequestsPage() {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="flex justify-center">
+            <Button variant="outline" onClick={() => fetchRequests(nextCursor)} isLoading={loadingMore}>
+              Load more
+            </Button>
+          </div>
+        )}
       </div>
     </DashboardLayout>
   );
@@ -46,13 +46,21 @@ export const getSubscription = async (token) => {
   return response.data;
 };
 
-export const getSubscriptionRequests = async (token) => {
+export const getSubscriptionRequests = async (token, cursor = null) => {
+  // One page of the queue; pass nextCursor back to get the following one
   const response = await api.get('/subscription/requests', {
     headers: {
       Authorization: `Bearer ${token}`,
     },
+    params: { limit: 50, ...(cursor ? { cursor } : {}) },
   });
-  return response.data;
+  const totalEstimate = response.headers['x-total-count-estimate'];
+  return {
+    requests: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+    // Only the first page carries the estimate
+    totalEstimate: totalEstimate != null ? Number(totalEstimate) : null,
+  };
 };
 
 export const approveSubscription = async (id, token) => {
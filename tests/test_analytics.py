@@ -0,0 +1,113 @@
+import httpx
+import uuid
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def get_auth_headers():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    return login(email, "password123")
+
+
+def route_report(headers, trip):
+    """The route's utilization row for the trip's day."""
+    day = {"date_from": trip["trip_date"], "date_to": trip["trip_date"]}
+    rows = httpx.get(f"{BASE_URL}/analytics/utilization", params={**day, "group_by": "route"}, headers=headers).json()
+    return next((row for row in rows if row["route_id"] == trip["route_id"]), None)
+
+
+def check_seats_booked(headers, staff_headers):
+    """A token bought on a trip shows up in its route's numbers for that day."""
+    trips = httpx.get(f"{BASE_URL}/trips/availability", headers=staff_headers).json()
+    trip = next((t for t in trips if t["status"] == "SCHEDULED" and t["available_seats"] > 0), None)
+    if trip is None:
+        print("⚠️ No scheduled trip with free seats to test against")
+        return None, None
+    before = route_report(headers, trip)
+
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    stop_id = next(route["stops"][0]["id"] for route in directory["routes"] if route["id"] == trip["route_id"])
+    bought = httpx.post(f"{BASE_URL}/tokens/", headers={**staff_headers, "Idempotency-Key": str(uuid.uuid4())},
+                        json={"trip_id": trip["id"], "pickup_stop_id": stop_id})
+    print(f"Bought a token: {bought.status_code}")
+
+    after = route_report(headers, trip)
+    # Every trip of the route that day, as the availability list counts them
+    same_day = httpx.get(f"{BASE_URL}/trips/availability", headers=staff_headers, params={
+        "date_from": trip["trip_date"], "date_to": trip["trip_date"], "route_id": trip["route_id"],
+    }).json()
+    print(f"Route on {trip['trip_date']}: before {before}, after {after}")
+    return (
+        bought.status_code == 201 and after is not None
+        and after["seats_booked"] == (before["seats_booked"] if before else 0) + 1
+        and after["seats_booked"] == sum(t["booked_seats"] for t in same_day)
+        and after["trips"] == len(same_day)
+        and after["seats_offered"] == sum(t["total_capacity"] for t in same_day)
+    ), trip
+
+
+def check_stop_load(headers, trip):
+    """Stop rows come back per route in stop order, and add up to the seats booked."""
+    day = {"date_from": trip["trip_date"], "date_to": trip["trip_date"]}
+    response = httpx.get(f"{BASE_URL}/analytics/stop-load", params={**day, "route_id": trip["route_id"]}, headers=headers)
+    rows = response.json()
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    stops = next(route["stops"] for route in directory["routes"] if route["id"] == trip["route_id"])
+    booked = route_report(headers, trip)["seats_booked"]
+    print(f"Stop load: {[(row['stop_name'], row['boardings']) for row in rows]}")
+    return (
+        response.status_code == 200
+        and [row["stop_id"] for row in rows] == [stop["id"] for stop in stops]
+        and [row["sequence_number"] for row in rows] == sorted(row["sequence_number"] for row in rows)
+        and sum(row["boardings"] for row in rows) == booked
+    )
+
+
+def test_analytics():
+    try:
+        headers = login(TO_EMAIL, TO_PASSWORD)
+
+        ok = True
+        for group_by in ("route", "departure", "vehicle"):
+            print(f"Attempting to get utilization by {group_by}...")
+            response = httpx.get(f"{BASE_URL}/analytics/utilization", params={"group_by": group_by}, headers=headers)
+            print(f"Status Code: {response.status_code}")
+            print(f"Response: {response.json()}")
+            ok = ok and response.status_code == 200
+
+        print("Attempting to get stop load...")
+        response = httpx.get(f"{BASE_URL}/analytics/stop-load", headers=headers)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        ok = ok and response.status_code == 200
+
+        booked, trip = check_seats_booked(headers, get_auth_headers())
+        if booked is None:
+            print("⚠️ Analytics Test Incomplete")
+            return
+        ok = ok and booked and check_stop_load(headers, trip)
+
+        if ok:
+            print("✅ Analytics Test Passed")
+        else:
+            print("❌ Analytics Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_analytics()
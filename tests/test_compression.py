@@ -0,0 +1,52 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def varies(response):
+    return "accept-encoding" in response.headers.get("vary", "").lower()
+
+
+def test_compression():
+    try:
+        headers = login(TO_EMAIL, TO_PASSWORD)
+
+        # A large orjson-encoded list, asked for with and without gzip
+        print("Attempting to get trip availability gzipped and plain...")
+        zipped = httpx.get(f"{BASE_URL}/trips/availability", headers={**headers, "Accept-Encoding": "gzip"})
+        plain = httpx.get(f"{BASE_URL}/trips/availability", headers={**headers, "Accept-Encoding": "identity"})
+        print(f"Gzipped: {zipped.status_code} {zipped.headers.get('content-encoding')} Vary {zipped.headers.get('vary')}")
+        print(f"Plain: {plain.status_code} {plain.headers.get('content-encoding')} Vary {plain.headers.get('vary')}")
+        large_ok = (
+            zipped.status_code == 200 and plain.status_code == 200
+            and zipped.headers.get("content-encoding") == "gzip"
+            and "content-encoding" not in plain.headers
+            and plain.headers.get("content-type") == "application/json"
+            and zipped.json() == plain.json()
+            and varies(zipped) and varies(plain)
+        )
+
+        # Below COMPRESSION_MIN_SIZE nothing is compressed, but caches must still vary
+        print("Attempting to get a small response...")
+        small = httpx.get(f"{BASE_URL}/notifications/unread-count", headers={**headers, "Accept-Encoding": "gzip"})
+        print(f"Small: {small.status_code} {small.headers.get('content-encoding')} Vary {small.headers.get('vary')}")
+        small_ok = small.status_code == 200 and "content-encoding" not in small.headers and varies(small)
+
+        if large_ok and small_ok:
+            print("✅ Compression Test Passed")
+        else:
+            print("❌ Compression Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_compression()
@@ -0,0 +1,154 @@
+import sys
+import uuid
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+# Removes its test subscription in-process: start the server first and use
+# the same DATABASE_URL here
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import Subscription
+from app.models.trip import Trip
+from app.services.manifests import invalidate_manifests
+from app.services.seats import release_seats
+from app.services.versioning import bump_versions, inventory_keys, subscription_key
+
+engine.echo = False
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def get_auth_headers():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    return login(email, "password123")
+
+
+def revalidate(path, headers, etag, **params):
+    return httpx.get(f"{BASE_URL}{path}", headers={**headers, "If-None-Match": etag}, params=params)
+
+
+def remove_subscription(subscription_id):
+    """Delete a test subscription and give back its seats, freeing its stop."""
+    with Session(engine) as session:
+        subscription = session.get(Subscription, subscription_id)
+        if subscription is None:
+            return
+        trip_ids = session.exec(
+            delete(SeatAllocation)
+            .where(SeatAllocation.user_id == subscription.user_id, SeatAllocation.seat_type == "SUBSCRIPTION")
+            .returning(SeatAllocation.trip_id)
+        ).scalars().all()
+        if trip_ids:
+            release_seats(session, Counter(trip_ids))
+            invalidate_manifests(session, trip_ids=set(trip_ids))
+            route_ids = session.exec(select(Trip.route_id).where(Trip.id.in_(set(trip_ids))).distinct()).all()
+            bump_versions(session, *inventory_keys(*route_ids))
+        bump_versions(session, subscription_key(subscription.user_id))
+        session.delete(subscription)
+        session.commit()
+
+
+def check_subscription_etag(headers, to_headers):
+    # Any stop nobody has subscribed to yet will do
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    subscription = None
+    for stop in (stop for route in directory["routes"] for stop in route["stops"]):
+        response = httpx.post(f"{BASE_URL}/subscription/", headers=headers, json={
+            "start_month": "01",
+            "end_month": "12",
+            "year": 2030,
+            "stop_name": stop["stop_name"],
+        })
+        if response.status_code == 200:
+            subscription = response.json()
+            break
+    if subscription is None:
+        print("⚠️ No free stop to subscribe to")
+        return None
+    try:
+        first = httpx.get(f"{BASE_URL}/subscription/", headers=headers)
+        etag = first.headers.get("etag")
+        cached = revalidate("/subscription/", headers, etag)
+        print(f"Subscription: {first.status_code} ETag {etag}, revalidated {cached.status_code}")
+
+        print("Approving the subscription...")
+        httpx.put(f"{BASE_URL}/subscription/{subscription['id']}/approve", headers=to_headers, params={"force": "true"})
+        changed = revalidate("/subscription/", headers, etag)
+        print(f"After approval: {changed.status_code} ETag {changed.headers.get('etag')}")
+
+        return (
+            first.status_code == 200 and cached.status_code == 304
+            and changed.status_code == 200 and changed.headers.get("etag") not in (None, etag)
+            and changed.json()["status"] == "ACTIVE"
+        )
+    finally:
+        # stop_name is unique, so a subscription left behind would hold its stop for good
+        remove_subscription(subscription["id"])
+
+
+def check_availability_etag(headers):
+    first = httpx.get(f"{BASE_URL}/trips/availability", headers=headers)
+    etag = first.headers.get("etag")
+    cached = revalidate("/trips/availability", headers, etag)
+    print(f"Availability: {first.status_code} ETag {etag}, revalidated {cached.status_code}")
+
+    trip = next((t for t in first.json() if t["status"] == "SCHEDULED" and t["available_seats"] > 0), None)
+    if trip is None:
+        print("⚠️ No scheduled trip with free seats to test against")
+        return None
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    stop_id = next(route["stops"][0]["id"] for route in directory["routes"] if route["id"] == trip["route_id"])
+
+    print("Buying a token...")
+    bought = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": str(uuid.uuid4())},
+                        json={"trip_id": trip["id"], "pickup_stop_id": stop_id})
+    changed = revalidate("/trips/availability", headers, etag)
+    print(f"After purchase ({bought.status_code}): {changed.status_code} ETag {changed.headers.get('etag')}")
+
+    return (
+        first.status_code == 200 and cached.status_code == 304
+        and bought.status_code == 201
+        and changed.status_code == 200 and changed.headers.get("etag") not in (None, etag)
+    )
+
+
+def test_conditional_get():
+    try:
+        headers = get_auth_headers()
+        to_headers = login(TO_EMAIL, TO_PASSWORD)
+
+        results = [check_subscription_etag(headers, to_headers), check_availability_etag(headers)]
+        if False in results:
+            print("❌ Conditional GET Test Failed")
+        elif None in results:
+            print("⚠️ Conditional GET Test Incomplete")
+        else:
+            print("✅ Conditional GET Test Passed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_conditional_get()
@@ -0,0 +1,91 @@
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import httpx
+
+# Runs the forecast job in-process against the server's database: start the
+# server first and use the same DATABASE_URL here
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete, insert
+from sqlmodel import Session, func, select
+
+from app.db.session import engine
+from app.models.demand_forecast import DemandForecast
+from app.models.trip import Trip
+from app.services.forecast import update_demand_forecast
+
+engine.echo = False
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def check_update_job():
+    """The job folds a day with trips into the table once, and only once."""
+    with Session(engine) as session:
+        saved = [row.model_dump() for row in session.exec(select(DemandForecast)).all()]
+        seen = session.exec(select(func.max(DemandForecast.observed_through))).one()
+        # The first day with trips that the job has not read yet
+        statement = select(func.min(Trip.trip_date))
+        if seen:
+            statement = statement.where(Trip.trip_date > seen)
+        day = session.exec(statement).one()
+    if day is None:
+        print("⚠️ No trips on days the forecast has not read yet")
+        return None
+
+    try:
+        # As if the job ran the night after that day
+        print(f"Running update_demand_forecast through {day}...")
+        first = update_demand_forecast(today=day + timedelta(days=1))
+        with Session(engine) as session:
+            folded = session.exec(
+                select(func.count()).select_from(DemandForecast).where(DemandForecast.observed_through == day)
+            ).one()
+        second = update_demand_forecast(today=day + timedelta(days=1))
+        print(f"First run: {first} rows ({folded} through {day}), second run: {second} rows")
+        return first > 0 and folded == first and second == 0
+    finally:
+        # Put the table back, so the nightly job still starts from its own watermark
+        with Session(engine) as session:
+            session.exec(delete(DemandForecast))
+            if saved:
+                session.exec(insert(DemandForecast), params=saved)
+            session.commit()
+
+
+def test_demand_forecast():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        print("Attempting to get the demand forecast...")
+        response = httpx.get(f"{BASE_URL}/subscription/demand-forecast", headers=headers)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        # The forecast is filled by the nightly job, so an empty list is fine
+        if response.status_code != 200 or not isinstance(response.json(), list):
+            print("❌ Demand Forecast Test Failed")
+            return
+
+        updated = check_update_job()
+        if updated is False:
+            print("❌ Demand Forecast Update Failed")
+        elif updated is None:
+            print("⚠️ Demand Forecast Test Incomplete")
+        else:
+            print("✅ Demand Forecast Test Passed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_demand_forecast()
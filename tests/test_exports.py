@@ -0,0 +1,42 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def test_exports():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        ok = True
+        for table in ("subscriptions", "seat-allocations", "payments"):
+            print(f"Attempting to export {table}...")
+            rows = 0
+            with httpx.stream("GET", f"{BASE_URL}/exports/{table}", headers=headers) as response:
+                print(f"Status Code: {response.status_code}")
+                for line in response.iter_lines():
+                    rows += 1
+            print(f"Lines (with header): {rows}")
+            ok = ok and response.status_code == 200 and rows >= 1
+
+        print("Attempting a gzipped JSON-lines export...")
+        response = httpx.get(f"{BASE_URL}/exports/payments", params={"format": "jsonl", "gzip": "true"}, headers=headers)
+        print(f"Content-Type: {response.headers.get('content-type')}")
+        ok = ok and response.status_code == 200 and response.headers.get("content-type") == "application/gzip"
+
+        if ok:
+            print("✅ Exports Test Passed")
+        else:
+            print("❌ Exports Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_exports()
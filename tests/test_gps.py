@@ -0,0 +1,64 @@
+import httpx
+from datetime import datetime, timedelta, timezone
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def test_gps():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        trips = httpx.get(f"{BASE_URL}/trips/availability", headers=headers).json()
+        trip = next((t for t in trips if t["status"] == "STARTED"), None)
+        if trip is None:
+            trip = next((t for t in trips if t["status"] == "SCHEDULED"), None)
+            if trip is None:
+                print("⚠️ No trip to start, skipping GPS test")
+                return
+            httpx.put(f"{BASE_URL}/trips/{trip['id']}/status", headers=headers, json={"status": "STARTED"})
+
+        now = datetime.now(timezone.utc)
+        pings = [
+            {
+                "latitude": 23.8103 + i * 0.0005,
+                "longitude": 90.4125,
+                "speed_kmh": 24.5,
+                "heading": 15,
+                "recorded_at": (now + timedelta(seconds=i)).isoformat(),
+            }
+            for i in range(5)
+        ]
+        # A fix from two days ago is rejected, the rest accepted
+        pings.append({**pings[0], "recorded_at": (now - timedelta(days=2)).isoformat()})
+
+        print("Attempting to report positions...")
+        response = httpx.post(
+            f"{BASE_URL}/vehicles/{trip['vehicle_id']}/positions",
+            headers=headers,
+            json={"pings": pings},
+        )
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        if response.status_code != 202 or response.json() != {"accepted": 5, "rejected": 1}:
+            print("❌ GPS Ingest Test Failed")
+            return
+
+        position = httpx.get(f"{BASE_URL}/vehicles/{trip['vehicle_id']}/position", headers=headers).json()
+        print(f"Position: {position}")
+        if abs(position["latitude"] - pings[4]["latitude"]) < 1e-9 and position["trip_id"] == trip["id"]:
+            print("✅ GPS Test Passed")
+        else:
+            print("❌ Live position is not the newest ping")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_gps()
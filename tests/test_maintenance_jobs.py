@@ -0,0 +1,186 @@
+import sys
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+# Runs the jobs in-process against the server's database: start the server
+# first and use the same DATABASE_URL here
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.seat_allocation import SeatAllocation
+from app.models.subscription import Subscription
+from app.models.token import Token
+from app.models.trip import Trip
+from app.models.trip_inventory import TripInventory
+from app.services.maintenance import expire_subscriptions, expire_tokens
+from app.services.manifests import invalidate_manifests
+from app.services.seats import release_seats
+from app.services.versioning import bump_versions, inventory_keys, subscription_key
+
+engine.echo = False
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def get_auth_headers():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    return login(email, "password123")
+
+
+def booked(session, trip_ids):
+    rows = session.exec(select(TripInventory.trip_id, TripInventory.booked).where(TripInventory.trip_id.in_(trip_ids)))
+    return dict(rows.all())
+
+
+def give_back_seats(session, *conditions):
+    """Delete the matching seats and return them to trip inventory."""
+    trip_ids = session.exec(delete(SeatAllocation).where(*conditions).returning(SeatAllocation.trip_id)).scalars().all()
+    if trip_ids:
+        release_seats(session, Counter(trip_ids))
+        invalidate_manifests(session, trip_ids=set(trip_ids))
+        route_ids = session.exec(select(Trip.route_id).where(Trip.id.in_(set(trip_ids))).distinct()).all()
+        bump_versions(session, *inventory_keys(*route_ids))
+
+
+def remove_subscription(subscription_id):
+    """Delete a test subscription, freeing its stop: stop_name is unique."""
+    with Session(engine) as session:
+        subscription = session.get(Subscription, subscription_id)
+        if subscription is None:
+            return
+        give_back_seats(session, SeatAllocation.user_id == subscription.user_id, SeatAllocation.seat_type == "SUBSCRIPTION")
+        bump_versions(session, subscription_key(subscription.user_id))
+        session.delete(subscription)
+        session.commit()
+
+
+def check_expire_subscriptions(headers, to_headers):
+    today = date.today()
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    subscription = None
+    for stop in (stop for route in directory["routes"] for stop in route["stops"]):
+        response = httpx.post(f"{BASE_URL}/subscription/", headers=headers, json={
+            "start_month": f"{today.month:02d}",
+            "end_month": "12",
+            "year": today.year,
+            "stop_name": stop["stop_name"],
+        })
+        if response.status_code == 200:
+            subscription = response.json()
+            break
+    if subscription is None:
+        print("⚠️ No free stop to subscribe to")
+        return None
+    try:
+        httpx.put(f"{BASE_URL}/subscription/{subscription['id']}/approve", headers=to_headers, params={"force": "true"})
+
+        with Session(engine) as session:
+            trip_ids = session.exec(
+                select(SeatAllocation.trip_id)
+                .join(Trip, Trip.id == SeatAllocation.trip_id)
+                .where(SeatAllocation.user_id == uuid.UUID(subscription["user_id"]))
+                .where(SeatAllocation.seat_type == "SUBSCRIPTION")
+                .where(Trip.trip_date >= today)
+            ).all()
+            if not trip_ids:
+                print("⚠️ Approval gave the subscriber no upcoming seats")
+                return None
+            before = booked(session, trip_ids)
+            # As if the subscription had ended yesterday
+            session.exec(update(Subscription).where(Subscription.id == subscription["id"]).values(end_date=today - timedelta(days=1)))
+            session.commit()
+
+        print("Running expire_subscriptions...")
+        expired = expire_subscriptions()
+        with Session(engine) as session:
+            status = session.get(Subscription, subscription["id"]).status
+            left = session.exec(
+                select(SeatAllocation.id)
+                .where(SeatAllocation.user_id == uuid.UUID(subscription["user_id"]))
+                .where(SeatAllocation.trip_id.in_(trip_ids))
+            ).all()
+            after = booked(session, trip_ids)
+        print(f"Expired: {expired}, status: {status}, seats left: {len(left)}")
+        print(f"Booked before: {sorted(before.values())}, after: {sorted(after.values())}")
+
+        return (
+            expired >= 1 and status == "INACTIVE" and not left
+            and all(after[trip_id] == before[trip_id] - trip_ids.count(trip_id) for trip_id in before)
+        )
+    finally:
+        remove_subscription(subscription["id"])
+
+
+def check_expire_tokens(headers):
+    trips = httpx.get(f"{BASE_URL}/trips/availability", headers=headers).json()
+    trip = next((t for t in trips if t["status"] == "SCHEDULED" and t["available_seats"] > 0), None)
+    if trip is None:
+        print("⚠️ No scheduled trip with free seats to test against")
+        return None
+    directory = httpx.get(f"{BASE_URL}/routes").json()
+    stop_id = next(route["stops"][0]["id"] for route in directory["routes"] if route["id"] == trip["route_id"])
+    token = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": str(uuid.uuid4())},
+                       json={"trip_id": trip["id"], "pickup_stop_id": stop_id}).json()
+
+    try:
+        with Session(engine) as session:
+            session.exec(update(Token).where(Token.id == token["id"]).values(travel_date=date.today() - timedelta(days=1)))
+            session.commit()
+
+        print("Running expire_tokens...")
+        expired = expire_tokens()
+        with Session(engine) as session:
+            status = session.get(Token, token["id"]).status
+            # The trip ran, so its seat stays as history
+            kept = session.exec(select(SeatAllocation.id).where(SeatAllocation.token_id == token["id"])).all()
+        print(f"Expired: {expired}, status: {status}, seat kept: {bool(kept)}")
+    finally:
+        # The trip itself is still upcoming: give the seat back so its manifest matches again
+        with Session(engine) as session:
+            give_back_seats(session, SeatAllocation.token_id == token["id"])
+            session.commit()
+
+    return expired >= 1 and status == "EXPIRED" and bool(kept)
+
+
+def test_maintenance_jobs():
+    try:
+        to_headers = login(TO_EMAIL, TO_PASSWORD)
+        results = [
+            check_expire_subscriptions(get_auth_headers(), to_headers),
+            check_expire_tokens(get_auth_headers()),
+        ]
+        if False in results:
+            print("❌ Maintenance Jobs Test Failed")
+        elif None in results:
+            print("⚠️ Maintenance Jobs Test Incomplete")
+        else:
+            print("✅ Maintenance Jobs Test Passed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_maintenance_jobs()
@@ -0,0 +1,35 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_metrics():
+    try:
+        # Generate at least one request so the HTTP series exist
+        httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": "nobody@iut-dhaka.edu",
+            "password": "password123"
+        })
+
+        print("Attempting to scrape metrics...")
+        response = httpx.get(f"{BASE_URL}/metrics")
+        print(f"Status Code: {response.status_code}")
+
+        body = response.text
+        expected = [
+            "nexusride_http_request_duration_seconds_bucket",
+            "nexusride_http_requests_in_flight",
+            "nexusride_bcrypt_queue_depth",
+            'route="/auth/login"',
+        ]
+        missing = [name for name in expected if name not in body]
+
+        if response.status_code == 200 and not missing:
+            print("✅ Metrics Test Passed")
+        else:
+            print(f"❌ Metrics Test Failed (missing: {missing})")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_metrics()
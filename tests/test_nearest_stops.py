@@ -0,0 +1,31 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_nearest_stops():
+    try:
+        print("Attempting nearest-stop lookup near Banani...")
+        response = httpx.get(
+            f"{BASE_URL}/routes/stops/nearest",
+            params={"lat": 23.7940, "lon": 90.4043, "k": 3},
+        )
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+
+        stops = response.json()
+        distances = [stop["distance_m"] for stop in stops]
+        if (
+            response.status_code == 200
+            and len(stops) == 3
+            and stops[0]["stop_name"] == "Banani"
+            and distances == sorted(distances)
+        ):
+            print("✅ Nearest Stops Test Passed")
+        else:
+            print("❌ Nearest Stops Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_nearest_stops()
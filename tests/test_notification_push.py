@@ -0,0 +1,76 @@
+import httpx
+import threading
+import time
+import uuid
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+CANDIDATE_STOPS = ["Uttara Sector 7", "Airport", "Mirpur 10", "Bijoy Sarani", "Banani", "Farmgate"]
+
+
+def login(email, password):
+    res = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return res.json()["access_token"]
+
+
+def test_notification_push():
+    try:
+        email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+        httpx.post(f"{BASE_URL}/auth/signup", json={
+            "email": email,
+            "password": "password123",
+            "full_name": "Push Tester"
+        })
+        token = login(email, "password123")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        events = []
+
+        def listen():
+            # EventSource-style: token in the query string
+            with httpx.stream("GET", f"{BASE_URL}/notifications/stream?token={token}", timeout=15) as res:
+                for line in res.iter_lines():
+                    if line.startswith("data: {"):
+                        events.append(line)
+                        return
+
+        listener = threading.Thread(target=listen, daemon=True)
+        listener.start()
+        time.sleep(0.5)
+
+        subscription_id = None
+        for stop_name in CANDIDATE_STOPS:
+            res = httpx.post(f"{BASE_URL}/subscription/", headers=headers, json={
+                "start_month": "01",
+                "end_month": "01",
+                "year": 2030,
+                "stop_name": stop_name,
+            })
+            if res.status_code == 200:
+                subscription_id = res.json()["id"]
+                break
+        if subscription_id is None:
+            print("⚠️ No free stop to subscribe to, skipping push test")
+            return
+
+        print("Declining subscription and waiting for the pushed event...")
+        httpx.put(
+            f"{BASE_URL}/subscription/{subscription_id}/decline",
+            headers={"Authorization": f"Bearer {login(TO_EMAIL, TO_PASSWORD)}"},
+        )
+        listener.join(10)
+
+        print(f"Events: {events}")
+        if events and "declined" in events[0]:
+            print("✅ Notification Push Test Passed")
+        else:
+            print("❌ No notification event received")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_notification_push()
@@ -0,0 +1,74 @@
+import httpx
+import time
+import uuid
+from datetime import date
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+# Stop names are unique per subscription, so try a few until one is free
+CANDIDATE_STOPS = ["Uttara Sector 7", "Airport", "Mirpur 10", "Bijoy Sarani", "Banani", "Farmgate"]
+
+
+def login(email, password):
+    res = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+def test_notifications():
+    try:
+        email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+        httpx.post(f"{BASE_URL}/auth/signup", json={
+            "email": email,
+            "password": "password123",
+            "full_name": "Notification Tester"
+        })
+        headers = login(email, "password123")
+
+        today = date.today()
+        subscription_id = None
+        for stop_name in CANDIDATE_STOPS:
+            res = httpx.post(f"{BASE_URL}/subscription/", headers=headers, json={
+                "start_month": f"{today.month:02d}",
+                "end_month": f"{today.month:02d}",
+                "year": today.year,
+                "stop_name": stop_name,
+            })
+            if res.status_code == 200:
+                subscription_id = res.json()["id"]
+                break
+        if subscription_id is None:
+            print("⚠️ No free stop to subscribe to, skipping notification test")
+            return
+
+        httpx.put(f"{BASE_URL}/subscription/{subscription_id}/decline", headers=login(TO_EMAIL, TO_PASSWORD))
+        time.sleep(1)  # notifications are written in the background
+
+        print("Attempting to get unread count...")
+        response = httpx.get(f"{BASE_URL}/notifications/unread-count", headers=headers)
+        print(f"Response: {response.json()}")
+        if response.json().get("unread", 0) < 1:
+            print("❌ Decline did not produce a notification")
+            return
+
+        listed = httpx.get(f"{BASE_URL}/notifications/", headers=headers).json()
+        if listed and "declined" in listed[0]["message"]:
+            print("✅ Notification listed")
+        else:
+            print(f"❌ Unexpected notifications: {listed}")
+
+        marked = httpx.put(f"{BASE_URL}/notifications/read-all", headers=headers).json()
+        count = httpx.get(f"{BASE_URL}/notifications/unread-count", headers=headers).json()
+        print(f"Marked: {marked}, unread now: {count}")
+        if marked.get("updated", 0) >= 1 and count.get("unread") == 0:
+            print("✅ Notifications Test Passed")
+        else:
+            print("❌ Mark-all-read Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_notifications()
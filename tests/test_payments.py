@@ -0,0 +1,67 @@
+import httpx
+import uuid
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def login(email, password):
+    res = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+def month_total(report, payment_type):
+    return sum(
+        float(row["total_amount"]) for row in report
+        if row["payment_type"] == payment_type and row["status"] == "SUCCESS"
+    )
+
+
+def test_payments():
+    try:
+        email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+        httpx.post(f"{BASE_URL}/auth/signup", json={
+            "email": email,
+            "password": "password123",
+            "full_name": "Payment Tester"
+        })
+        staff_headers = login(email, "password123")
+        user_id = httpx.get(f"{BASE_URL}/auth/me", headers=staff_headers).json()["id"]
+        to_headers = login(TO_EMAIL, TO_PASSWORD)
+
+        before = httpx.get(f"{BASE_URL}/payments/revenue", headers=to_headers).json()
+
+        print("Attempting to record payment...")
+        response = httpx.post(f"{BASE_URL}/payments/", headers=to_headers, json={
+            "user_id": user_id,
+            "amount": "1200.00",
+            "payment_type": "SUBSCRIPTION",
+            "status": "SUCCESS",
+        })
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        if response.status_code != 201:
+            print("❌ Payment POST Test Failed")
+            return
+
+        mine = httpx.get(f"{BASE_URL}/payments/", headers=staff_headers).json()
+        if any(payment["id"] == response.json()["id"] for payment in mine):
+            print("✅ Payment listed for user")
+        else:
+            print("❌ Payment missing from user's list")
+
+        after = httpx.get(f"{BASE_URL}/payments/revenue", headers=to_headers).json()
+        added = month_total(after, "SUBSCRIPTION") - month_total(before, "SUBSCRIPTION")
+        print(f"Revenue: {after}")
+        if abs(added - 1200.0) < 0.001:
+            print("✅ Payments Test Passed")
+        else:
+            print(f"❌ Revenue rollup grew by {added}, expected 1200.00")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_payments()
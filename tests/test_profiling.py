@@ -0,0 +1,77 @@
+import httpx
+import os
+import time
+import uuid
+from pathlib import Path
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+# Start the server with PROFILE_DIR set, and run this with the same value
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def get_auth_headers():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    return login(email, "password123")
+
+
+def reports(slug):
+    return set(PROFILE_DIR.glob(f"*-requested-GET-{slug}-*.folded"))
+
+
+def profile_request(headers, path, slug, attempts=20):
+    """New requested-profile files after asking for profiles of `path`."""
+    before = reports(slug)
+    for _ in range(attempts):
+        httpx.get(f"{BASE_URL}{path}", headers={**headers, "X-Profile": "1"})
+        # The report is written once the response has been sent
+        time.sleep(0.2)
+        # A handler done within one sampling interval leaves no stacks and
+        # no file, which happens to a good share of fast requests
+        if reports(slug) - before:
+            break
+    return reports(slug) - before
+
+
+def test_profiling():
+    try:
+        print("Attempting to profile a request as staff...")
+        staff = profile_request(get_auth_headers(), "/notifications/unread-count", "notifications_unread_count", attempts=2)
+        print(f"Reports written: {len(staff)}")
+
+        print("Attempting to profile a request as the Transport Officer...")
+        officer = profile_request(login(TO_EMAIL, TO_PASSWORD), "/trips/availability", "trips_availability")
+        print(f"Reports written: {[path.name for path in officer]}")
+
+        if staff or not officer:
+            print("❌ Profiling Test Failed")
+            return
+
+        # Folded stacks, "frame;frame;frame count", all taken inside the
+        # profiled endpoint wrapper of the handler's thread
+        lines = next(iter(officer)).read_text().splitlines()
+        folded = all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        if lines and folded and all("(profiling.py:" in line for line in lines):
+            print("✅ Profiling Test Passed")
+        else:
+            print("❌ Profiling report is not in folded format")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_profiling()
@@ -0,0 +1,125 @@
+import sys
+from datetime import date, time, timedelta
+from pathlib import Path
+from uuid import UUID
+
+import httpx
+
+# Two clashing trips are inserted in-process, past the validation the API
+# does: start the server first and use the same DATABASE_URL here
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.db.session import engine
+from app.models.profile import DriverProfile
+from app.models.route import Route
+from app.models.trip import Trip
+from app.models.trip_inventory import TripInventory
+from app.models.vehicle import Vehicle
+
+engine.echo = False
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def create_clashing_trips(day):
+    """Two trips on `day` at the same time with the same driver and bus."""
+    with Session(engine) as session:
+        route_id = session.exec(select(Route.id)).first()
+        driver_id = session.exec(select(DriverProfile.id).order_by(DriverProfile.id)).first()
+        vehicle_id = session.exec(
+            select(Vehicle.id).where(Vehicle.status != "UNDER_REPAIR").order_by(Vehicle.vehicle_number)
+        ).first()
+        trips = [
+            Trip(route_id=route_id, driver_profile_id=driver_id, vehicle_id=vehicle_id,
+                 trip_date=day, start_time=time(7, 30), status="SCHEDULED")
+            for _ in range(2)
+        ]
+        session.add_all(trips)
+        session.commit()
+        return [str(trip.id) for trip in trips], driver_id, str(vehicle_id)
+
+
+def remove_trips(trip_ids):
+    trip_ids = [UUID(trip_id) for trip_id in trip_ids]
+    with Session(engine) as session:
+        session.exec(delete(TripInventory).where(TripInventory.trip_id.in_(trip_ids)))
+        session.exec(delete(Trip).where(Trip.id.in_(trip_ids)))
+        session.commit()
+
+
+def check_conflict_resolution(headers):
+    # Far enough ahead that no seeded trip shares the day
+    day = date.today() + timedelta(days=400)
+    window = {"date_from": str(day), "date_to": str(day)}
+    trip_ids, driver_id, vehicle_id = create_clashing_trips(day)
+    try:
+        print("Attempting to put the second trip on the first one's driver and bus...")
+        refused = httpx.put(f"{BASE_URL}/trips/{trip_ids[1]}/assignment", headers=headers,
+                            json={"driver_profile_id": driver_id, "vehicle_id": vehicle_id})
+        print(f"Status Code: {refused.status_code}")
+
+        conflicts = httpx.get(f"{BASE_URL}/trips/conflicts", headers=headers, params=window).json()
+        kinds = sorted(c["kind"] for c in conflicts if sorted(c["trip_ids"]) == sorted(trip_ids))
+        print(f"Conflicts: {kinds}")
+
+        print("Attempting to auto-assign the day...")
+        result = httpx.post(f"{BASE_URL}/trips/auto-assign", headers=headers, params=window).json()
+        print(f"Response: {result}")
+        after = httpx.get(f"{BASE_URL}/trips/conflicts", headers=headers, params=window).json()
+        print(f"Conflicts after: {after}")
+    finally:
+        remove_trips(trip_ids)
+
+    # One of the pair moves to a free driver and bus, and nothing clashes after
+    moved = [r["trip_id"] for r in result["reassigned"]]
+    return (
+        refused.status_code == 409
+        and kinds == ["DRIVER", "VEHICLE"]
+        and len(moved) == 1 and moved[0] in trip_ids
+        and result["unresolved_trip_ids"] == []
+        and after == []
+    )
+
+def test_roster():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        print("Attempting to get roster conflicts...")
+        response = httpx.get(f"{BASE_URL}/trips/conflicts", headers=headers)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        if response.status_code != 200:
+            print("❌ Roster Conflicts Test Failed")
+            return
+
+        print("Attempting to auto-assign the roster...")
+        first = httpx.post(f"{BASE_URL}/trips/auto-assign", headers=headers)
+        print(f"Response: {first.json()}")
+        # Whatever could be resolved is, so a second run changes nothing
+        second = httpx.post(f"{BASE_URL}/trips/auto-assign", headers=headers)
+        print(f"Second run: {second.json()}")
+        if not (first.status_code == 200 and second.status_code == 200 and second.json()["reassigned"] == []):
+            print("❌ Roster Test Failed")
+            return
+
+        if check_conflict_resolution(headers):
+            print("✅ Roster Test Passed")
+        else:
+            print("❌ Roster conflict resolution Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_roster()
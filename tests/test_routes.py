@@ -0,0 +1,42 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_routes():
+    try:
+        print("Attempting to get the route directory...")
+        response = httpx.get(f"{BASE_URL}/routes")
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+
+        if response.status_code != 200:
+            print("❌ Route Directory Test Failed")
+            return
+
+        data = response.json()
+        ordered = all(
+            [stop["sequence_number"] for stop in route["stops"]]
+            == sorted(stop["sequence_number"] for stop in route["stops"])
+            for route in data["routes"]
+        )
+        if not ordered:
+            print("❌ Stops are not in sequence order")
+            return
+
+        etag = response.headers.get("etag")
+        cached = httpx.get(f"{BASE_URL}/routes", headers={"If-None-Match": etag})
+        print(f"Conditional Status Code: {cached.status_code}")
+
+        versioned = httpx.get(f"{BASE_URL}/routes", params={"v": data["version"]})
+        print(f"Versioned Cache-Control: {versioned.headers.get('cache-control')}")
+
+        if cached.status_code == 304 and "immutable" in versioned.headers.get("cache-control", ""):
+            print("✅ Route Directory Test Passed")
+        else:
+            print("❌ Route Directory caching Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_routes()
@@ -0,0 +1,29 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def test_stop_search():
+    try:
+        print("Attempting prefix search...")
+        response = httpx.get(f"{BASE_URL}/routes/stops/search", params={"q": "Utt"})
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        prefix_ok = response.status_code == 200 and any(
+            stop["stop_name"] == "Uttara Sector 7" for stop in response.json()
+        )
+
+        print("Attempting fuzzy search...")
+        response = httpx.get(f"{BASE_URL}/routes/stops/search", params={"q": "Mirpor"})
+        print(f"Response: {response.json()}")
+        fuzzy_ok = response.status_code == 200 and response.json() and response.json()[0]["stop_name"] == "Mirpur 10"
+
+        if prefix_ok and fuzzy_ok:
+            print("✅ Stop Search Test Passed")
+        else:
+            print("❌ Stop Search Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_stop_search()
@@ -0,0 +1,98 @@
+import httpx
+import uuid
+from datetime import date, timedelta
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+# Stop names are unique per subscription, so try a few until one is free
+CANDIDATE_STOPS = ["Banani", "Mohakhali", "Farmgate", "Agargaon", "Shahbagh", "Motijheel"]
+
+
+def login(email, password):
+    res = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+def get_active_subscription():
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Leave Tester"
+    })
+    headers = login(email, "password123")
+
+    today = date.today()
+    for stop_name in CANDIDATE_STOPS:
+        res = httpx.post(f"{BASE_URL}/subscription/", headers=headers, json={
+            "start_month": f"{today.month:02d}",
+            "end_month": f"{today.month:02d}",
+            "year": today.year,
+            "stop_name": stop_name,
+        })
+        if res.status_code == 200:
+            subscription_id = res.json()["id"]
+            to_headers = login(TO_EMAIL, TO_PASSWORD)
+            httpx.put(f"{BASE_URL}/subscription/{subscription_id}/approve", headers=to_headers)
+            return headers, subscription_id
+    return headers, None
+
+
+def test_subscription_leave():
+    try:
+        headers, subscription_id = get_active_subscription()
+        if subscription_id is None:
+            print("⚠️ No free stop to subscribe to, skipping leave test")
+            return
+
+        # The subscription covers this month only
+        today = date.today()
+        until = today + timedelta(days=2)
+        if until.month != today.month:
+            until = today
+        body = {
+            "subscription_id": subscription_id,
+            "from_date": str(today),
+            "to_date": str(until),
+        }
+        print("Attempting to file leave...")
+        response = httpx.post(f"{BASE_URL}/subscription/leave", headers=headers, json=body)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        if response.status_code != 201 or "released_seats" not in response.json():
+            print("❌ Leave POST Test Failed")
+            return
+        leave_id = response.json()["id"]
+
+        overlap = httpx.post(f"{BASE_URL}/subscription/leave", headers=headers, json=body)
+        if overlap.status_code == 400:
+            print("✅ Overlapping leave rejected")
+        else:
+            print(f"❌ Overlapping leave returned {overlap.status_code}")
+
+        listed = httpx.get(f"{BASE_URL}/subscription/leave", headers=headers).json()
+        if any(leave["id"] == leave_id for leave in listed):
+            print("✅ Leave listed")
+        else:
+            print("❌ Leave missing from list")
+
+        print("Attempting to cancel leave...")
+        response = httpx.delete(f"{BASE_URL}/subscription/leave/{leave_id}", headers=headers)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+        # The leave is gone, so a repeated cancellation has no seats to restore
+        repeated = httpx.delete(f"{BASE_URL}/subscription/leave/{leave_id}", headers=headers)
+        print(f"Repeated cancel: {repeated.status_code}")
+        if response.status_code == 200 and "restored_seats" in response.json() and repeated.status_code == 404:
+            print("✅ Subscription Leave Test Passed")
+        else:
+            print("❌ Leave DELETE Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_subscription_leave()
@@ -0,0 +1,47 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def test_subscription_requests():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        print("Attempting to page through subscription requests...")
+        params = {"limit": 2, "sort": "start_date"}
+        response = httpx.get(f"{BASE_URL}/subscription/requests", headers=headers, params=params)
+        print(f"Status Code: {response.status_code}")
+        print(f"Estimated total: {response.headers.get('X-Total-Count-Estimate')}")
+        if response.status_code != 200:
+            print("❌ Subscription Requests Test Failed")
+            return
+
+        seen = [row["id"] for row in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        while cursor:
+            page = httpx.get(f"{BASE_URL}/subscription/requests", headers=headers,
+                             params={**params, "cursor": cursor})
+            seen += [row["id"] for row in page.json()]
+            cursor = page.headers.get("X-Next-Cursor")
+        print(f"Requests seen: {len(seen)}")
+
+        # Paging must visit every request exactly once
+        everything = httpx.get(f"{BASE_URL}/subscription/requests", headers=headers,
+                               params={"limit": 200, "sort": "start_date"})
+        if seen == [row["id"] for row in everything.json()] and len(set(seen)) == len(seen):
+            print("✅ Subscription Requests Test Passed")
+        else:
+            print("❌ Subscription Requests Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_subscription_requests()
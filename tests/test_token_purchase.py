@@ -0,0 +1,100 @@
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+
+# The replay-after-removal case deletes the seat in-process: use the
+# server's DATABASE_URL here
+project_root = Path(__file__).resolve().parents[1]
+sys.path.append(str(project_root))
+
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.db.session import engine
+from app.models.seat_allocation import SeatAllocation
+from app.services.seats import release_seats
+
+engine.echo = False
+
+BASE_URL = "http://127.0.0.1:8000"
+
+def get_auth_token():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    response = httpx.post(f"{BASE_URL}/auth/login", json={
+        "email": email,
+        "password": "password123"
+    })
+    return response.json()["access_token"]
+
+def test_token_purchase():
+    try:
+        token = get_auth_token()
+        headers = {"Authorization": f"Bearer {token}"}
+
+        trips = httpx.get(f"{BASE_URL}/trips/availability", headers=headers).json()
+        trip = next((t for t in trips if t["status"] == "SCHEDULED" and t["available_seats"] > 0), None)
+        if trip is None:
+            print("⚠️ No scheduled trip with free seats to test against")
+            return
+
+        directory = httpx.get(f"{BASE_URL}/routes", headers=headers)
+        stop_id = None
+        if directory.status_code == 200:
+            for route in directory.json()["routes"]:
+                if route["id"] == trip["route_id"]:
+                    stop_id = route["stops"][0]["id"]
+        if stop_id is None:
+            print("⚠️ Could not find a stop on the trip's route")
+            return
+
+        body = {"trip_id": trip["id"], "pickup_stop_id": stop_id}
+        key = str(uuid.uuid4())
+
+        print("Attempting to buy a token...")
+        first = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": key}, json=body)
+        print(f"Status Code: {first.status_code}")
+        print(f"Response: {first.json()}")
+
+        print("Retrying with the same Idempotency-Key...")
+        retry = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": key}, json=body)
+        print(f"Status Code: {retry.status_code}")
+
+        if first.status_code == 409:
+            print("⚠️ Trip sold out")
+            return
+        if not (first.status_code == 201 and retry.status_code == 200 and retry.json()["id"] == first.json()["id"]):
+            print("❌ Token Purchase Test Failed")
+            return
+
+        print("Reusing the key for a different request...")
+        other = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": key},
+                           json={**body, "consumer_email": "someone@iut-dhaka.edu"})
+        print(f"Status Code: {other.status_code}")
+
+        # As when the trip is deleted together with its seats
+        with Session(engine) as session:
+            session.exec(delete(SeatAllocation).where(SeatAllocation.token_id == first.json()["id"]))
+            release_seats(session, {uuid.UUID(trip["id"]): 1})
+            session.commit()
+        print("Retrying after the seat was removed...")
+        gone = httpx.post(f"{BASE_URL}/tokens/", headers={**headers, "Idempotency-Key": key}, json=body)
+        print(f"Status Code: {gone.status_code}")
+
+        if other.status_code == 422 and gone.status_code == 410:
+            print("✅ Token Purchase Test Passed")
+        else:
+            print("❌ Token Purchase Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_token_purchase()
@@ -0,0 +1,76 @@
+import httpx
+import uuid
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+# Start the server with TRACE_SAMPLE_RATE=1 (and the default memory exporter)
+
+
+def login(email, password):
+    response = httpx.post(f"{BASE_URL}/auth/login", json={"email": email, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def get_auth_headers():
+    # Helper to get a valid token
+    email = f"test_{uuid.uuid4()}@iut-dhaka.edu"
+    httpx.post(f"{BASE_URL}/auth/signup", json={
+        "email": email,
+        "password": "password123",
+        "full_name": "Test User"
+    })
+    return login(email, "password123")
+
+
+def test_tracing():
+    try:
+        print("Attempting to read traces as staff...")
+        staff = httpx.get(f"{BASE_URL}/debug/traces", headers=get_auth_headers())
+        print(f"Status Code: {staff.status_code}")
+
+        headers = login(TO_EMAIL, TO_PASSWORD)
+        httpx.get(f"{BASE_URL}/trips/availability", headers=headers)
+
+        print("Attempting to read traces as the Transport Officer...")
+        response = httpx.get(f"{BASE_URL}/debug/traces", headers=headers, params={"limit": 200})
+        print(f"Status Code: {response.status_code}")
+        if staff.status_code != 403 or response.status_code != 200:
+            print("❌ Tracing Test Failed")
+            return
+
+        trace = next(
+            (spans for spans in reversed(response.json())
+             if any(span["name"] == "GET /trips/availability" for span in spans)),
+            None,
+        )
+        if trace is None:
+            print("❌ No trace recorded for /trips/availability; is TRACE_SAMPLE_RATE=1?")
+            return
+
+        by_id = {span["spanId"]: span for span in trace}
+        root = next(span for span in trace if span["name"] == "GET /trips/availability")
+        handler = next((span for span in trace if span["name"] == "handler get_trips_availability"), None)
+        queries = [span for span in trace if span["name"] == "db.query"]
+        print(f"Spans: {sorted({span['name'] for span in trace})}")
+
+        # request -> handler -> SQL, all in one trace
+        nested = (
+            handler is not None
+            and handler["parentSpanId"] == root["spanId"]
+            and queries
+            and all(span["parentSpanId"] in by_id for span in queries)
+            and any(span["parentSpanId"] == handler["spanId"] for span in queries)
+        )
+        if nested:
+            print("✅ Tracing Test Passed")
+        else:
+            print("❌ Handler and SQL spans are not nested under the request")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_tracing()
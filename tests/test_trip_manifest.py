@@ -0,0 +1,51 @@
+import httpx
+
+BASE_URL = "http://127.0.0.1:8000"
+
+TO_EMAIL = "transportofficer@iut-dhaka.edu"
+TO_PASSWORD = "transportofficer@iut-dhaka.edu"
+
+
+def test_trip_manifest():
+    try:
+        login_res = httpx.post(f"{BASE_URL}/auth/login", json={
+            "email": TO_EMAIL,
+            "password": TO_PASSWORD
+        })
+        headers = {"Authorization": f"Bearer {login_res.json()['access_token']}"}
+
+        trips = httpx.get(f"{BASE_URL}/trips/availability", headers=headers).json()
+        if not trips:
+            print("⚠️ No upcoming trips, skipping manifest test")
+            return
+
+        print("Attempting to get trip manifest...")
+        response = httpx.get(f"{BASE_URL}/trips/{trips[0]['id']}/manifest", headers=headers)
+        print(f"Status Code: {response.status_code}")
+        print(f"Response: {response.json()}")
+
+        if response.status_code == 200:
+            data = response.json()
+            sequence = [stop["sequence_number"] for stop in data["stops"]]
+            if sequence != sorted(sequence) or "rider_count" not in data:
+                print("❌ Manifest stops out of order or missing fields")
+                return
+
+            # Riders are exactly the trip's booked seats, subscribers included
+            mismatched = []
+            for trip in trips[:10]:
+                manifest = httpx.get(f"{BASE_URL}/trips/{trip['id']}/manifest", headers=headers).json()
+                if manifest["rider_count"] != trip["booked_seats"]:
+                    mismatched.append((trip["id"], manifest["rider_count"], trip["booked_seats"]))
+            if mismatched:
+                print(f"❌ Manifest riders differ from booked seats: {mismatched}")
+            else:
+                print("✅ Trip Manifest Test Passed")
+        else:
+            print("❌ Trip Manifest Test Failed")
+
+    except Exception as e:
+        print(f"❌ Error during request: {str(e)}")
+
+if __name__ == "__main__":
+    test_trip_manifest()